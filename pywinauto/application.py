@@ -140,11 +140,18 @@ class WindowSpecification(object):
         """
         Initialize the class
 
-        :param search_criteria: the criteria to match a dialog
+        :param search_criteria: the criteria to match a dialog (a dict
+            or :py:class:`pywinauto.findwindows.SearchCriteria`)
         """
         # kwargs will contain however to find this window
-        if 'backend' not in search_criteria:
-            search_criteria['backend'] = registry.active_backend.name
+        if not isinstance(search_criteria, findwindows.SearchCriteria):
+            if 'backend' not in search_criteria:
+                search_criteria['backend'] = registry.active_backend.name
+            search_criteria = findwindows.SearchCriteria(**search_criteria)
+        elif 'backend' not in search_criteria:
+            search_criteria = search_criteria.replace(backend=registry.active_backend.name)
+
+        # the criteria are compiled once for all the searches of the window
         self.criteria = [search_criteria, ]
         self.actions = ActionLogger()
         self.backend = registry.backends[search_criteria['backend']]
@@ -177,33 +184,31 @@ class WindowSpecification(object):
 
         raise AttributeError(message)
 
-    def __get_ctrl(self, criteria_):
+    def __control_criteria(self, criteria):
+        """Compile the criteria for a control (searched in the previous one)"""
+        criteria["top_level_only"] = False
+        if 'backend' not in criteria:
+            criteria['backend'] = self.backend.name
+        return findwindows.SearchCriteria(**criteria)
+
+    def __get_ctrl(self, criteria):
         """Get a control based on the various criteria"""
-        # make a copy of the criteria
-        criteria = [crit.copy() for crit in criteria_]
         # find the dialog
-        if 'backend' not in criteria[0]:
-            criteria[0]['backend'] = self.backend.name
-        dialog = self.backend.generic_wrapper_class(findwindows.find_element(**criteria[0]))
+        dialog = self.backend.generic_wrapper_class(criteria[0].find_element())
 
         ctrls = []
         # if there is only criteria for a dialog then return it
         if len(criteria) > 1:
-            # so there was criteria for a control, add the extra criteria
-            # that are required for child controls
+            # so there was criteria for a control, it's searched
+            # in the descendants of the previous one by default
             previous_parent = dialog.element_info
             for ctrl_criteria in criteria[1:]:
-                ctrl_criteria["top_level_only"] = False
-                if "parent" not in ctrl_criteria:
-                    ctrl_criteria["parent"] = previous_parent
-
-                if isinstance(ctrl_criteria["parent"], WindowSpecification):
-                    ctrl_criteria["parent"] = ctrl_criteria["parent"].wrapper_object()
+                parent = ctrl_criteria.get("parent", previous_parent)
+                if isinstance(parent, WindowSpecification):
+                    parent = parent.wrapper_object()
 
                 # resolve the control and return it
-                if 'backend' not in ctrl_criteria:
-                    ctrl_criteria['backend'] = self.backend.name
-                ctrl = self.backend.generic_wrapper_class(findwindows.find_element(**ctrl_criteria))
+                ctrl = self.backend.generic_wrapper_class(ctrl_criteria.find_element(parent))
                 previous_parent = ctrl.element_info
                 ctrls.append(ctrl)
 
@@ -216,7 +221,7 @@ class WindowSpecification(object):
         """
         Find a control using criteria
 
-        * **criteria** - a list that contains 1 or 2 dictionaries
+        * **criteria** - a list that contains 1 or 2 SearchCriteria
 
              1st element is search criteria for the dialog
 
@@ -258,14 +263,11 @@ class WindowSpecification(object):
         When this window specification is resolved it will be used
         to match against a control.
         """
-        # default to non top level windows because we are usualy
-        # looking for a control
-        if 'top_level_only' not in criteria:
-            criteria['top_level_only'] = False
-
+        # the control is looked for in the descendants
+        # of the previous one (non top level windows)
         new_item = WindowSpecification(self.criteria[0])
         new_item.criteria.extend(self.criteria[1:])
-        new_item.criteria.append(criteria)
+        new_item.criteria.append(self.__control_criteria(criteria))
 
         return new_item
 
@@ -313,7 +315,7 @@ class WindowSpecification(object):
         new_item = WindowSpecification(self.criteria[0])
 
         # add our new criteria
-        new_item.criteria.append({"best_match": key})
+        new_item.criteria.append(self.__control_criteria({"best_match": key}))
 
         return new_item
 
@@ -386,10 +388,8 @@ class WindowSpecification(object):
 
         # modify the criteria as exists should look for all
         # windows - including not visible and disabled
-        exists_criteria = self.criteria[:]
-        for criterion in exists_criteria:
-            criterion['enabled_only'] = False
-            criterion['visible_only'] = False
+        exists_criteria = [criterion.replace(enabled_only=False, visible_only=False)
+                           for criterion in self.criteria]
 
         try:
             self.__resolve_control(exists_criteria, timeout, retry_interval)
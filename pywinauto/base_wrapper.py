@@ -37,8 +37,8 @@ import abc
 import ctypes
 import locale
 import re
+import sys
 import time
-import win32process
 import six
 
 try:
@@ -46,11 +46,16 @@ try:
 except ImportError:
     ImageGrab = None
 
-from . import keyboard
-from . import win32defines, win32structures, win32functions
+from . import win32defines
 from .timings import Timings
 from .actionlogger import ActionLogger
-from .mouse import _perform_click_input
+if sys.platform == 'win32':
+    # BaseWrapper is imported on the other platforms by the back-ends
+    # which need no win32 (e.g. pywinauto.simulated)
+    import win32process
+    from . import keyboard
+    from . import win32structures, win32functions
+    from .mouse import _perform_click_input
 
 #=========================================================================
 def remove_non_alphanumeric_symbols(s):
@@ -75,6 +80,107 @@ class ElementNotVisible(RuntimeError):
     """Raised when an element is not visible"""
     pass
 
+
+#=========================================================================
+class LazyProperty(object):
+
+    """
+    A lazy evaluation of an object attribute.
+
+    The property should represent immutable data, as it replaces itself.
+    Provided by: http://stackoverflow.com/a/6849299/1260742
+    """
+
+    def __init__(self, fget):
+        """Init the property name and method to calculate the property"""
+        self.fget = fget
+        self.func_name = fget.__name__
+
+    def __get__(self, obj, cls):
+        """Replace the property itself on a first access"""
+        if obj is None:
+            return None
+        value = self.fget(obj)
+        setattr(obj, self.func_name, value)
+        return value
+
+
+lazy_property = LazyProperty
+
+
+#=========================================================================
+class PropertySnapshot(object):
+
+    """
+    Properties of an element used to name it, fetched at once
+
+    Naming the controls of a dialog (see findbestmatch.build_unique_dict)
+    asks each control for the same properties many times and every call
+    goes to the backend. The snapshot fetches them once and serves the same
+    values for the rest of the lookup, so it has to be discarded after that.
+
+    The snapshot has the same methods and attributes as the wrapper that
+    the naming code uses. The texts are only fetched on the first call
+    as most of the controls are named without them.
+
+    Each snapshot counts the backend calls it made (fetched) and
+    the calls it served instead of the wrapper (served), the totals
+    of all the lookups are returned by findbestmatch.naming_stats().
+    """
+
+    __slots__ = ('wrapper', 'can_be_label', 'has_title', '_friendly_class_name',
+                 '_window_text', '_is_visible', '_rectangle', '_texts',
+                 'fetched', 'served')
+
+    def __init__(self, wrapper):
+        """Fetch the properties of the wrapper"""
+        self.wrapper = wrapper
+        self.can_be_label = wrapper.can_be_label
+        self.has_title = wrapper.has_title
+
+        self._friendly_class_name = wrapper.friendly_class_name()
+        self._window_text = wrapper.window_text()
+        self._is_visible = wrapper.is_visible()
+        self._rectangle = wrapper.rectangle()
+        self._texts = None
+        self.fetched = 4
+        self.served = 0
+
+    def friendly_class_name(self):
+        """Return the friendly class name of the element"""
+        self.served += 1
+        return self._friendly_class_name
+
+    def window_text(self):
+        """Return the window text of the element"""
+        self.served += 1
+        return self._window_text
+
+    def is_visible(self):
+        """Return whether the element was visible"""
+        self.served += 1
+        return self._is_visible
+
+    def rectangle(self):
+        """Return a copy of the rectangle of the element"""
+        self.served += 1
+        return type(self._rectangle)(self._rectangle)
+
+    def texts(self):
+        """Return a copy of the texts of the element"""
+        if self._texts is None:
+            self._texts = self.wrapper.texts()
+            self.fetched += 1
+        self.served += 1
+        return list(self._texts)
+
+    def stats(self):
+        """Return the numbers of the backend calls fetched, served and saved"""
+        return {'fetched': self.fetched,
+                'served': self.served,
+                'saved': self.served - self.fetched}
+
+
 #=========================================================================
 @six.add_metaclass(abc.ABCMeta)
 class BaseMeta(abc.ABCMeta):
@@ -103,6 +209,10 @@ class BaseWrapper(object):
     can_be_label = False
     has_title = True
 
+    # user data of the wrapper
+    ref = None
+    appdata = None
+
     #------------------------------------------------------------
     def __new__(cls, element_info):
         return BaseWrapper._create_wrapper(cls, element_info, BaseWrapper)
@@ -141,14 +251,21 @@ class BaseWrapper(object):
 
             self.handle = self._element_info.handle
             self._as_parameter_ = self.handle
-
-            self.ref = None
-            self.appdata = None
-            self._cache = {}
-            self.actions = ActionLogger()
         else:
             raise RuntimeError('NULL pointer used to initialize BaseWrapper')
 
+    #------------------------------------------------------------
+    @lazy_property
+    def actions(self):
+        """The ActionLogger of the element (created on the first use)"""
+        return ActionLogger()
+
+    #------------------------------------------------------------
+    @lazy_property
+    def _cache(self):
+        """The values cached by the wrapper (created on the first use)"""
+        return {}
+
     #------------------------------------------------------------
     @property
     def writable_props(self):
@@ -199,6 +316,16 @@ class BaseWrapper(object):
             self.friendlyclassname = self.element_info.class_name
         return self.friendlyclassname
 
+    #------------------------------------------------------------
+    def naming_snapshot(self):
+        """
+        Return a PropertySnapshot of the properties used to name the element
+
+        The snapshot is meant for a single lookup only: it doesn't
+        reflect any changes of the element made after it was taken.
+        """
+        return PropertySnapshot(self)
+
     #------------------------------------------------------------
     def class_name(self):
         """Return the class name of the elenemt"""
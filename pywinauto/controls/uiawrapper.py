@@ -40,6 +40,7 @@ import comtypes
 from .. import backend
 from ..base_wrapper import BaseWrapper
 from ..base_wrapper import BaseMeta
+from ..base_wrapper import LazyProperty, lazy_property  # noqa: F401
 
 from ..uia_defines import IUIA
 from .. import uia_defines as uia_defs
@@ -107,31 +108,6 @@ _friendly_classes = {
 }
 
 
-# =========================================================================
-class LazyProperty(object):
-
-    """
-    A lazy evaluation of an object attribute.
-
-    The property should represent immutable data, as it replaces itself.
-    Provided by: http://stackoverflow.com/a/6849299/1260742
-    """
-
-    def __init__(self, fget):
-        """Init the property name and method to calculate the property"""
-        self.fget = fget
-        self.func_name = fget.__name__
-
-    def __get__(self, obj, cls):
-        """Replace the property itself on a first access"""
-        if obj is None:
-            return None
-        value = self.fget(obj)
-        setattr(obj, self.func_name, value)
-        return value
-lazy_property = LazyProperty
-
-
 # =========================================================================
 class UiaMeta(BaseMeta):
 
@@ -31,13 +31,256 @@
 
 """Interface for classes which should deal with different backend elements"""
 
+import time
+import threading
+
+# the cache policies of the attributes (see cached())
+NEVER = 'never'
+PER_QUERY = 'per_query'
+TTL = 'ttl'
+
+# the attribute caches of all the elements can be switched off
+caching = True
+
+# the numbers of the attribute reads of the elements with the cache enabled:
+# the hits are the queries to the back-end which were saved by the cache
+# (they are counted only after set_cache_stats(True))
+_cache_counts = {'hits': 0, 'misses': 0}
+_cache_counts_lock = threading.Lock()
+counting = False
+
+# the marker of the values which are not cached
+_missing = object()
+
+
+def set_caching(enabled):
+    """Switch the attribute caches of all the elements on or off
+
+    With the caches off every attribute is read from the element,
+    e.g. to compare the timings of the cached and uncached runs.
+    """
+    global caching
+    caching = bool(enabled)
+
+
+def set_cache_stats(enabled):
+    """Switch the counting of the cached attribute reads on or off
+
+    The reads aren't counted by default, so the attributes
+    don't share a lock between the threads of the searches.
+    """
+    global counting
+    counting = bool(enabled)
+
+
+def cache_stats():
+    """Return the numbers of the cached attribute reads of the elements
+
+    The dict has the keys hits (the reads answered by the cache),
+    misses (the reads which have queried the element) and hit_rate.
+    The reads are counted while set_cache_stats(True) is in effect.
+    """
+    with _cache_counts_lock:
+        hits = _cache_counts['hits']
+        misses = _cache_counts['misses']
+    reads = hits + misses
+    return {'hits': hits,
+            'misses': misses,
+            'hit_rate': float(hits) / reads if reads else 0.}
+
+
+def reset_cache_stats():
+    """Set the numbers of the cached attribute reads to zero"""
+    with _cache_counts_lock:
+        _cache_counts['hits'] = 0
+        _cache_counts['misses'] = 0
+
+
+def _count_cache_read(hit):
+    """Count a read of a cached attribute"""
+    with _cache_counts_lock:
+        _cache_counts['hits' if hit else 'misses'] += 1
+
+
+class CachedProperty(object):
+
+    """An attribute of the element info which value can be cached (see cached())"""
+
+    def __init__(self, getter, policy=PER_QUERY, ttl=None, copy=None):
+        """Create the attribute read by the getter"""
+        if policy not in (NEVER, PER_QUERY, TTL):
+            raise ValueError("Unknown cache policy: {0}".format(policy))
+        if policy == TTL and ttl is None:
+            raise ValueError("The TTL cache policy needs the ttl")
+        self.getter = getter
+        self.name = getter.__name__
+        self.policy = policy
+        self.ttl = ttl
+        self.copy = copy
+        self.__doc__ = getter.__doc__
+
+    def __get__(self, elem, owner=None):
+        """Return the value of the attribute of the element"""
+        if elem is None:
+            return self
+        if self.policy == NEVER or not caching:
+            return self.getter(elem)
+        value = elem._cached_value(self)
+        if self.copy is not None:
+            return self.copy(value)
+        return value
+
+
+def cached(policy=PER_QUERY, ttl=None, copy=None):
+    """
+    Return a decorator which makes the method a cached attribute
+
+    * **policy** NEVER (the attribute is always read from the element),
+      PER_QUERY (the value is kept while the cache of the element is enabled
+      by set_cache_strategy(cached=True), e.g. during a search) or
+      TTL (the same but the value expires after ttl seconds)
+    * **ttl** the time to live of the value in seconds
+    * **copy** a function returning a copy of the cached value
+      if it can be changed by the caller (e.g. RECT)
+
+    A usage example::
+
+        class MyElementInfo(ElementInfo):
+            @cached()
+            def class_name(self):
+                return self._element.read('class_name')
+    """
+    def decorator(getter):
+        """Make the CachedProperty"""
+        return CachedProperty(getter, policy, ttl, copy)
+    return decorator
+
+
 class ElementInfo(object):
 
-    """Abstract wrapper for an element"""
+    """
+    Abstract wrapper for an element
 
-    def set_cache_strategy(self, cached):
-        """Set a cache strategy for frequently used attributes of the element"""
-        raise NotImplementedError()
+    The attributes declared with cached() keep their values while
+    the cache is enabled by set_cache_strategy(cached=True).
+    The values are stored in one dict created by the first cached read
+    (and the times of the reads in another one if they can expire).
+    A None value is cached as any other one, call invalidate()
+    to read an attribute which is expected to change.
+
+    The element infos have __slots__ to keep the large trees compact,
+    so the attributes which are not declared by a class can't be set
+    on its instances. A subclass without __slots__ has a __dict__ for them.
+    """
+
+    __slots__ = ('_cache', '_cache_times', '_cache_enabled', '_cache_ttl')
+
+    # True if prefetch() reads the attributes of many elements
+    # with fewer queries than reading them one by one
+    bulk_prefetch = False
+
+    # True if the elements can be used by the threads other than the one
+    # which created them (the desktop is searched in parallel only then)
+    thread_safe = False
+
+    # False if children() of the elements (but the desktop) return
+    # their whole subtrees, the snapshots read the parents then
+    immediate_children = True
+
+    def set_cache_strategy(self, cached, ttl=None):
+        """Set a cache strategy for frequently used attributes of the element
+
+        If cached is True the cached() attributes are read once and kept
+        until invalidate() is called or for ttl seconds (if it's not None,
+        it overrides the time to live of the TTL attributes).
+        The values cached before are dropped anyway.
+        """
+        self._cache = None
+        self._cache_times = None
+        self._cache_enabled = bool(cached)
+        self._cache_ttl = ttl
+
+    def invalidate(self, *names):
+        """Drop the cached values of the attributes (all of them if no names passed)"""
+        cache = getattr(self, '_cache', None)
+        if not cache:
+            return
+        if not names:
+            cache.clear()
+        for name in names:
+            cache.pop(name, None)
+
+    @property
+    def cache_enabled(self):
+        """Return True if the cached() attributes of the element are kept"""
+        # set_cache_strategy() could be not called yet
+        return getattr(self, '_cache_enabled', False)
+
+    @classmethod
+    def prefetch(cls, elements, attributes):
+        """Read the attributes of the elements to their caches at once
+
+        Only the cached() attributes of the elements with the cache
+        enabled are read, the rest of them is read on the first use
+        as usual. The back-ends which can fetch many attributes of many
+        elements in one call override this method (see bulk_prefetch),
+        the generic one reads the attributes one by one.
+        """
+        props = cls._prefetched_properties(attributes)
+        for elem in elements:
+            if elem.cache_enabled:
+                for prop in props:
+                    elem._cached_value(prop)
+
+    @classmethod
+    def _prefetched_properties(cls, attributes):
+        """Return the cached() attributes of the class with the names"""
+        props = []
+        if not caching:
+            return props
+        for name in attributes:
+            prop = getattr(cls, name, None)
+            if isinstance(prop, CachedProperty) and prop.policy != NEVER and prop not in props:
+                props.append(prop)
+        return props
+
+    def _cache_ttl_of(self, prop):
+        """Return the time to live of the cached value of the attribute"""
+        if self._cache_ttl is None and prop.policy == TTL:
+            return prop.ttl
+        return self._cache_ttl
+
+    def _store_cached(self, prop, value, now=None):
+        """Keep the value of the cached attribute (e.g. fetched by prefetch())"""
+        if self._cache is None:
+            self._cache = {}
+        self._cache[prop.name] = value
+        if self._cache_ttl_of(prop) is not None:
+            if self._cache_times is None:
+                self._cache_times = {}
+            self._cache_times[prop.name] = time.time() if now is None else now
+
+    def _cached_value(self, prop):
+        """Return the value of the cached attribute"""
+        if not self.cache_enabled:
+            return prop.getter(self)
+
+        ttl = self._cache_ttl_of(prop)
+        now = time.time() if ttl is not None else None
+
+        cache = self._cache
+        if cache is not None:
+            value = cache.get(prop.name, _missing)
+            if value is not _missing and (ttl is None or now - self._cache_times[prop.name] < ttl):
+                if counting:
+                    _count_cache_read(True)
+                return value
+
+        value = prop.getter(self)
+        self._store_cached(prop, value, now)
+        if counting:
+            _count_cache_read(False)
+        return value
 
     @property
     def handle(self):
@@ -97,6 +340,24 @@ class ElementInfo(object):
         """Return descendants of the element"""
         raise NotImplementedError()
 
+    def enumerated_by(self, **kwargs):
+        """Check the criteria which children() and descendants() evaluate
+
+        The generic implementation returns True for the back-ends which
+        enumerate all the elements and leave the criteria to the search.
+        """
+        return True
+
+    def iter_children(self, **kwargs):
+        """Iterate over the children of the element (as returned by children())"""
+        for child in self.children(**kwargs):
+            yield child
+
+    def iter_descendants(self, **kwargs):
+        """Iterate over the descendants of the element (as returned by descendants())"""
+        for descendant in self.descendants(**kwargs):
+            yield descendant
+
     @property
     def rectangle(self):
         """Return rectangle of element"""
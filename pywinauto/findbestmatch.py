@@ -34,7 +34,19 @@ from __future__ import unicode_literals
 
 import re
 import difflib
+import hashlib
+import json
+import sqlite3
+import threading
+import weakref
 import six
+from bisect import insort
+from collections import Counter, OrderedDict, namedtuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 #import ctypes
 #import ldistance
 #levenshtein_distance = ctypes.cdll.levenshtein.levenshtein_distance
@@ -47,18 +59,159 @@ class MatchError(IndexError):
 
     """A suitable match could not be found"""
 
-    def __init__(self, items = None, tofind = ''):
-        """Init the parent with the message"""
+    def __init__(self, items=None, tofind='', near_misses=None):
+        """Init the parent with the message
+
+        * **near_misses** the best ranked candidates (see :func:`rank_controls`)
+        """
         self.tofind = tofind
         self.items = items
         if self.items is None:
             self.items = []
+        self.near_misses = near_misses
+        if self.near_misses is None:
+            self.near_misses = []
 
         IndexError.__init__(self,
             "Could not find '{0}' in '{1}'".format(tofind, self.items))
 
 
-_cache = {}
+#====================================================================
+class SimilarityCache(object):
+
+    """Bounded cache of the match ratios with LRU eviction
+
+    It's safe to use the cache from several threads. The number of hits,
+    misses and evicted items is counted (see :func:`stats`).
+    """
+
+    def __init__(self, max_size=50000):
+        """Create an empty cache for max_size ratios (0 disables caching)"""
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """Return the number of cached ratios"""
+        return len(self._items)
+
+    def __contains__(self, key):
+        """Check if there is a ratio for the key (doesn't count as a hit)"""
+        return key in self._items
+
+    def get(self, key, default=None):
+        """Return the ratio for the key and mark it as recently used"""
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items[key] = value
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        """Store the ratio evicting the least recently used ones if needed"""
+        with self._lock:
+            self._items.pop(key, None)
+            if self.max_size <= 0:
+                return
+            self._items[key] = value
+            self._evict()
+
+    def _evict(self):
+        """Remove the least recently used items over max_size"""
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, max_size):
+        """Change the maximum number of cached ratios"""
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+    def clear(self):
+        """Remove all cached ratios and reset the counters"""
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return a dictionary with the cache size and the counters"""
+        with self._lock:
+            return {'size': len(self._items),
+                    'max_size': self.max_size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    }
+
+
+_cache = SimilarityCache()
+
+
+def clear_cache():
+    """Remove all the cached match ratios"""
+    _cache.clear()
+
+
+def set_cache_size(max_size):
+    """Change the maximum number of the cached match ratios (0 disables the cache)"""
+    _cache.resize(max_size)
+
+
+def cache_stats():
+    """Return the size and the hit/miss/eviction counters of the ratios cache"""
+    return _cache.stats()
+
+
+# the numbers of the property calls of the controls made while naming them,
+# the totals of the property snapshots of all the namings (see naming_stats)
+_naming_counts = {'namings': 0, 'fetched': 0, 'served': 0}
+_naming_counts_lock = threading.Lock()
+
+
+def naming_stats():
+    """Return the numbers of the property calls made to name the controls
+
+    The dict has the keys namings (the number of the namings of the dialog
+    controls), fetched (the calls which have queried the controls),
+    served (the calls answered by the property snapshots) and saved.
+    The calls of all the namings are added up, see :func:`reset_naming_stats`.
+    """
+    with _naming_counts_lock:
+        stats = dict(_naming_counts)
+    stats['saved'] = stats['served'] - stats['fetched']
+    return stats
+
+
+def reset_naming_stats():
+    """Set the numbers of the property calls made to name the controls to zero"""
+    with _naming_counts_lock:
+        for key in _naming_counts:
+            _naming_counts[key] = 0
+
+
+def _count_naming(controls, snapshots):
+    """Add the property calls of the snapshots of one naming to the totals"""
+    fetched = 0
+    served = 0
+    for ctrl, snapshot in zip(controls, snapshots):
+        if snapshot is not ctrl:
+            fetched += snapshot.fetched
+            served += snapshot.served
+    with _naming_counts_lock:
+        _naming_counts['namings'] += 1
+        _naming_counts['fetched'] += fetched
+        _naming_counts['served'] += served
+
 
 # given a list of texts return the match score for each
 # and the best score and text with best score
@@ -75,16 +228,9 @@ def _get_match_ratios(texts, match_against):
 
     for text in texts:
 
-        if 0:
-            pass
-
-        if (text, match_against) in _cache:
-            ratios[text] = _cache[(text, match_against)]
+        ratios[text] = _cache.get((match_against, text))
 
-        elif(match_against, text) in _cache:
-            ratios[text] = _cache[(match_against, text)]
-
-        else:
+        if ratios[text] is None:
             # set up the SequenceMatcher with other text
             ratio_calc.set_seq2(text)
 
@@ -162,18 +308,24 @@ def is_above_or_to_left(ref_control, other_ctrl):
     """Return true if the other_ctrl is above or to the left of ref_control"""
     text_r = other_ctrl.rectangle()
     ctrl_r = ref_control.rectangle()
+    return _is_above_or_to_left(
+        (ctrl_r.left, ctrl_r.top, ctrl_r.right, ctrl_r.bottom),
+        (text_r.left, text_r.top, text_r.right, text_r.bottom))
 
+
+def _is_above_or_to_left(ctrl_r, text_r):
+    """is_above_or_to_left for the (left, top, right, bottom) tuples"""
     # skip controls where text win is to the right of ctrl
-    if text_r.left >= ctrl_r.right:
+    if text_r[0] >= ctrl_r[2]:
         return False
 
     # skip controls where text win is below ctrl
-    if text_r.top >= ctrl_r.bottom:
+    if text_r[1] >= ctrl_r[3]:
         return False
 
     # text control top left corner is below control
     # top left corner - so not to the above or left :)
-    if text_r.top >= ctrl_r.top and text_r.left >= ctrl_r.left:
+    if text_r[1] >= ctrl_r[1] and text_r[0] >= ctrl_r[0]:
         return False
 
     return True
@@ -181,115 +333,238 @@ def is_above_or_to_left(ref_control, other_ctrl):
 
 #====================================================================
 distance_cuttoff = 999
+
+
+class LabelIndex(object):
+
+    """Spatial index of the text controls of a dialog
+
+    Finds the nearest text control above and to the left of a control
+    without checking all the text controls. Each rectangle is fetched
+    from the control only once, so an index should be built for one
+    naming pass over the controls (see build_unique_dict) and not kept
+    for a longer time.
+
+    The text controls are put into the grid cells by the bottom-left
+    and the top-right corners of them: the label distance is measured
+    to these corners, so the cells are checked ring by ring around the
+    control until the rest of the cells can't contain a closer label.
+    """
+
+    cell_size = 64
+
+    def __init__(self, controls, text_ctrls=None):
+        """Index the text controls
+
+        * **controls** all the controls of the dialog
+        * **text_ctrls** the visible text controls, if None they are
+          selected from the controls the same way as in build_unique_dict
+        """
+        self.controls = controls
+        self._positions = None
+        self._rects = {}
+
+        if text_ctrls is None:
+            self.text_ctrls = []
+            self._texts = []
+            for ctrl in controls:
+                if ctrl.can_be_label and ctrl.is_visible():
+                    text = ctrl.window_text()
+                    if text:
+                        self.text_ctrls.append(ctrl)
+                        self._texts.append(text)
+        else:
+            self.text_ctrls = list(text_ctrls)
+            self._texts = [ctrl.window_text() for ctrl in self.text_ctrls]
+
+        self._label_rects = [self.rectangle(ctrl) for ctrl in self.text_ctrls]
+
+        self._cells = {}
+        size = self.cell_size
+        for i, (left, top, right, bottom) in enumerate(self._label_rects):
+            for cell in ((left // size, bottom // size), (right // size, top // size)):
+                positions = self._cells.setdefault(cell, [])
+                if not positions or positions[-1] != i:
+                    positions.append(i)
+
+        if self._cells:
+            self._min_x = min(x for x, _ in self._cells)
+            self._max_x = max(x for x, _ in self._cells)
+            self._min_y = min(y for _, y in self._cells)
+            self._max_y = max(y for _, y in self._cells)
+
+    def rectangle(self, ctrl):
+        """Return the (left, top, right, bottom) of the control
+
+        The rectangle is fetched from the control only the first time.
+        """
+        # the control is kept in the value so its id() can't be reused
+        cached = self._rects.get(id(ctrl))
+        if cached is None:
+            rect = ctrl.rectangle()
+            cached = self._rects[id(ctrl)] = \
+                (ctrl, (rect.left, rect.top, rect.right, rect.bottom))
+        return cached[1]
+
+    def position(self, ctrl):
+        """Return the index of the control in the controls or 0 if it's not there"""
+        # we don't use list.index() method as it invokes __eq__
+        if self._positions is None:
+            self._positions = {}
+            for i, c in enumerate(self.controls):
+                self._positions.setdefault(id(c), i)
+        return self._positions.get(id(ctrl), 0)
+
+    def _ring(self, x, y, radius):
+        """Return the cells at the radius around the (x, y) cell inside the index"""
+        if radius == 0:
+            return [(x, y)]
+        min_x = max(x - radius, self._min_x)
+        max_x = min(x + radius, self._max_x)
+        min_y = max(y - radius + 1, self._min_y)
+        max_y = min(y + radius - 1, self._max_y)
+
+        cells = []
+        for row in (y - radius, y + radius):
+            if self._min_y <= row <= self._max_y:
+                cells.extend((col, row) for col in range(min_x, max_x + 1))
+        for col in (x - radius, x + radius):
+            if self._min_x <= col <= self._max_x:
+                cells.extend((col, row) for row in range(min_y, max_y + 1))
+        return cells
+
+    def nearest_label(self, ctrl):
+        """Return the text of the closest text control above and to the left
+
+        An empty string is returned if there is no such control closer
+        than distance_cuttoff. Of the equally close text controls the first
+        one in text_ctrls wins.
+        """
+        best = self._nearest(ctrl)
+        if best < 0:
+            return ''
+        return self._texts[best]
+
+    def nearest_position(self, ctrl):
+        """Return the position in the controls of the nearest label (-1 if there is none)"""
+        best = self._nearest(ctrl)
+        if best < 0:
+            return -1
+        return self.position(self.text_ctrls[best])
+
+    def _nearest(self, ctrl):
+        """Return the index in text_ctrls of the nearest label or -1"""
+        if not self._cells:
+            return -1
+        left, top, right, bottom = self.rectangle(ctrl)
+        size = self.cell_size
+        x, y = left // size, top // size
+
+        # (distance, index) of the best text control so far
+        best = (distance_cuttoff, -1)
+        radius = 0
+        while (radius - 1) * size < best[0]:
+            if x - radius < self._min_x and x + radius > self._max_x and \
+                    y - radius < self._min_y and y + radius > self._max_y:
+                # no more cells in the index
+                break
+
+            for cell in self._ring(x, y, radius):
+                for i in self._cells.get(cell, ()):
+                    text_left, text_top, text_right, text_bottom = self._label_rects[i]
+
+                    # skip controls where text win is to the right of ctrl
+                    # or where text win is below ctrl
+                    if text_left >= right or text_top >= bottom:
+                        continue
+
+                    # the distance between the top left of the control and
+                    #    Top-Right of the text control (text control to the left)
+                    #    Bottom-Left of the text control (text control above)
+                    distance = min(
+                        abs(text_left - left) + abs(text_bottom - top),
+                        abs(text_right - left) + abs(text_top - top))
+                    if (distance, i) < best:
+                        best = (distance, i)
+            radius += 1
+
+        return best[1]
+
+
 def get_non_text_control_name(ctrl, controls, text_ctrls):
     """
     return the name for this control by finding the closest
     text control above and to its left
+
+    **text_ctrls** can be a LabelIndex of the controls to avoid
+    indexing the text controls for each control.
     """
-    names = []
+    if isinstance(text_ctrls, LabelIndex):
+        labels = text_ctrls
+    else:
+        labels = LabelIndex(controls, text_ctrls)
 
-    # simply look for an instance of the control in the list,
-    # we don't use list.index() method as it invokes __eq__
-    ctrl_index = 0
-    for i, c in enumerate(controls):
-        if c is ctrl:
-            ctrl_index = i
-            break
-    ctrl_friendly_class_name = ctrl.friendly_class_name()
+    return _label_names(ctrl, controls, _label_positions(ctrl, controls, labels))
 
+
+def _label_positions(ctrl, controls, labels):
+    """Return the positions of the controls whose texts name a control without text
+
+    The previous control if it's a Static text above or to the left of
+    the control and the closest text control above and to the left
+    (see LabelIndex.nearest_position), -1 for each one that is not found.
+    """
+    previous = -1
+    ctrl_index = labels.position(ctrl)
     if ctrl_index != 0:
         prev_ctrl = controls[ctrl_index-1]
-        prev_ctrl_text = prev_ctrl.window_text()
-
         if prev_ctrl.friendly_class_name() == "Static" and \
-            prev_ctrl.is_visible() and prev_ctrl_text and \
-            is_above_or_to_left(ctrl, prev_ctrl):
-
-            names.append(
-                prev_ctrl_text +
-                ctrl_friendly_class_name)
-
-    best_name = ''
-    closest = distance_cuttoff
-    # now for each of the visible text controls
-    for text_ctrl in text_ctrls:
-
-        # get aliases to the control rectangles
-        text_r = text_ctrl.rectangle()
-        ctrl_r = ctrl.rectangle()
-
-        # skip controls where text win is to the right of ctrl
-        if text_r.left >= ctrl_r.right:
-            continue
-
-        # skip controls where text win is below ctrl
-        if text_r.top >= ctrl_r.bottom:
-            continue
-
-        # calculate the distance between the controls
-        # at first I just calculated the distance from the top left
-        # corner of one control to the top left corner of the other control
-        # but this was not best, so as a text control should either be above
-        # or to the left of the control I get the distance between
-        # the top left of the non text control against the
-        #    Top-Right of the text control (text control to the left)
-        #    Bottom-Left of the text control (text control above)
-        # then I get the min of these two
-
-        # We do not actually need to calculate the difference here as we
-        # only need a comparative number. As long as we find the closest one
-        # the actual distance is not all that important to us.
-        # this reduced the unit tests run on my by about 1 second
-        # (from 61 ->60 s)
-
-        # (x^2 + y^2)^.5
-        #distance = (
-        #    (text_r.left - ctrl_r.left) ** 2 +  #  (x^2 + y^2)
-        #    (text_r.bottom - ctrl_r.top) ** 2) \
-        #    ** .5  # ^.5
-
-        #distance2 = (
-        #    (text_r.right - ctrl_r.left) ** 2 +  #  (x^2 + y^2)
-        #    (text_r.top - ctrl_r.top) ** 2) \
-        #    ** .5  # ^.5
-
-        distance = abs(text_r.left - ctrl_r.left) + abs(text_r.bottom - ctrl_r.top)
-        distance2 = abs(text_r.right - ctrl_r.left) + abs(text_r.top - ctrl_r.top)
-
-        distance = min(distance, distance2)
-
-        # UpDown control should use Static text only because edit box text is often useless
-        if ctrl_friendly_class_name == "UpDown" and \
-                text_ctrl.friendly_class_name() == "Static" and distance < closest:
-            # TODO: use search in all text controls for all non-text ones
-            # (like Dijkstra algorithm vs Floyd one)
-            closest = distance
-            ctrl_text = text_ctrl.window_text()
-            if ctrl_text is None:
-                # the control probably doesn't exist so skip it
-                continue
-            best_name = ctrl_text + ctrl_friendly_class_name
-
-        # if this distance was closer than the last one
-        elif distance < closest:
-            closest = distance
-            #if text_ctrl.window_text() == '':
-            #    best_name = ctrl_friendly_class_name + ' '.join(text_ctrl.texts()[1:2])
-            #else:
-            ctrl_text = text_ctrl.window_text()
-            if ctrl_text is None:
-                # the control probably doesn't exist so skip it
-                continue
-            best_name = ctrl_text + ctrl_friendly_class_name
-
-    names.append(best_name)
+                prev_ctrl.is_visible() and prev_ctrl.window_text() and \
+                _is_above_or_to_left(labels.rectangle(ctrl), labels.rectangle(prev_ctrl)):
+            previous = ctrl_index - 1
+
+    # the closest of the visible text controls
+    # (UpDown control could use Static text only as edit box text is often
+    # useless but the nearest text control has always been used for it)
+    return previous, labels.nearest_position(ctrl)
+
+
+def _label_names(ctrl, controls, label_positions):
+    """Return the names of a control without text by its labels (see _label_positions)"""
+    names = []
+    previous, nearest = label_positions
+    ctrl_friendly_class_name = ctrl.friendly_class_name()
+
+    if previous >= 0:
+        names.append(controls[previous].window_text() + ctrl_friendly_class_name)
+
+    if nearest >= 0:
+        names.append(controls[nearest].window_text() + ctrl_friendly_class_name)
+    else:
+        names.append('')
 
     return names
 
 
+def _control_labels(control, allcontrols, labels):
+    """Return the label positions used to name the control or None
+
+    None means that the control is named by its own text
+    (see :func:`get_control_names`).
+    """
+    if control.has_title and control.window_text():
+        return None
+    return _label_positions(control, allcontrols, labels)
+
+
 #====================================================================
-def get_control_names(control, allcontrols, textcontrols):
-    """Returns a list of names for this control"""
+def get_control_names(control, allcontrols, textcontrols, label_positions=None):
+    """Returns a list of names for this control
+
+    * **label_positions** the positions of the labels of the control if they
+      are known already (see :func:`_control_labels`), otherwise they are
+      found with **textcontrols**
+    """
     names = []
 
     # if it has a reference control - then use that
@@ -317,7 +592,7 @@ def get_control_names(control, allcontrols, textcontrols):
             pass #ActionLogger().log('Warning! Cannot get control.texts()') #\nTraceback:\n' + traceback.format_exc())
 
         # so find the text of the nearest text visible control
-        non_text_names = get_non_text_control_name(control, allcontrols, textcontrols)
+        non_text_names = _non_text_names(control, allcontrols, textcontrols, label_positions)
 
         # and if one was found - add it
         if non_text_names:
@@ -325,7 +600,7 @@ def get_control_names(control, allcontrols, textcontrols):
     # it didn't have visible text
     else:
         # so find the text of the nearest text visible control
-        non_text_names = get_non_text_control_name(control, allcontrols, textcontrols)
+        non_text_names = _non_text_names(control, allcontrols, textcontrols, label_positions)
 
         # and if one was found - add it
         if non_text_names:
@@ -335,28 +610,47 @@ def get_control_names(control, allcontrols, textcontrols):
     return set(names)
 
 
+def _non_text_names(control, allcontrols, textcontrols, label_positions):
+    """Return the names of the control by its labels, found or known already"""
+    if label_positions is None:
+        return get_non_text_control_name(control, allcontrols, textcontrols)
+    return _label_names(control, allcontrols, label_positions)
+
+
 #====================================================================
 class UniqueDict(dict):
 
     """A dictionary subclass that handles making its keys unique"""
 
+    def __init__(self, *args, **kwargs):
+        """Initialize the dictionary"""
+        dict.__init__(self, *args, **kwargs)
+
+        # the next suffix to try for each duplicated text, all the
+        # suffixes from 2 up to it are taken already
+        self._suffixes = {}
+
     def __setitem__(self, text, item):
         """Set an item of the dictionary"""
         # this text is already in the map
         # so we need to make it unique
         if text in self:
+            counter = self._suffixes.get(text)
+            if counter is None:
+                counter = 2
+
+                # now we also need to make sure the original item
+                # is under text0 and text1 also!
+                if text + '0' not in self:
+                    dict.__setitem__(self, text + '0', self[text])
+                    dict.__setitem__(self, text + '1', self[text])
+
             # find next unique text after text1
-            unique_text = text
-            counter = 2
+            unique_text = text + str(counter)
             while unique_text in self:
-                unique_text = text + str(counter)
                 counter += 1
-
-            # now we also need to make sure the original item
-            # is under text0 and text1 also!
-            if text + '0' not in self:
-                dict.__setitem__(self, text+'0', self[text])
-                dict.__setitem__(self, text+'1', self[text])
+                unique_text = text + str(counter)
+            self._suffixes[text] = counter + 1
 
             # now that we don't need original 'text' anymore
             # replace it with the uniq text
@@ -365,6 +659,41 @@ class UniqueDict(dict):
         # add our current item
         dict.__setitem__(self, text, item)
 
+    # a removed key frees its suffix so start looking from text2 again
+    def __delitem__(self, text):
+        """Remove an item of the dictionary"""
+        self._suffixes.clear()
+        dict.__delitem__(self, text)
+
+    def pop(self, *args):
+        """Remove an item of the dictionary and return it"""
+        self._suffixes.clear()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        """Remove some item of the dictionary and return it"""
+        self._suffixes.clear()
+        return dict.popitem(self)
+
+    def clear(self):
+        """Remove all the items of the dictionary"""
+        self._suffixes.clear()
+        dict.clear(self)
+
+    @classmethod
+    def from_layout(cls, keys, items):
+        """Build the dictionary from the keys that are unique already
+
+        It's much cheaper than adding the items again one by one when
+        the same names are needed for other items (e.g. new wrappers of
+        the same controls).
+
+        * **keys** the keys in the order of the dictionary
+        * **items** the item of each key
+        """
+        unique_dict = cls()
+        dict.update(unique_dict, zip(keys, items))
+        return unique_dict
 
     def FindBestMatches(
         self,
@@ -377,81 +706,597 @@ class UniqueDict(dict):
         * **clean** whether to clean non text characters out of the strings
         * **ignore_case** compare strings case insensitively
         """
-        # now time to figure out the matching
-        ratio_calc = difflib.SequenceMatcher()
+        variant = _match_variants.index((clean, ignore_case))
+        return _score_variants(
+            search_text, self.name_variants(), variants=(variant,))[0]
 
-        if ignore_case:
-            search_text = search_text.lower()
+    def name_variants(self):
+        """Return pairs of each key and its normalized forms (see _name_variants)"""
+        return [(text, _name_variants(text)) for text in self]
 
-        ratio_calc.set_seq1(search_text)
 
-        ratios = {}
-        best_ratio = 0
-        best_texts = []
+#====================================================================
+# normalization variants of the names as (clean, ignore_case) pairs
+# in the order of their priority: an earlier variant wins the ties
+_match_variants = (
+    (False, False),
+    (False, True),
+    (True, False),
+    (True, True),
+)
 
-        ratio_offset = 1
-        if clean:
-            ratio_offset *= .9
 
-        if ignore_case:
-            ratio_offset *= .9
+def _name_variants(name):
+    """Return the name in all the forms from _match_variants
 
-        for text_ in self:
+    The order is: as is, lower case, cleaned, cleaned lower case.
+    """
+    cleaned = _clean_non_chars(name)
+    return name, name.lower(), cleaned, cleaned.lower()
 
-            # make a copy of the text as we need the original later
-            text = text_
 
-            if clean:
-                text = _clean_non_chars(text)
+def _calculate_ratio(matches, length):
+    """Same as difflib's ratio formula: 2 * matches / length"""
+    if length:
+        return 2.0 * matches / length
+    return 1.0
 
-            if ignore_case:
-                text = text.lower()
 
-            # check if this item is in the cache - if yes, then retrieve it
-            if (text, search_text) in _cache:
-                ratios[text_] = _cache[(text, search_text)]
+def _quick_ratio(search_counts, search_len, text):
+    """Return the same value as SequenceMatcher.quick_ratio()
+
+    * **search_counts** (character, count) pairs of the search text
+
+    Unlike SequenceMatcher it doesn't need to index the text with set_seq2().
+    """
+    matches = 0
+    for elt, count in search_counts:
+        text_count = text.count(elt)
+        matches += count if count < text_count else text_count
+    return _calculate_ratio(matches, search_len + len(text))
 
-            elif(search_text, text) in _cache:
-                ratios[text_] = _cache[(search_text, text)]
 
-            # not in the cache - calculate it and add it to the cache
+class _VariantScores(object):
+
+    """Best ratios of the names for the normalization variants of a search text"""
+
+    def __init__(self, search_text, variants, scorer=None, ranks=None):
+        """Prepare the search texts for the variants
+
+        * **scorer** a SimilarityScorer or None for the difflib cascade
+        * **ranks** a _RankedControls to offer all the exactly scored names to
+        """
+        self.scorer = scorer
+        self.ranks = ranks
+        search_texts = []
+        ratio_offsets = []
+        for variant in variants:
+            clean, ignore_case = _match_variants[variant]
+
+            # the search text is not cleaned, only lowered
+            if ignore_case:
+                search_texts.append(search_text.lower())
             else:
+                search_texts.append(search_text)
+
+            ratio_offset = 1
+            if clean:
+                ratio_offset *= .9
+
+            if ignore_case:
+                ratio_offset *= .9
+            ratio_offsets.append(ratio_offset)
+
+        # one SequenceMatcher (and characters count) for each different search text
+        self.ratio_calcs = {}
+        self.search_counts = {}
+        for text in search_texts:
+            if text not in self.ratio_calcs:
+                self.ratio_calcs[text] = difflib.SequenceMatcher()
+                self.ratio_calcs[text].set_seq1(text)
+                self.search_counts[text] = list(Counter(text).items())
+
+        self.results = [[0, []] for _ in variants]
+        self.scored = [(variant, search, len(search), ratio_offset, result)
+                       for variant, search, ratio_offset, result
+                       in zip(variants, search_texts, ratio_offsets, self.results)]
+
+    def upper_bound(self, search_len, text_len):
+        """Return the upper bound of the ratio of texts with these lengths"""
+        if self.scorer is None:
+            # the same as SequenceMatcher.real_quick_ratio()
+            return _calculate_ratio(min(search_len, text_len), search_len + text_len)
+        return self.scorer.upper_bound(search_len, text_len)
+
+    def _ratio(self, text, search, search_len, ratio_offset, bound, pair_parts):
+        """Return (ratio, exact) of the text, the ratio is already offset
+
+        The ratio is only calculated exactly if the upper bounds of it
+        are not less than **bound**, otherwise the failed bound is returned.
+        """
+        scorer = self.scorer
+
+        # if a very quick check reveals that this is not going
+        # to match then nothing else has to be calculated
+        ratio = self.upper_bound(search_len, len(text)) * ratio_offset
+        if ratio < bound:
+            return ratio, False
+
+        if scorer is not None:
+            cutoff = find_best_control_match_cutoff
+            cache_key = (text, search, ratio_offset, scorer.name)
+            ratio = _cache.get(cache_key)
+            if ratio is None:
+                ratio = scorer.ratio(search, text, cutoff / ratio_offset) * ratio_offset
+                _cache[cache_key] = ratio
+            if ratio < cutoff <= bound:
+                # the scorers don't have to be exact below the min ratio
+                return ratio, False
+            if ratio < cutoff:
+                ratio = scorer.ratio(search, text) * ratio_offset
+            return ratio, True
+
+        # quick_ratio is the next (more precise) upper bound, it's
+        # shared by the variants with the same normalized texts
+        parts = pair_parts.get((text, search))
+        if parts is None:
+            parts = pair_parts[(text, search)] = [
+                _quick_ratio(self.search_counts[search], search_len, text), None]
+        ratio = parts[0] * ratio_offset
+        if ratio < bound:
+            return ratio, False
+
+        # check if this item is in the cache - if yes, then retrieve it
+        cache_key = (text, search, ratio_offset)
+        ratio = _cache.get(cache_key)
+
+        # not in the cache - calculate it and add it to the cache
+        if ratio is None:
+            if parts[1] is None:
                 # set up the SequenceMatcher with other text
+                ratio_calc = self.ratio_calcs[search]
                 ratio_calc.set_seq2(text)
+                parts[1] = ratio_calc.ratio()
+            ratio = parts[1] * ratio_offset
+            _cache[cache_key] = ratio
+        return ratio, True
+
+    def score(self, name, forms):
+        """Update the best ratios of all the variants with one name"""
+        cutoff = find_best_control_match_cutoff
+        ranks = self.ranks
+
+        # ratio parts of the same pair of texts are shared between variants
+        pair_parts = {}
+        for variant, search, search_len, ratio_offset, result in self.scored:
+            text = forms[variant]
+
+            # the ratio can't change the best ratios if it's below both
+            # the cutoff and the best ratio so far
+            ratio, exact = self._ratio(text, search, search_len, ratio_offset,
+                                       max(cutoff, result[0]), pair_parts)
+
+            if ranks is not None:
+                if not exact and ratio >= ranks.threshold:
+                    # it still can be one of the best ranked names
+                    ratio_, exact = self._ratio(text, search, search_len, ratio_offset,
+                                                ranks.threshold, pair_parts)
+                    if exact:
+                        ranks.offer(name, variant, ratio_)
+                elif exact:
+                    ranks.offer(name, variant, ratio)
 
-                # if a very quick check reveals that this is not going
-                # to match then
-                ratio = ratio_calc.real_quick_ratio() * ratio_offset
+            # if this is the best so far then update best stats
+            if ratio > result[0] and ratio >= cutoff:
+                result[0] = ratio
+                result[1] = [name]
 
-                if ratio  >=  find_best_control_match_cutoff:
-                    ratio = ratio_calc.quick_ratio() * ratio_offset
+            elif ratio == result[0]:
+                result[1].append(name)
 
-                    if ratio >= find_best_control_match_cutoff:
-                        ratio = ratio_calc.ratio() * ratio_offset
+    def best(self, positions=None):
+        """Return the list of (best_ratio, best_texts) for each of the variants
 
-                # save the match we got and store it in the cache
-                ratios[text_] = ratio
-                _cache[(text, search_text)] = ratio
+        * **positions** a map from a name to its position, if it's given
+          the best texts are sorted in that order
+        """
+        if positions is not None:
+            for result in self.results:
+                result[1].sort(key=positions.__getitem__)
+        return [tuple(result) for result in self.results]
 
-            # try using the levenshtein distance instead
-            #lev_dist = levenshtein_distance(six.text_type(search_text), six.text_type(text))
-            #ratio = 1 - lev_dist / 10.0
-            #ratios[text_] = ratio
-            #print "%5s" %("%0.2f"% ratio), search_text, `text`
 
-            # if this is the best so far then update best stats
-            if ratios[text_] > best_ratio and \
-                ratios[text_] >= find_best_control_match_cutoff:
+RankedMatch = namedtuple('RankedMatch', ['control', 'name', 'score', 'variant'])
+RankedMatch.__doc__ = """A control ranked by rank_controls
+
+* **control** the control
+* **name** the best matching name of the control
+* **score** the ratio of the name (with the variant penalty)
+* **variant** the (clean, ignore_case) normalization of the name
+"""
+
+
+class _RankedControls(object):
+
+    """The k best scored controls, each one by its best scored name"""
+
+    def __init__(self, k, name_control_map, positions):
+        """Prepare to collect k controls
+
+        * **positions** a map from a name to its position, the earlier
+          name wins if the ratios and the variants are equal
+        """
+        self.k = k
+        self.name_control_map = name_control_map
+        self.positions = positions
+        # best first: (sort key, control, name, ratio, variant)
+        self.entries = []
+        # the ratio needed to get into the k best controls
+        self.threshold = 0
+
+    def offer(self, name, variant, ratio):
+        """Add the scored name if it's one of the best for its control"""
+        if ratio < self.threshold:
+            return
+        ctrl = self.name_control_map[name]
+        key = (-ratio, variant, self.positions[name])
+        for i, entry in enumerate(self.entries):
+            if entry[1] is ctrl:
+                if key >= entry[0]:
+                    return
+                del self.entries[i]
+                break
+
+        insort(self.entries, (key, ctrl, name, ratio, variant))
+        del self.entries[self.k:]
+        if len(self.entries) == self.k:
+            self.threshold = self.entries[-1][3]
+
+    def matches(self):
+        """Return the list of RankedMatch, the best first"""
+        return [RankedMatch(ctrl, name, ratio, _match_variants[variant])
+                for _, ctrl, name, ratio, variant in self.entries]
+
+
+def _score_variants(search_text, name_variants, variants=(0, 1, 2, 3),
+                    prefilter=None, scorer=None, compatible=True, ranks=None,
+                    candidates=None):
+    """Score all names against search_text for several variants in one pass
+
+    * **name_variants** pairs of the name and its normalized forms
+      as returned by :func:`_name_variants`
+    * **variants** indexes in _match_variants to score
+    * **prefilter** a TrigramIndex of name_variants to find the candidates,
+      only used if not **compatible**
+    * **scorer** a SimilarityScorer, only used if not **compatible**
+    * **compatible** guarantee the same best texts as the difflib scoring
+      of all the names (see :func:`set_similarity_backend`)
+    * **ranks** a _RankedControls to collect the best ranked controls
+      in the same pass
+    * **candidates** the candidates found by the prefilter beforehand
+      (see :func:`_prefilter_candidates`)
+
+    Returns the list of (best_ratio, best_texts) for each of the variants.
+    """
+    if compatible:
+        scorer = prefilter = None
+    elif isinstance(scorer, DifflibScorer):
+        scorer = None
+    scores = _VariantScores(search_text, variants, scorer, ranks)
+
+    if prefilter is None:
+        for name, forms in name_variants:
+            scores.score(name, forms)
+        return scores.best()
+
+    if candidates is None:
+        candidates = _prefilter_candidates(prefilter, [search_text])[0]
+
+    for pos in candidates:
+        scores.score(*name_variants[pos])
+
+    return scores.best(prefilter.positions)
+
+
+def _prefilter_candidates(prefilter, search_texts):
+    """Return the list of the candidates to score for each search text"""
+    return prefilter.candidates_many(search_texts, trigram_min_similarity)
+
+
+#====================================================================
+def _trigrams(text):
+    """Return the set of character trigrams of the text (padded with spaces)"""
+    padded = "  " + text + " "
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex(object):
+
+    """Character trigram inverted index of the names
+
+    It finds the names that share trigrams with the search text without
+    scoring all the names. The trigrams are taken from the cleaned lower
+    case form of the names.
+    """
+
+    def __init__(self, name_variants):
+        """Index the pairs of the names and their normalized forms"""
+        self.positions = {}
+        self._postings = {}
+        self._sizes = []
+
+        for pos, (name, forms) in enumerate(name_variants):
+            self.positions[name] = pos
+            trigrams = _trigrams(forms[3])
+            self._sizes.append(len(trigrams))
+            for trigram in trigrams:
+                self._postings.setdefault(trigram, []).append(pos)
+
+    def candidates(self, search_text, min_similarity=0):
+        """Return positions of the names similar to search_text, the most similar first
+
+        The similarity is the Dice coefficient of the trigram sets.
+        """
+        trigrams = _trigrams(_clean_non_chars(search_text).lower())
+        shared = Counter()
+        for trigram in trigrams:
+            postings = self._postings.get(trigram)
+            if postings:
+                shared.update(postings)
+
+        similarities = []
+        for pos, count in shared.items():
+            similarity = 2.0 * count / (len(trigrams) + self._sizes[pos])
+            if similarity >= min_similarity:
+                similarities.append((-similarity, pos))
+        similarities.sort()
+        return [pos for _, pos in similarities]
+
+    def candidates_many(self, search_texts, min_similarity=0):
+        """Return the candidates for each of the search texts
+
+        The same as candidates() for each text, but if NumPy is installed
+        (and vectorized_prefilter is on) the shared trigrams of all
+        the names and all the search texts are counted at once.
+        """
+        if numpy is None or not vectorized_prefilter or len(search_texts) < 2:
+            return [self.candidates(text, min_similarity) for text in search_texts]
+
+        search_trigrams = [_trigrams(_clean_non_chars(text).lower()) for text in search_texts]
+
+        # a column for each trigram of the search texts that some name has
+        columns = {}
+        for trigrams in search_trigrams:
+            for trigram in trigrams:
+                if trigram in self._postings and trigram not in columns:
+                    columns[trigram] = len(columns)
+
+        names = numpy.zeros((len(self._sizes), len(columns)), dtype=numpy.float32)
+        for trigram, column in columns.items():
+            names[self._postings[trigram], column] = 1
+        searches = numpy.zeros((len(columns), len(search_texts)), dtype=numpy.float32)
+        for i, trigrams in enumerate(search_trigrams):
+            for trigram in trigrams:
+                if trigram in columns:
+                    searches[columns[trigram], i] = 1
+
+        # the numbers of the shared trigrams: names x search texts
+        shared = names.dot(searches).astype(numpy.float64)
+        sizes = numpy.array(self._sizes, dtype=numpy.float64)
+
+        result = []
+        for i, trigrams in enumerate(search_trigrams):
+            counts = shared[:, i]
+            similarities = 2.0 * counts / (len(trigrams) + sizes)
+            positions = numpy.nonzero((counts > 0) & (similarities >= min_similarity))[0]
+            # the most similar first, then in the order of the names
+            order = numpy.lexsort((positions, -similarities[positions]))
+            result.append(positions[order].tolist())
+        return result
+
+
+#====================================================================
+class SimilarityScorer(object):
 
-                best_ratio = ratios[text_]
-                best_texts = [text_]
+    """Interface of a text similarity measure for the best match lookup"""
 
-            elif ratios[text_] == best_ratio:
-                best_texts.append(text_)
+    name = None
 
-        #best_ratio *= ratio_offset
+    def upper_bound(self, search_len, text_len):
+        """Return the maximum ratio that texts with these lengths can have"""
+        return 1.0
 
-        return best_ratio, best_texts
+    def ratio(self, search_text, text, min_ratio=0):
+        """Return the similarity of the texts from 0 (different) to 1 (equal)
+
+        If the ratio is below **min_ratio** any value below min_ratio
+        may be returned.
+        """
+        raise NotImplementedError()
+
+
+class DifflibScorer(SimilarityScorer):
+
+    """difflib.SequenceMatcher ratio (the default)"""
+
+    name = 'difflib'
+
+    def upper_bound(self, search_len, text_len):
+        """Return the same value as SequenceMatcher.real_quick_ratio()"""
+        return _calculate_ratio(min(search_len, text_len), search_len + text_len)
+
+    def ratio(self, search_text, text, min_ratio=0):
+        """Return SequenceMatcher ratio of the texts"""
+        return difflib.SequenceMatcher(None, search_text, text).ratio()
+
+
+class LevenshteinScorer(SimilarityScorer):
+
+    """1 - Levenshtein distance / length of the longest text
+
+    The distance is calculated in a band of the dynamic programming matrix
+    that is as wide as the maximum distance allowed by min_ratio,
+    so it stops early for the texts that can't match.
+    """
+
+    name = 'levenshtein'
+
+    def upper_bound(self, search_len, text_len):
+        """The distance is at least the difference of the lengths"""
+        longest = max(search_len, text_len)
+        if not longest:
+            return 1.0
+        return float(min(search_len, text_len)) / longest
+
+    def ratio(self, search_text, text, min_ratio=0):
+        """Return the Levenshtein similarity of the texts"""
+        longest = max(len(search_text), len(text))
+        if not longest:
+            return 1.0
+        max_dist = int((1 - min_ratio) * longest)
+        return 1 - float(_banded_levenshtein(search_text, text, max_dist)) / longest
+
+
+def _banded_levenshtein(text1, text2, max_dist):
+    """Return the Levenshtein distance or max_dist + 1 if it's greater than max_dist"""
+    if len(text1) > len(text2):
+        text1, text2 = text2, text1
+    len1, len2 = len(text1), len(text2)
+    too_far = max_dist + 1
+    if len2 - len1 > max_dist:
+        return too_far
+
+    previous = [j if j <= max_dist else too_far for j in range(len2 + 1)]
+    for i in range(1, len1 + 1):
+        first = max(1, i - max_dist)
+        last = min(len2, i + max_dist)
+        current = [too_far] * (len2 + 1)
+        if first == 1:
+            current[0] = i if i <= max_dist else too_far
+        row_min = current[0]
+
+        char1 = text1[i - 1]
+        for j in range(first, last + 1):
+            dist = previous[j - 1] + (char1 != text2[j - 1])
+            if previous[j] + 1 < dist:
+                dist = previous[j] + 1
+            if current[j - 1] + 1 < dist:
+                dist = current[j - 1] + 1
+            if dist > too_far:
+                dist = too_far
+            current[j] = dist
+            if dist < row_min:
+                row_min = dist
+
+        if row_min > max_dist:
+            return too_far
+        previous = current
+
+    return min(previous[len2], too_far)
+
+
+_scorers = {
+    'difflib': DifflibScorer,
+    'levenshtein': LevenshteinScorer,
+}
+
+# how find_best_control_matches scores the names (see set_similarity_backend)
+similarity_scorer = None
+use_trigram_prefilter = False
+compatible_matching = True
+
+# the minimal trigram similarity of a candidate scored with the prefilter
+trigram_min_similarity = 0.5
+
+# use NumPy (if it's installed) to find the candidates of many search texts
+vectorized_prefilter = True
+
+
+def set_similarity_backend(scorer=None, prefilter=None, compatible=None):
+    """Choose how find_best_control_matches scores the names
+
+    * **scorer** "difflib" (default), "levenshtein" or a SimilarityScorer instance
+    * **prefilter** None (score all the names) or "trigram" to score only
+      the names with trigram similarity of at least trigram_min_similarity
+      to the search text (found with a character trigram index)
+    * **compatible** if True the result is always the same as with the difflib
+      scoring of all the names, the scorer is not used. By default it's True
+      unless the prefilter is chosen.
+
+    The prefilter is opt-in because it changes the results: a name which
+    shares few trigrams with the search text is not found even if difflib
+    would match it (e.g. "OK" for "O.K." or a short search text for a long
+    name). In exchange a lookup in a dialog with thousands of controls is
+    several times faster. The prefilter can't be used in the compatible
+    mode: no bound derived from the trigrams guarantees the difflib result,
+    and scoring the most similar names first doesn't make the full scan
+    faster.
+    """
+    global similarity_scorer, use_trigram_prefilter, compatible_matching
+
+    if scorer is None:
+        scorer = 'difflib'
+    if isinstance(scorer, six.string_types):
+        if scorer not in _scorers:
+            raise ValueError('Unknown similarity scorer "{0}"'.format(scorer))
+        scorer = _scorers[scorer]()
+    elif not isinstance(scorer, SimilarityScorer):
+        raise TypeError('scorer should be a name or a SimilarityScorer instance')
+
+    if prefilter not in (None, 'trigram'):
+        raise ValueError('Unknown prefilter "{0}"'.format(prefilter))
+    if compatible is None:
+        compatible = prefilter is None
+    if compatible and prefilter is not None:
+        raise ValueError('The "{0}" prefilter can\'t be used in the compatible mode'.format(prefilter))
+
+    similarity_scorer = scorer
+    use_trigram_prefilter = prefilter == 'trigram'
+    compatible_matching = compatible
+
+
+#====================================================================
+# the attributes of the element infos read to name the controls,
+# they are fetched in bulk if the back-end can do it
+naming_attributes = ('class_name', 'control_type', 'rich_text', 'visible', 'rectangle')
+
+
+def _prefetch_naming_attributes(controls, attributes=naming_attributes):
+    """Read the attributes of the controls at once (see ElementInfo.prefetch)
+
+    The element infos with the cache disabled keep the values
+    until the returned function is called.
+    """
+    element_infos = [ctrl.element_info for ctrl in controls
+                     if hasattr(ctrl, 'naming_snapshot') and hasattr(ctrl, 'element_info')]
+    if not element_infos or not getattr(element_infos[0], 'bulk_prefetch', False):
+        return lambda: None
+
+    uncached = [info for info in element_infos if not info.cache_enabled]
+    for info in uncached:
+        info.set_cache_strategy(cached=True)
+    type(element_infos[0]).prefetch(element_infos, attributes)
+
+    def release():
+        """Disable the caches enabled for the naming"""
+        for info in uncached:
+            info.set_cache_strategy(cached=False)
+    return release
+
+
+def _naming_snapshots(controls):
+    """Return the snapshots of the controls properties used for naming
+
+    See BaseWrapper.naming_snapshot, controls which can't make
+    a snapshot are used as is. The properties are prefetched
+    in bulk if the back-end of the controls can do it.
+    """
+    release = _prefetch_naming_attributes(controls)
+    try:
+        return [ctrl.naming_snapshot() if hasattr(ctrl, 'naming_snapshot') else ctrl
+                for ctrl in controls]
+    finally:
+        release()
 
 
 #====================================================================
@@ -463,24 +1308,461 @@ def build_unique_dict(controls):
     """
     name_control_map = UniqueDict()
 
-    # get the visible text controls so that we can get
+    # take the properties of the controls once for the whole naming
+    snapshots = _naming_snapshots(controls)
+
+    # the labels of the same dialog could be found already (see set_names_cache)
+    signature = None
+    stored = None
+    if names_cache is not None:
+        signature = _dialog_signature(
+            controls, snapshots, [_naming_signature(snapshot) for snapshot in snapshots])
+        stored = names_cache.get(signature)
+
+    # index the visible text controls so that we can get
     # the closest text if the control has no text
-    text_ctrls = [ctrl_ for ctrl_ in controls
-                  if ctrl_.can_be_label and ctrl_.is_visible() and ctrl_.window_text()]
+    labels = None
+    if stored is None:
+        labels = LabelIndex(snapshots)
 
     # collect all the possible names for all controls
     # and build a list of them
-    for ctrl in controls:
-        ctrl_names = get_control_names(ctrl, controls, text_ctrls)
+    all_labels = []
+    for i, (ctrl, snapshot) in enumerate(zip(controls, snapshots)):
+        if stored is None:
+            ctrl_labels = _control_labels(snapshot, snapshots, labels)
+        else:
+            ctrl_labels = stored[i]
+        all_labels.append(ctrl_labels)
 
         # for each of the names
-        for name in ctrl_names:
+        for name in get_control_names(snapshot, snapshots, labels, ctrl_labels):
             name_control_map[name] = ctrl
+
+    if signature is not None and stored is None:
+        names_cache.set(signature, all_labels)
+
+    _count_naming(controls, snapshots)
     return name_control_map
 
 
+def _key_layout(name_control_map, controls):
+    """Return the unique names and the position of the control of each one"""
+    positions = dict((id(ctrl), i) for i, ctrl in reversed(list(enumerate(controls))))
+    keys = tuple(name_control_map)
+    return keys, tuple(positions[id(name_control_map[name])] for name in keys)
+
+
+#====================================================================
+def _element_identity(element):
+    """Return a hashable identity of the element (or wrapper) or None
+
+    The native handle is used if there is one, otherwise the runtime id
+    (UI Automation elements). None means that the element can't be
+    recognized again later.
+    """
+    element_info = getattr(element, 'element_info', element)
+    try:
+        handle = element_info.handle
+        if handle:
+            return handle
+        runtime_id = element_info.runtime_id
+    except Exception:
+        # no such attribute or the element already doesn't exist
+        return None
+    if runtime_id:
+        return tuple(runtime_id)
+    return None
+
+
+def _naming_signature(ctrl):
+    """Return the control properties that its names are built from"""
+    friendly_class_name = ctrl.friendly_class_name()
+    text = ctrl.window_text()
+    rect = ctrl.rectangle()
+
+    texts = None
+    if ctrl.has_title and not text and friendly_class_name != 'TreeView':
+        try:
+            texts = tuple(ctrl.texts()[1:])
+        except Exception:
+            pass
+
+    return (friendly_class_name,
+            text,
+            ctrl.is_visible(),
+            (rect.left, rect.top, rect.right, rect.bottom),
+            texts)
+
+
+#====================================================================
+# the version of the labels stored in ControlNamesCache, increase it
+# when the naming changes to not use the labels stored before
+_names_cache_version = 2
+
+
+def _control_id(ctrl):
+    """Return the control id of the control or None if it has no id"""
+    try:
+        return ctrl.element_info.control_id
+    except Exception:
+        return None
+
+
+def _dialog_signature(controls, snapshots, signatures):
+    """Return the hash of the structure of the dialog that its labels depend on
+
+    * **signatures** the naming signatures of the snapshots of the controls
+
+    The structure is the friendly class name, the control id and the
+    rectangle of each control with the flags which decide if it can label
+    other controls (visible, has some text). The texts themselves are not
+    part of it. The rectangles are taken relative to the first control
+    as the labels don't depend on the position of the dialog.
+    """
+    left, top = 0, 0
+    if signatures:
+        left, top = signatures[0][3][:2]
+
+    release = _prefetch_naming_attributes(controls, ('control_id', ))
+    try:
+        control_ids = [_control_id(ctrl) for ctrl in controls]
+    finally:
+        release()
+
+    parts = [_names_cache_version]
+    for ctrl, control_id, (friendly_class_name, text, visible, rect, _) in \
+            zip(snapshots, control_ids, signatures):
+        parts.append((friendly_class_name, control_id,
+                      (rect[0] - left, rect[1] - top, rect[2] - left, rect[3] - top),
+                      visible, bool(text), bool(ctrl.can_be_label), bool(ctrl.has_title)))
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+class ControlNamesCache(object):
+
+    """On-disk cache of the labels of the dialog controls
+
+    Finding the nearest label of each control without text is the costly
+    part of the naming. The cache stores which controls label which under
+    the structural signature of the dialog (see :func:`_dialog_signature`):
+    the friendly class names, control ids and relative rectangles of the
+    controls. The names are built from the current texts of the controls
+    and the stored labels, so no control texts are written to the database
+    and a dialog with other texts but the same layout uses the same entry.
+    The oldest entries are removed when there are more than **max_entries**.
+
+    It can be shared between processes (e.g. parallel test runs).
+    """
+
+    def __init__(self, path, max_entries=10000):
+        """Open (or create) the database at **path**"""
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS control_labels ("
+                "signature TEXT PRIMARY KEY, labels TEXT NOT NULL)")
+
+    def get(self, signature):
+        """Return the label positions of each control (see :func:`_control_labels`) or None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT labels FROM control_labels WHERE signature = ?",
+                (signature, )).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return [None if ctrl_labels is None else tuple(ctrl_labels)
+                for ctrl_labels in json.loads(row[0])]
+
+    def set(self, signature, labels):
+        """Store the labels of the controls of a dialog
+
+        * **labels** the label positions of each control (see :func:`_control_labels`)
+        """
+        value = json.dumps([None if ctrl_labels is None else list(ctrl_labels)
+                            for ctrl_labels in labels])
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO control_labels (signature, labels) VALUES (?, ?)",
+                (signature, value))
+            self._connection.execute(
+                "DELETE FROM control_labels WHERE rowid IN (SELECT rowid FROM control_labels "
+                "ORDER BY rowid DESC LIMIT -1 OFFSET ?)", (self.max_entries, ))
+
+    def __len__(self):
+        """Return the number of the stored dialogs"""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM control_labels").fetchone()[0]
+
+    def clear(self):
+        """Remove all the stored labels"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM control_labels")
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._connection.close()
+
+    def stats(self):
+        """Return a dictionary with the number of entries, hits and misses"""
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses}
+
+
+# the cache of the control names used by build_unique_dict and NameIndex
+names_cache = None
+
+
+def set_names_cache(path=None, max_entries=10000):
+    """Store the labels of the dialog controls in the file at **path**
+
+    The next time a dialog with the same layout (see ControlNamesCache)
+    is named, even by another process, the labels of the controls are
+    taken from the file. Pass None to stop using the cache.
+    """
+    global names_cache
+    if names_cache is not None:
+        names_cache.close()
+        names_cache = None
+    if path is not None:
+        names_cache = ControlNamesCache(path, max_entries)
+
+
+#====================================================================
+def _weak_ref(obj):
+    """Return a weak reference to the object (a strong one if it's not possible)"""
+    try:
+        return weakref.ref(obj)
+    except TypeError:
+        return lambda: obj
+
+
+class NameIndex(object):
+
+    """Persistent names of the controls of one dialog
+
+    The names of every control are kept between the lookups together
+    with the normalized (lower case and cleaned) forms of the unique names.
+    Call :func:`refresh` with the current list of the dialog controls
+    before using it. Every refresh reads the naming properties of all
+    the controls (text, class, rectangle and visibility, prefetched in bulk
+    if the back-end can do it) but only the controls whose properties
+    have changed are renamed (and the controls that can be named after them).
+    If the dialog has other controls (by their handles or runtime ids)
+    all the controls are renamed.
+
+    The index keeps no references to the controls after the lookup.
+    """
+
+    def __init__(self):
+        """Create an empty index"""
+        self._identities = None
+        self._signatures = []
+        self._names = []
+        self._variants = {}
+        self._trigram_index = None
+        self._keys = ()
+        self._key_controls = ()
+        self._controls = []
+
+        # number of controls renamed by the last refresh
+        self.renamed = 0
+
+    @property
+    def name_control_map(self):
+        """The unique names of the controls passed to the last refresh"""
+        controls = [ref() for ref in self._controls]
+        if any(ctrl is None for ctrl in controls):
+            # the controls don't exist anymore
+            return UniqueDict()
+        return UniqueDict.from_layout(self._keys, [controls[i] for i in self._key_controls])
+
+    def refresh(self, controls):
+        """Bring the index up to date with the controls of the dialog
+
+        Read the naming properties of the controls, rename the changed
+        controls and return the name_control_map.
+        """
+        identities = [_element_identity(ctrl) for ctrl in controls]
+        identified = None not in identities and len(set(identities)) == len(identities)
+        self._controls = [_weak_ref(ctrl) for ctrl in controls]
+
+        snapshots = _naming_snapshots(controls)
+        signatures = [_naming_signature(snapshot) for snapshot in snapshots]
+
+        if identities != self._identities or not identified:
+            # the set of controls (or their order) has changed
+            # so all the names need to be rebuilt
+            dirty = set(range(len(controls)))
+            self._names = [None] * len(controls)
+        else:
+            dirty = set()
+            labels_changed = False
+            for i, (old_sig, new_sig) in enumerate(zip(self._signatures, signatures)):
+                if old_sig == new_sig:
+                    continue
+                dirty.add(i)
+                # the next control may be named after this one
+                if i + 1 < len(controls):
+                    dirty.add(i + 1)
+                if controls[i].can_be_label and \
+                        (self._is_label(old_sig) or self._is_label(new_sig)):
+                    labels_changed = True
+
+            if labels_changed:
+                # all controls without own text may get another label
+                for i, (ctrl, sig) in enumerate(zip(controls, signatures)):
+                    if not (sig[1] and ctrl.has_title):
+                        dirty.add(i)
+
+        self._identities = identities
+        self._signatures = signatures
+        self.renamed = len(dirty)
+
+        # the labels of the whole dialog could be found already (see set_names_cache)
+        stored = None
+        signature = None
+        if names_cache is not None and dirty and len(dirty) == len(controls):
+            signature = _dialog_signature(controls, snapshots, signatures)
+            stored = names_cache.get(signature)
+
+        if dirty:
+            labels = None
+            if stored is None:
+                labels = LabelIndex(snapshots, [ctrl for ctrl, sig in zip(snapshots, signatures)
+                                                if ctrl.can_be_label and self._is_label(sig)])
+            all_labels = []
+            for i in sorted(dirty):
+                if stored is None:
+                    ctrl_labels = _control_labels(snapshots[i], snapshots, labels)
+                else:
+                    ctrl_labels = stored[i]
+                all_labels.append(ctrl_labels)
+                self._names[i] = get_control_names(snapshots[i], snapshots, labels, ctrl_labels)
+            self._trigram_index = None
+
+            if signature is not None and stored is None:
+                names_cache.set(signature, all_labels)
+
+        # the wrappers may be new objects even if the controls are the same
+        # so map the names to the current wrappers every time
+        if dirty:
+            name_control_map = UniqueDict()
+            for ctrl, ctrl_names in zip(controls, self._names):
+                for name in ctrl_names:
+                    name_control_map[name] = ctrl
+
+            self._keys, self._key_controls = _key_layout(name_control_map, controls)
+        else:
+            name_control_map = UniqueDict.from_layout(
+                self._keys, [controls[i] for i in self._key_controls])
+
+        if dirty:
+            variants = OrderedDict()
+            for name in name_control_map:
+                if name in self._variants:
+                    variants[name] = self._variants[name]
+                else:
+                    variants[name] = _name_variants(name)
+            self._variants = variants
+
+        _count_naming(controls, snapshots)
+        return name_control_map
+
+    @staticmethod
+    def _is_label(signature):
+        """Check if a control with this signature can label other controls"""
+        return bool(signature[2] and signature[1])
+
+    def name_variants(self):
+        """Return pairs of each unique name and its precomputed normalized forms"""
+        return list(self._variants.items())
+
+    def trigram_index(self):
+        """Return the TrigramIndex of the names (built once for the same names)"""
+        if self._trigram_index is None:
+            self._trigram_index = TrigramIndex(self.name_variants())
+        return self._trigram_index
+
+
+name_index_cache_size = 32
+_name_indexes = OrderedDict()
+
+
+def get_name_index(element, scope=None):
+    """Return the persistent :class:`NameIndex` for the children of element
+
+    * **element** the dialog (an ElementInfo or a wrapper) whose controls are indexed
+    * **scope** any hashable value that distinguishes different sets of controls
+      of the same dialog (e.g. the search criteria used to collect them)
+
+    Returns None if the element can't be identified. Only the
+    ``name_index_cache_size`` most recently used indexes are kept
+    (the indexes keep the names, not the controls).
+    """
+    identity = _element_identity(element)
+    if identity is None:
+        return None
+
+    key = (identity, scope)
+    name_index = _name_indexes.pop(key, None)
+    if name_index is None:
+        name_index = NameIndex()
+        while len(_name_indexes) >= name_index_cache_size:
+            _name_indexes.popitem(last=False)
+    _name_indexes[key] = name_index
+    return name_index
+
+
+def clear_name_indexes():
+    """Forget all the persistent name indexes"""
+    _name_indexes.clear()
+
+
 #====================================================================
-def find_best_control_matches(search_text, controls):
+def _prepare_scoring(controls, name_index):
+    """Return the name_control_map, name variants and prefilter of the controls"""
+    if name_index is None:
+        name_control_map = build_unique_dict(controls)
+        name_variants = name_control_map.name_variants()
+    else:
+        name_control_map = name_index.refresh(controls)
+        name_variants = name_index.name_variants()
+
+    prefilter = None
+    if use_trigram_prefilter and not compatible_matching:
+        if name_index is None:
+            prefilter = TrigramIndex(name_variants)
+        else:
+            prefilter = name_index.trigram_index()
+
+    return name_control_map, name_variants, prefilter
+
+
+def _name_positions(name_variants, prefilter):
+    """Return a map from the names to their positions"""
+    if prefilter is not None:
+        return prefilter.positions
+    return dict((name, i) for i, (name, _) in enumerate(name_variants))
+
+
+# the number of the best ranked controls kept by MatchError
+# raised from find_best_control_matches (0 to not rank them)
+match_error_near_misses = 3
+
+
+def find_best_control_matches(search_text, controls, name_index=None):
     """Returns the control that is the the best match to search_text
 
     This is slightly differnt from find_best_match in that it builds
@@ -491,49 +1773,118 @@ def find_best_control_matches(search_text, controls):
 
     But if there is a ListView (which do not have visible 'text')
     then it will just add "ListView".
-    """
-    name_control_map = build_unique_dict(controls)
 
-#    # collect all the possible names for all controls
-#    # and build a list of them
-#    for ctrl in controls:
-#        ctrl_names = get_control_names(ctrl, controls)
-#
-#        # for each of the names
-#        for name in ctrl_names:
-#            name_control_map[name] = ctrl
+    If a **name_index** (see :func:`get_name_index`) is passed the names
+    are taken from it instead of being rebuilt from scratch.
 
+    The MatchError raised if there is no match has the near_misses
+    attribute with the best ranked controls (see :func:`rank_controls`).
+    """
     search_text = six.text_type(search_text)
 
-    best_ratio, best_texts = name_control_map.FindBestMatches(search_text)
+    def lookup(name_control_map, name_variants, prefilter):
+        """Return the best controls or MatchError"""
+        ranks = None
+        if match_error_near_misses:
+            ranks = _RankedControls(match_error_near_misses, name_control_map,
+                                    _name_positions(name_variants, prefilter))
+
+        # score all the variants in a single pass over the names
+        results = _score_variants(
+            search_text, name_variants, prefilter=prefilter,
+            scorer=similarity_scorer, compatible=compatible_matching, ranks=ranks)
+        return _best_controls(search_text, results, name_control_map, ranks)
+
+    matches = lookup(*_prepare_scoring(controls, name_index))
+    if isinstance(matches, MatchError):
+        raise matches
+    return matches
+
+
+def _best_controls(search_text, results, name_control_map, ranks):
+    """Return the best controls for the variant results or a MatchError"""
+    # an earlier variant wins if the ratios are equal
+    best_ratio, best_texts = results[0]
+    for ratio, texts in results[1:]:
+        if ratio > best_ratio:
+            best_ratio = ratio
+            best_texts = texts
 
-    best_ratio_ci, best_texts_ci = \
-        name_control_map.FindBestMatches(search_text, ignore_case = True)
+    if best_ratio < find_best_control_match_cutoff:
+        return MatchError(items=name_control_map.keys(), tofind=search_text,
+                          near_misses=ranks.matches() if ranks else None)
 
-    best_ratio_clean, best_texts_clean = \
-        name_control_map.FindBestMatches(search_text, clean = True)
+    return [name_control_map[best_text] for best_text in best_texts]
 
-    best_ratio_clean_ci, best_texts_clean_ci = \
-        name_control_map.FindBestMatches(
-            search_text, clean = True, ignore_case = True)
 
+def match_many(search_texts, controls, name_index=None):
+    """Find the best matching controls for each of the search texts
 
-    if best_ratio_ci > best_ratio:
-        best_ratio = best_ratio_ci
-        best_texts = best_texts_ci
+    The controls are named only once for all the search texts and,
+    if the trigram prefilter is on (see :func:`set_similarity_backend`),
+    the candidates of all the search texts are found in one batch
+    (vectorized with NumPy if it's installed).
 
-    if best_ratio_clean > best_ratio:
-        best_ratio = best_ratio_clean
-        best_texts = best_texts_clean
+    Returns a list with an item for each search text: the same list of
+    controls as find_best_control_matches returns or the MatchError
+    it would raise (the error is returned, not raised).
+    """
+    search_texts = [six.text_type(search_text) for search_text in search_texts]
 
-    if best_ratio_clean_ci > best_ratio:
-        best_ratio = best_ratio_clean_ci
-        best_texts = best_texts_clean_ci
+    def lookup(name_control_map, name_variants, prefilter):
+        """Return the best controls or MatchError for each of the search texts"""
+        if prefilter is not None:
+            all_candidates = _prefilter_candidates(prefilter, search_texts)
+        else:
+            all_candidates = [None] * len(search_texts)
 
-    if best_ratio < find_best_control_match_cutoff:
-        raise MatchError(items = name_control_map.keys(), tofind = search_text)
+        positions = None
+        if match_error_near_misses:
+            positions = _name_positions(name_variants, prefilter)
 
-    return [name_control_map[best_text] for best_text in best_texts]
+        matches = []
+        for search_text, candidates in zip(search_texts, all_candidates):
+            ranks = None
+            if match_error_near_misses:
+                ranks = _RankedControls(match_error_near_misses, name_control_map, positions)
+
+            results = _score_variants(
+                search_text, name_variants, prefilter=prefilter,
+                scorer=similarity_scorer, compatible=compatible_matching, ranks=ranks,
+                candidates=candidates)
+            matches.append(_best_controls(search_text, results, name_control_map, ranks))
+        return matches
+
+    return lookup(*_prepare_scoring(controls, name_index))
+
+
+def rank_controls(search_text, controls, k=5, name_index=None):
+    """Return the k controls best matching search_text
+
+    The controls are named and scored the same way as by
+    :func:`find_best_control_matches` but the ratio of each control is
+    the ratio of its best name, even if it's below the cutoff. All
+    the controls are ranked in one pass so an ambiguous or failed lookup
+    can be resolved without searching again.
+
+    Returns the list of RankedMatch (control, name, score, variant),
+    the best first. The variant is the (clean, ignore_case) normalization
+    of the name that matched, the equally scored controls are ordered by
+    the variant and then by the order of the names.
+    """
+    if k < 1:
+        raise ValueError('k should be a positive number')
+    search_text = six.text_type(search_text)
+
+    def lookup(name_control_map, name_variants, prefilter):
+        """Return the ranked controls"""
+        ranks = _RankedControls(k, name_control_map, _name_positions(name_variants, prefilter))
+        _score_variants(
+            search_text, name_variants, prefilter=prefilter,
+            scorer=similarity_scorer, compatible=compatible_matching, ranks=ranks)
+        return ranks.matches()
+
+    return lookup(*_prepare_scoring(controls, name_index))
 
 
 #
@@ -33,14 +33,34 @@
 from __future__ import unicode_literals
 
 import re
+import sys
+import time
 import ctypes
+import bisect
+import itertools
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
 import six
 
-from . import win32functions
-from . import win32structures
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
 from . import findbestmatch
-from . import controls
 from .backend import registry
+from .element_info import ElementInfo
+from .base_wrapper import InvalidElement
+if sys.platform == 'win32':
+    # the searches of the back-ends which need no win32
+    # (e.g. pywinauto.simulated) work on the other platforms
+    from . import win32functions
+    from . import win32structures
+    from . import controls
+    # the errors of the wrappers of the elements which have disappeared
+    _invalid_element_errors = (controls.InvalidWindowHandle, InvalidElement)
+else:
+    _invalid_element_errors = (InvalidElement, )
 
 
 # TODO: we should filter out invalid elements before returning
@@ -81,23 +101,7 @@ def find_element(**kwargs):
     Calls find_elements with exactly the same arguments as it is called with
     so please see :py:func:`find_elements` for the full parameters description.
     """
-    elements = find_elements(**kwargs)
-
-    if not elements:
-        raise ElementNotFoundError(kwargs)
-
-    if len(elements) > 1:
-        exception = ElementAmbiguousError(
-            "There are {0} elements that match the criteria {1}".format(
-                len(elements),
-                six.text_type(kwargs),
-            )
-        )
-
-        exception.elements = elements
-        raise exception
-
-    return elements[0]
+    return _only_element(SearchCriteria(**kwargs).iter_elements(), kwargs)
 
 
 #=========================================================================
@@ -166,118 +170,478 @@ def find_elements(class_name=None,
     * **framework_id**   Elements with this framework id (for UIAutomation elements)
     * **backend**        Back-end name to use while searching (default=None means current active backend)
     """
+    return SearchCriteria(class_name=class_name,
+                          class_name_re=class_name_re,
+                          parent=parent,
+                          process=process,
+                          title=title,
+                          title_re=title_re,
+                          top_level_only=top_level_only,
+                          visible_only=visible_only,
+                          enabled_only=enabled_only,
+                          best_match=best_match,
+                          handle=handle,
+                          ctrl_index=ctrl_index,
+                          found_index=found_index,
+                          predicate_func=predicate_func,
+                          active_only=active_only,
+                          control_id=control_id,
+                          control_type=control_type,
+                          auto_id=auto_id,
+                          framework_id=framework_id,
+                          backend=backend).find_elements()
 
-    if backend is None:
-        backend = registry.active_backend.name
-    backend_obj = registry.backends[backend]
-
-    # allow a handle to be passed in
-    # if it is present - just return it
-    if handle is not None:
-        return [backend_obj.element_info_class(handle), ]
-
-    if isinstance(parent, backend_obj.generic_wrapper_class):
-        parent = parent.element_info
-    elif isinstance(parent, six.integer_types):
-        # check if parent is a handle of element (in case of searching native controls)
-        parent = backend_obj.element_info_class(parent)
-
-    if top_level_only:
-        # find the top level elements
-        element = backend_obj.element_info_class()
-        elements = element.children(process=process,
-                                    class_name=class_name,
-                                    title=title,
-                                    control_type=control_type,
-                                    cache_enable=True)
-
-        # if we have been given a parent
-        if parent:
-            elements = [elem for elem in elements if elem.parent == parent]
-
-    # looking for child elements
-    else:
-        # if not given a parent look for all children of the desktop
-        if not parent:
-            parent = backend_obj.element_info_class()
-
-        # look for ALL children of that parent
-        elements = parent.descendants(class_name=class_name,
-                                      title=title,
-                                      control_type=control_type,
-                                      cache_enable=True)
-
-        # if the ctrl_index has been specified then just return
-        # that control
-        if ctrl_index is not None:
-            return [elements[ctrl_index], ]
-
-    # early stop
-    if not elements:
-        return elements
-
-    if framework_id is not None and elements:
-        elements = [elem for elem in elements if elem.framework_id == framework_id]
-
-    if control_id is not None and elements:
-        elements = [elem for elem in elements if elem.control_id == control_id]
-
-    if active_only:
-        # TODO: re-write to use ElementInfo interface
-        gui_info = win32structures.GUITHREADINFO()
-        gui_info.cbSize = ctypes.sizeof(gui_info)
-
-        # get all the active elements (not just the specified process)
-        ret = win32functions.GetGUIThreadInfo(0, ctypes.byref(gui_info))
-
-        if not ret:
-            raise ctypes.WinError()
-
-        found_active = False
-        for elem in elements:
-            if elem.handle == gui_info.hwndActive:
-                found_active = True
-                elements = [elem, ]
+
+#=========================================================================
+# The estimated cost of checking a criterion for an element: the number of
+# the cross process queries. The handle is known without queries, the text
+# may need a message to the window (and the regular expression), the cost
+# of the user's predicate is unknown so it's checked the last.
+criteria_costs = {
+    'active_only': 0,
+    'framework_id': 1,
+    'control_id': 1,
+    'class_name': 1,
+    'class_name_re': 1,
+    'process': 1,
+    'auto_id': 1,
+    'visible_only': 1,
+    'enabled_only': 1,
+    'title': 2,
+    'title_re': 2,
+    'predicate_func': 10,
+}
+
+# The attributes of the elements checked by the criteria: they are read
+# in bulk if the back-end can do it (see ElementInfo.prefetch)
+criteria_attributes = {
+    'framework_id': 'framework_id',
+    'control_id': 'control_id',
+    'class_name': 'class_name',
+    'class_name_re': 'class_name',
+    'process': 'process_id',
+    'auto_id': 'automation_id',
+    'visible_only': 'visible',
+    'enabled_only': 'enabled',
+    'title': 'rich_text',
+    'title_re': 'rich_text',
+}
+
+# The number of the elements which attributes are read at once
+prefetch_batch = 100
+
+
+#=========================================================================
+# The number of threads searching the subtrees of the top level windows
+# when all the descendants of the desktop are searched (1 - serial search)
+search_threads = 1
+
+
+def set_search_threads(threads):
+    """
+    Set the number of threads searching the descendants of the desktop
+
+    The subtrees of the top level windows are searched in parallel when
+    find_elements is called with top_level_only=False and without parent.
+    The elements are returned in the same order as by the serial search.
+    The predicate_func is called from these threads too.
+    Only the back-ends with thread safe elements (win32 and simulated)
+    are searched in parallel, the UIA elements are searched serially.
+    """
+    global search_threads
+    if not isinstance(threads, six.integer_types):
+        raise TypeError("threads must be an integer: {0!r}".format(threads))
+    if threads < 1:
+        raise ValueError("threads must be a positive number: {0}".format(threads))
+    search_threads = threads
+
+
+#=========================================================================
+def _active_window_handle():
+    """Return the handle of the active window (of any process)"""
+    # TODO: re-write to use ElementInfo interface
+    gui_info = win32structures.GUITHREADINFO()
+    gui_info.cbSize = ctypes.sizeof(gui_info)
+
+    ret = win32functions.GetGUIThreadInfo(0, ctypes.byref(gui_info))
+
+    if not ret:
+        raise ctypes.WinError()
+    return gui_info.hwndActive
+
+
+#=========================================================================
+def _match_elements(elements, predicates):
+    """Yield the elements passing all the predicates (the cheapest are checked first)"""
+    for elem in elements:
+        for predicate in predicates:
+            if not predicate(elem):
                 break
-        if not found_active:
-            elements = []
+        else:
+            yield elem
 
-    if class_name is not None:
-        elements = [elem for elem in elements if elem.class_name == class_name]
 
-    if class_name_re is not None:
-        class_name_regex = re.compile(class_name_re)
-        elements = [elem for elem in elements if class_name_regex.match(elem.class_name)]
+#=========================================================================
+def _iter_prefetched(elements, attributes):
+    """
+    Yield the elements with the attributes read in batches
 
-    if process is not None:
-        elements = [elem for elem in elements if elem.process_id == process]
+    The attributes of prefetch_batch elements are read at once
+    if the back-end of the elements can do it in bulk (see ElementInfo.prefetch),
+    otherwise they are read by the checks as usual.
+    """
+    elements = iter(elements)
+    while True:
+        batch = list(itertools.islice(elements, prefetch_batch))
+        if not batch:
+            return
+        if attributes and batch[0].bulk_prefetch:
+            type(batch[0]).prefetch(batch, attributes)
+        for elem in batch:
+            yield elem
 
-    if auto_id is not None and elements:
-        elements = [elem for elem in elements if elem.automation_id == auto_id]
 
-    if title is not None:
-        # TODO: some magic is happenning here
-        if elements:
-            elements[0].rich_text
-        elements = [elem for elem in elements if elem.rich_text == title]
-    elif title_re is not None:
-        title_regex = re.compile(title_re)
+#=========================================================================
+def _iter_parallel_matches(root, pushed_down, predicates, threads, candidates, attributes=()):
+    """
+    Yield the descendants of root passing all the predicates
+
+    The subtrees of the children of root (the top level windows) are
+    searched by a pool of threads. The matches are yielded in the order
+    of the children (z-order) and then in the order of each subtree,
+    the same as the descendants of root are enumerated.
+    The number of the checked elements is added to candidates[0].
+    The attributes of the elements are prefetched for the predicates.
+    The elements of root must be thread safe (see ElementInfo.thread_safe).
+    """
+    windows = root.children(cache_enable=True)
+    if not windows:
+        return
+
+    def search_subtree(window):
+        """Return the number of the elements and the matching elements of the window subtree"""
+        elements = window.descendants(**pushed_down)
+        # a window itself is a candidate if it meets the criteria of the enumeration
+        if window.enumerated_by(**pushed_down):
+            elements.insert(0, window)
+        matches = _match_elements(_iter_prefetched(elements, attributes), predicates)
+        return len(elements), list(matches)
+
+    pool = ThreadPool(min(threads, len(windows)))
+    try:
+        for count, matches in pool.imap(search_subtree, windows):
+            candidates[0] += count
+            for elem in matches:
+                yield elem
+    finally:
+        pool.terminate()
 
-        def _title_match(w):
-            """Match a window title to the regexp"""
-            t = w.rich_text
-            if t is not None:
-                return title_regex.match(t)
-            return False
-        elements = [elem for elem in elements if _title_match(elem)]
 
-    if visible_only:
-        elements = [elem for elem in elements if elem.visible]
+#=========================================================================
+def _hashable(value):
+    """Return the value or its identity if the value can't be hashed"""
+    try:
+        hash(value)
+    except TypeError:
+        return ('id', id(value))
+    return value
+
+
+#=========================================================================
+class SearchCriteria(Mapping):
+
+    """
+    The criteria of :py:func:`find_elements` compiled for many searches
+
+    The criteria names are checked, the regular expressions are compiled
+    and the checks of the elements are ordered by cost (see criteria_costs)
+    once, so the same search repeated many times (e.g. while waiting for
+    a window) only enumerates and checks the elements::
+
+        criteria = SearchCriteria(class_name_re='#32770', title_re='Save.*')
+        dialogs = criteria.find_elements()
+
+    The criteria are a read-only mapping of the given names to the values
+    (the values equal to the defaults of find_elements are omitted).
+    They are hashable, so equal criteria can be used as a key of a dict.
+    """
 
-    if enabled_only:
-        elements = [elem for elem in elements if elem.enabled]
+    # the criteria of find_elements with their default values
+    defaults = {
+        'class_name': None,
+        'class_name_re': None,
+        'parent': None,
+        'process': None,
+        'title': None,
+        'title_re': None,
+        'top_level_only': True,
+        'visible_only': True,
+        'enabled_only': False,
+        'best_match': None,
+        'handle': None,
+        'ctrl_index': None,
+        'found_index': None,
+        'predicate_func': None,
+        'active_only': False,
+        'control_id': None,
+        'control_type': None,
+        'auto_id': None,
+        'framework_id': None,
+        'backend': None,
+    }
+
+    def __init__(self, **criteria):
+        """Check and compile the criteria (see :py:func:`find_elements`)"""
+        for name in criteria:
+            if name not in self.defaults:
+                raise TypeError("Unknown search criterion: '{0}'".format(name))
+
+        self._criteria = dict((name, value) for name, value in criteria.items()
+                              if value is not self.defaults[name])
+        self._key = tuple(sorted((name, _hashable(value))
+                                 for name, value in self._criteria.items()))
+        self._compile(**dict(self.defaults, **criteria))
+
+    def _compile(self, class_name, class_name_re, parent, process, title, title_re,
+                 top_level_only, visible_only, enabled_only, best_match, handle,
+                 ctrl_index, found_index, predicate_func, active_only, control_id,
+                 control_type, auto_id, framework_id, backend):
+        """Build the ordered checks of the elements for the criteria"""
+        self._values = dict(self.defaults, **self._criteria)
+
+        # the criteria which can be checked by the back-end while enumerating
+        self._pushed_down = dict(process=process,
+                                 class_name=class_name,
+                                 title=title,
+                                 control_type=control_type,
+                                 cache_enable=True)
+
+        # names of the controls are kept between the lookups
+        # for the same parent and the same set of the criteria
+        self._name_scope = (top_level_only, class_name, class_name_re, process,
+                            title, title_re, visible_only, enabled_only, active_only,
+                            control_id, control_type, auto_id, framework_id)
+
+        checks = []
+        if framework_id is not None:
+            checks.append(('framework_id', lambda elem: elem.framework_id == framework_id))
+
+        if control_id is not None:
+            checks.append(('control_id', lambda elem: elem.control_id == control_id))
+
+        if active_only:
+            # the active window is checked at the search time
+            checks.append(('active_only', None))
+
+        if class_name is not None:
+            checks.append(('class_name', lambda elem: elem.class_name == class_name))
+
+        if class_name_re is not None:
+            class_name_regex = re.compile(class_name_re)
+            checks.append(('class_name_re', lambda elem: class_name_regex.match(elem.class_name)))
+
+        if process is not None:
+            checks.append(('process', lambda elem: elem.process_id == process))
+
+        if auto_id is not None:
+            checks.append(('auto_id', lambda elem: elem.automation_id == auto_id))
+
+        if title is not None:
+            checks.append(('title', lambda elem: elem.rich_text == title))
+        elif title_re is not None:
+            title_regex = re.compile(title_re)
+
+            def _title_match(w):
+                """Match a window title to the regexp"""
+                t = w.rich_text
+                if t is not None:
+                    return title_regex.match(t)
+                return False
+            checks.append(('title_re', _title_match))
+
+        if visible_only:
+            checks.append(('visible_only', lambda elem: elem.visible))
+
+        if enabled_only:
+            checks.append(('enabled_only', lambda elem: elem.enabled))
+
+        if best_match is None and predicate_func is not None:
+            def _predicate(elem):
+                """Check the element as it's returned (not cached)"""
+                elem.set_cache_strategy(cached=False)
+                return predicate_func(elem)
+            checks.append(('predicate_func', _predicate))
+
+        # the checks with the same cost keep their order
+        order = sorted(range(len(checks)),
+                       key=lambda i: (criteria_costs[checks[i][0]], i))
+        self._checks = [checks[i] for i in order]
+
+        # the attributes read by the checks (prefetched in bulk)
+        self._attributes = []
+        for name, _ in self._checks:
+            attribute = criteria_attributes.get(name)
+            if attribute is not None and attribute not in self._attributes:
+                self._attributes.append(attribute)
+
+    def __getitem__(self, name):
+        return self._criteria[name]
+
+    def __iter__(self):
+        return iter(self._criteria)
+
+    def __len__(self):
+        return len(self._criteria)
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __eq__(self, other):
+        if isinstance(other, SearchCriteria):
+            return self._key == other._key
+        return super(SearchCriteria, self).__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "SearchCriteria({0})".format(", ".join(
+            "{0}={1!r}".format(name, self._criteria[name]) for name in sorted(self._criteria)))
+
+    def copy(self):
+        """Return the criteria as a new dict"""
+        return dict(self._criteria)
+
+    def replace(self, **criteria):
+        """Return new SearchCriteria with some criteria changed"""
+        return SearchCriteria(**dict(self._criteria, **criteria))
+
+    def _predicates(self):
+        """Return the checks of the elements for this search"""
+        predicates = []
+        for name, check in self._checks:
+            if name == 'active_only':
+                active_handle = _active_window_handle()
+
+                def check(elem):
+                    """Check if the element is the active window"""
+                    return elem.handle == active_handle
+            predicates.append(check)
+        return predicates
+
+    def iter_elements(self, parent=None, root=None, candidates=None):
+        """
+        Iterate over the elements matching the criteria
+
+        See :py:func:`iter_elements`. The parent (if not None) is used
+        instead of the parent of the criteria, e.g. the element found
+        by the previous search. The root (if not None) is used instead
+        of the desktop element of the back-end, e.g. the root
+        of a :py:class:`Snapshot`. The candidates (if not None) are passed
+        to the enumeration of the root elements to limit it to them
+        (see :py:meth:`SnapshotElement.iter_descendants`).
+        """
+        values = self._values
+        found_index = values['found_index']
+
+        backend = values['backend']
+        if backend is None:
+            backend = registry.active_backend.name
+        backend_obj = registry.backends[backend]
+
+        # allow a handle to be passed in
+        # if it is present - just return it
+        if values['handle'] is not None:
+            yield backend_obj.element_info_class(values['handle'])
+            return
+
+        if parent is None:
+            parent = values['parent']
+        if isinstance(parent, backend_obj.generic_wrapper_class):
+            parent = parent.element_info
+        elif isinstance(parent, six.integer_types):
+            # check if parent is a handle of element (in case of searching native controls)
+            parent = backend_obj.element_info_class(parent)
+
+        enumeration = self._pushed_down
+        if candidates is not None:
+            enumeration = dict(enumeration, candidates=candidates)
+
+        # the number of the elements checked by the parallel search
+        candidates = None
+
+        if values['top_level_only']:
+            # find the top level elements
+            element = root if root is not None else backend_obj.element_info_class()
+            elements = element.iter_children(**enumeration)
+
+            # if we have been given a parent
+            if parent:
+                elements = (elem for elem in elements if elem.parent == parent)
+
+            search_root = parent if parent else element
+
+        # looking for child elements
+        else:
+            # if not given a parent look for all children of the desktop
+            whole_desktop = not parent and root is None
+            if not parent:
+                parent = root if root is not None else backend_obj.element_info_class()
+            search_root = parent
+
+            # if the ctrl_index has been specified then just return
+            # that control
+            if values['ctrl_index'] is not None:
+                yield parent.descendants(class_name=values['class_name'],
+                                         title=values['title'],
+                                         control_type=values['control_type'],
+                                         cache_enable=True)[values['ctrl_index']]
+                return
+
+            if whole_desktop and search_threads > 1 and parent.thread_safe:
+                elements = None
+                candidates = [0]
+                matches = _iter_parallel_matches(parent, self._pushed_down,
+                                                 self._predicates(), search_threads, candidates,
+                                                 self._attributes)
+            else:
+                elements = parent.iter_descendants(**enumeration)
+
+        if elements is not None:
+            # early stop
+            first = next(elements, None)
+            if first is None:
+                return
+            elements = _iter_prefetched(itertools.chain([first], elements), self._attributes)
+
+            if values['title'] is not None:
+                # TODO: some magic is happenning here
+                first.rich_text
+
+            matches = _match_elements(elements, self._predicates())
+
+        if values['best_match'] is None:
+            found = 0
+            for elem in matches:
+                elem.set_cache_strategy(cached=False)
+                # found_index is the last criterion to filter results
+                if found_index is None:
+                    yield elem
+                elif found == found_index:
+                    yield elem
+                    return
+                found += 1
+
+            if found_index is not None and (candidates is None or candidates[0]):
+                raise ElementNotFoundError("found_index is specified as {0}, but {1} window/s found".format(
+                    found_index, found))
+            return
+
+        elements = list(matches)
+        if candidates is not None and not candidates[0]:
+            # no elements at all as for the early stop above
+            return
 
-    if best_match is not None:
         # Build a list of wrapped controls.
         # Speed up the loop by setting up local pointers
         wrapped_elems = []
@@ -286,12 +650,13 @@ def find_elements(class_name=None,
         for elem in elements:
             try:
                 add_to_wrp_elems(wrp_cls(elem))
-            except (controls.InvalidWindowHandle,
-                    controls.InvalidElement):
+            except _invalid_element_errors:
                 # skip invalid handles - they have dissapeared
                 # since the list of elements was retrieved
                 continue
-        elements = findbestmatch.find_best_control_matches(best_match, wrapped_elems)
+
+        name_index = findbestmatch.get_name_index(search_root, scope=(backend,) + self._name_scope)
+        elements = findbestmatch.find_best_control_matches(values['best_match'], wrapped_elems, name_index)
 
         # convert found elements back to ElementInfo
         backup_elements = elements[:]
@@ -302,22 +667,755 @@ def find_elements(class_name=None,
                 elements.append(elem.element_info)
             else:
                 elements.append(backend_obj.element_info_class(elem.handle))
-    else:
+
+        if values['predicate_func'] is not None:
+            elements = [elem for elem in elements if values['predicate_func'](elem)]
+
+        # found_index is the last criterion to filter results
+        if found_index is not None:
+            if found_index < len(elements):
+                elements = elements[found_index:found_index + 1]
+            else:
+                raise ElementNotFoundError("found_index is specified as {0}, but {1} window/s found".format(
+                    found_index, len(elements)))
+
         for elem in elements:
-            elem.set_cache_strategy(cached=False)
+            yield elem
+
+    def find_elements(self, parent=None):
+        """Return a list of the elements matching the criteria (see :py:func:`find_elements`)"""
+        return list(self.iter_elements(parent))
+
+    def find_element(self, parent=None):
+        """Return the only element matching the criteria (see :py:func:`find_element`)"""
+        return _only_element(self.iter_elements(parent), self.copy())
+
+
+def _only_element(elements, kwargs):
+    """Return the only element of the iterable or raise an error
+
+    * **kwargs** the criteria reported by the error
+    """
+    elements = iter(elements)
+    # the second element is enough to know that the element is not unique,
+    # the rest of them is only enumerated for the error
+    found = list(itertools.islice(elements, 2))
+
+    if not found:
+        raise ElementNotFoundError(kwargs)
+
+    if len(found) > 1:
+        found.extend(elements)
+        exception = ElementAmbiguousError(
+            "There are {0} elements that match the criteria {1}".format(
+                len(found),
+                six.text_type(kwargs),
+            )
+        )
+
+        exception.elements = found
+        raise exception
+
+    return found[0]
+
+
+#=========================================================================
+def iter_elements(**criteria):
+    """
+    Iterate over the elements matching the criteria
+
+    The elements are the same as returned by :py:func:`find_elements`
+    (see it for the criteria) but they are streamed from the back-end
+    enumeration (iter_children()/iter_descendants() of the element info)
+    through the filters. So the search stops as soon as the caller stops
+    taking the elements, e.g. this checks only the first two matches::
+
+        matches = list(itertools.islice(iter_elements(**criteria), 2))
 
-    if predicate_func is not None:
-        elements = [elem for elem in elements if predicate_func(elem)]
+    With found_index=n the search stops after the (n + 1)-th match.
+    The best_match criterion needs all the matching elements to rank them
+    so they are collected before the first one is returned.
 
-    # found_index is the last criterion to filter results
-    if found_index is not None:
-        if found_index < len(elements):
-            elements = elements[found_index:found_index + 1]
+    The criteria supported by the back-end (process, class_name, title and
+    control_type) are passed to the enumeration. The other criteria are
+    checked for each element in the order of their cost (see criteria_costs)
+    until the first one fails. Use :py:class:`SearchCriteria` to prepare
+    the criteria once for repeated searches.
+    """
+    return SearchCriteria(**criteria).iter_elements()
+
+
+#=========================================================================
+# the properties of the elements captured by a snapshot
+snapshot_properties = ('handle', 'class_name', 'rich_text', 'name', 'control_id',
+                       'automation_id', 'framework_id', 'control_type',
+                       'process_id', 'visible', 'enabled', 'rectangle')
+
+
+def _captured_property(name):
+    """Return a property reading the captured value of the element property"""
+    index = snapshot_properties.index(name)
+    return property(lambda self: self._values[index],
+                    doc="Return the captured {0} of the element".format(name))
+
+
+def _element_key(element):
+    """Return a hashable key identifying the element in the tree"""
+    handle = getattr(element, 'handle', None)
+    if handle:
+        return handle
+    runtime_id = getattr(element, 'runtime_id', None)
+    if runtime_id:
+        return tuple(runtime_id)
+    return None
+
+
+class SnapshotElement(ElementInfo):
+
+    """
+    An element of the tree captured by :py:class:`Snapshot`
+
+    The filterable properties are read once when the snapshot is taken
+    and they are kept in a tuple. The other attributes are taken from
+    the live element info (the ``element_info`` attribute).
+    """
+
+    __slots__ = ('element_info', 'key', 'depth', 'position',
+                 '_values', '_parent', '_children', '_end')
+
+    def __init__(self, element_info, values):
+        """Create the element from the element info and the captured values"""
+        self.element_info = element_info
+        # the handle or the runtime id (see _element_key)
+        self.key = None
+        self._values = values
+        self._parent = None
+        # a list is created for the first child only
+        self._children = ()
+        self.depth = 0
+        # the index in Snapshot.elements and the index after the descendants
+        self.position = -1
+        self._end = 0
+
+    def __getattr__(self, name):
+        """Return the attribute of the live element (e.g. the UIA element)"""
+        if name.startswith('_') or name == 'element_info':
+            raise AttributeError(name)
+        return getattr(self.element_info, name)
+
+    def __repr__(self):
+        """Representation of the captured element"""
+        return "<SnapshotElement {0!r}, {1!r}>".format(self.rich_text, self.class_name)
+
+    def set_cache_strategy(self, cached):
+        """The captured properties are not updated (see :py:meth:`Snapshot.refresh`)"""
+        pass
+
+    handle = _captured_property('handle')
+    class_name = _captured_property('class_name')
+    rich_text = _captured_property('rich_text')
+    name = _captured_property('name')
+    control_id = _captured_property('control_id')
+    automation_id = _captured_property('automation_id')
+    framework_id = _captured_property('framework_id')
+    control_type = _captured_property('control_type')
+    process_id = _captured_property('process_id')
+    visible = _captured_property('visible')
+    enabled = _captured_property('enabled')
+    rectangle = _captured_property('rectangle')
+
+    @property
+    def parent(self):
+        """Return the parent element in the snapshot"""
+        return self._parent
+
+    def _matches(self, process=None, class_name=None, title=None, control_type=None, **kwargs):
+        """Check the criteria passed to the enumeration by the search"""
+        if process and self.process_id != process:
+            return False
+        if class_name and self.class_name != class_name:
+            return False
+        if title and self.name != title:
+            return False
+        # the control types are known by the UIA elements only
+        if control_type and isinstance(control_type, six.string_types) and \
+                self.control_type is not None and self.control_type != control_type:
+            return False
+        return True
+
+    def iter_children(self, candidates=None, **kwargs):
+        """Iterate over the captured children of the element
+
+        If the candidates (a list of the snapshot elements in their order)
+        are passed only they are checked instead of all the children.
+        """
+        if candidates is not None:
+            children = (elem for elem in candidates if elem._parent is self)
+        else:
+            children = self._children
+        for child in children:
+            if child._matches(**kwargs):
+                yield child
+
+    def iter_descendants(self, candidates=None, **kwargs):
+        """Iterate over the captured descendants of the element (depth-first)
+
+        If the candidates (a list of the snapshot elements in their order)
+        are passed only they are checked instead of all the descendants.
+        """
+        if candidates is not None:
+            for elem in candidates:
+                if self.position < elem.position < self._end and elem._matches(**kwargs):
+                    yield elem
+            return
+
+        stack = [iter(self._children)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+            if child._matches(**kwargs):
+                yield child
+            stack.append(iter(child._children))
+
+    def children(self, **kwargs):
+        """Return the captured children of the element"""
+        return list(self.iter_children(**kwargs))
+
+    def descendants(self, **kwargs):
+        """Return the captured descendants of the element"""
+        return list(self.iter_descendants(**kwargs))
+
+    def dump_window(self):
+        """Dump the captured properties of the element"""
+        return dict(zip(snapshot_properties, self._values))
+
+
+# the regular expression characters which end the literal prefix
+_regex_special = '.^$*+?{}[]\\|()'
+
+
+def _literal_prefix(pattern):
+    """Return the text which all the strings matched by the pattern start with
+
+    The pattern is matched at the start of the string (as re.match does).
+    An empty string is returned if the prefix can't be found out easily,
+    e.g. for the alternatives or the inline flags.
+    """
+    if not isinstance(pattern, six.string_types) or '|' in pattern or '(?' in pattern:
+        return ''
+
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        step = 1
+        if char == '\\':
+            # only the escaped punctuation is a literal (as re.escape() does)
+            if i + 1 == len(pattern) or pattern[i + 1].isalnum():
+                break
+            char = pattern[i + 1]
+            step = 2
+        elif char in _regex_special:
+            break
+
+        following = pattern[i + step:i + step + 1]
+        if following and following in '*?{':
+            # the character is optional
+            break
+        prefix.append(char)
+        if following == '+':
+            break
+        i += step
+    return ''.join(prefix)
+
+
+def _capture_values(element):
+    """Return the tuple of the snapshot properties of the element"""
+    values = []
+    for name in snapshot_properties:
+        try:
+            values.append(getattr(element, name))
+        except (AttributeError, NotImplementedError):
+            # the property is not supported by the back-end
+            values.append(None)
+    return tuple(values)
+
+
+class Snapshot(object):
+
+    """
+    The element tree captured once to answer many searches from memory
+
+    Every element under the root is enumerated and its filterable
+    properties (see snapshot_properties) are read when the snapshot
+    is taken. :py:meth:`find_elements`, :py:meth:`find_element` and
+    :py:meth:`iter_elements` accept the criteria of
+    :py:func:`find_elements` and return the live element infos
+    but the criteria are checked against the captured values. So the
+    results are only as fresh as the snapshot: check :py:attr:`age`
+    and call :py:meth:`refresh` when the application could have changed.
+
+    The best_match criterion still reads the names of the matching
+    controls through the wrappers of the back-end.
+
+    The elements with the exact class_name, auto_id, control_id and title
+    criteria are looked up in the hash indexes of the snapshot and
+    the title_re and class_name_re criteria use the sorted indexes
+    of the values for the literal prefix of the regular expression.
+    Only the elements found in all the indexes are checked then.
+    The indexes are built by the first search which needs them.
+    """
+
+    # the indexed criteria and the element properties they are checked against
+    hash_indexes = (('class_name', 'class_name'),
+                    ('auto_id', 'automation_id'),
+                    ('control_id', 'control_id'),
+                    ('title', 'rich_text'))
+    prefix_indexes = (('class_name_re', 'class_name'),
+                      ('title_re', 'rich_text'))
+
+    def __init__(self, root=None, depth=None, backend=None, indexed=True):
+        """
+        Capture the tree
+
+        * **root** the element info, wrapper or handle of the top element
+          (the desktop if it is None)
+        * **depth** the number of the captured levels under the root
+          (all of them if it is None)
+        * **backend** the name of the back-end (the active back-end if it is None)
+        * **indexed** use the indexes of the properties for the searches
+        """
+        if depth is not None and depth < 1:
+            raise ValueError("depth must be None or a positive integer")
+        if backend is None:
+            backend = registry.active_backend.name
+        backend_obj = registry.backends[backend]
+
+        if root is None:
+            root = backend_obj.element_info_class()
+        elif isinstance(root, backend_obj.generic_wrapper_class):
+            root = root.element_info
+        elif isinstance(root, six.integer_types):
+            root = backend_obj.element_info_class(root)
+
+        self.backend = backend
+        self.depth = depth
+        self.indexed = indexed
+        self._root_info = root
+        self.refresh()
+
+    def refresh(self):
+        """Capture the tree again"""
+        root_info = self._root_info
+        root = SnapshotElement(root_info, _capture_values(root_info))
+        if root_info.immediate_children:
+            entries = self._walk(root)
+        else:
+            entries = self._link_by_parents(root)
+        for record, key in entries:
+            # the live element infos returned by the searches aren't cached
+            record.element_info.set_cache_strategy(cached=False)
+
+        self.root = root
+        self.elements = root.descendants()
+        for position, record in enumerate(self.elements):
+            record.position = position
+        for record in reversed(self.elements):
+            record._end = record._children[-1]._end if record._children else record.position + 1
+        root._end = len(self.elements)
+        self._hash_indexes = {}
+        self._prefix_indexes = {}
+        self._records = {}
+        root_key = _element_key(root_info)
+        root.key = root_key
+        if root_key is not None:
+            self._records[root_key] = root
+        for record, key in entries:
+            if key is not None:
+                self._records.setdefault(key, record)
+        self.timestamp = time.time()
+
+    @staticmethod
+    def _add_child(parent, record):
+        """Link the captured element to its parent"""
+        record._parent = parent
+        record.depth = parent.depth + 1
+        if parent._children:
+            parent._children.append(record)
+        else:
+            parent._children = [record]
+
+    def _walk(self, root):
+        """
+        Capture the tree level by level and return the (record, key) pairs
+
+        The children of the elements of a level are enumerated together
+        and their properties are prefetched in bulk. The parents of
+        the elements are the enumerated ones, so they aren't read.
+        The levels deeper than the depth aren't enumerated at all.
+        """
+        entries = []
+        seen = set([_element_key(root.element_info)])
+        level = [root]
+        while level and (self.depth is None or level[0].depth < self.depth):
+            parents = []
+            elements = []
+            for parent in level:
+                children = parent.element_info.children(cache_enable=True)
+                parents.extend([parent] * len(children))
+                elements.extend(children)
+
+            level = []
+            for parent, element in zip(parents, _iter_prefetched(elements, snapshot_properties)):
+                key = _element_key(element)
+                if key is not None:
+                    # an element is captured once (e.g. a window owned by another one)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                record = SnapshotElement(element, _capture_values(element))
+                record.key = key
+                self._add_child(parent, record)
+                level.append(record)
+                entries.append((record, key))
+        return entries
+
+    def _link_by_parents(self, root):
+        """
+        Capture the tree and link the elements by their parents
+
+        It's used for the back-ends which return the whole subtree from
+        children() (see ElementInfo.immediate_children). So the parent
+        of every element is read and the elements deeper than
+        the depth are dropped after the whole tree is enumerated.
+        """
+        root_info = root.element_info
+        # the children of the desktop are the top level windows
+        # even if they are owned by other windows
+        desktop = root_info.parent is None
+        if desktop:
+            top_level = list(root_info.children(cache_enable=True))
+        else:
+            top_level = []
+        top_keys = set(_element_key(element) for element in top_level)
+        top_keys.discard(None)
+        elements = top_level
+        if self.depth != 1 or not desktop:
+            elements.extend(element for element in root_info.descendants(cache_enable=True)
+                            if _element_key(element) not in top_keys)
+
+        records = {}
+        entries = []
+        for element in _iter_prefetched(elements, snapshot_properties):
+            record = SnapshotElement(element, _capture_values(element))
+            key = _element_key(element)
+            record.key = key
+            if key is not None:
+                records.setdefault(key, record)
+            entries.append((record, key))
+
+        # link the elements by their parents (the order of the enumeration
+        # is not guaranteed to list a parent before its children)
+        for record, key in entries:
+            parent = root
+            if key not in top_keys:
+                parent_info = record.element_info.parent
+                if parent_info is not None:
+                    parent = records.get(_element_key(parent_info), root)
+                if parent is record:
+                    parent = root
+            record._parent = parent
+            if parent._children:
+                parent._children.append(record)
+            else:
+                parent._children = [record]
+
+        # set the levels and drop the elements deeper than the depth
+        captured = set()
+        stack = [root]
+        while stack:
+            record = stack.pop()
+            if self.depth is not None and record.depth >= self.depth:
+                record._children = ()
+            for child in record._children:
+                child.depth = record.depth + 1
+                captured.add(child)
+                stack.append(child)
+        return [(record, key) for record, key in entries if record in captured]
+
+    @property
+    def age(self):
+        """Return the number of seconds since the tree was captured"""
+        return time.time() - self.timestamp
+
+    def __len__(self):
+        """Return the number of the captured elements (the root excluded)"""
+        return len(self.elements)
+
+    def element(self, element):
+        """Return the captured element for the element info, wrapper or handle or None"""
+        if isinstance(element, SnapshotElement):
+            return element
+        if isinstance(element, six.integer_types):
+            key = element
         else:
-            raise ElementNotFoundError("found_index is specified as {0}, but {1} window/s found".format(
-                found_index, len(elements)))
+            key = _element_key(getattr(element, 'element_info', element))
+        if key is None:
+            return None
+        return self._records.get(key)
+
+    def _criteria(self, criteria, kwargs):
+        """Return the SearchCriteria for the back-end of the snapshot"""
+        if criteria is None:
+            criteria = SearchCriteria(**kwargs)
+        elif kwargs:
+            criteria = criteria.replace(**kwargs)
+        if 'backend' not in criteria:
+            criteria = criteria.replace(backend=self.backend)
+        return criteria
+
+    def iter_elements(self, criteria=None, **kwargs):
+        """
+        Iterate over the elements matching the criteria
+
+        The criteria are the same as for :py:func:`find_elements`
+        (as keyword arguments or a :py:class:`SearchCriteria`).
+        The live element infos of the captured elements are returned.
+        The top level elements are the children of the snapshot root.
+        """
+        criteria = self._criteria(criteria, kwargs)
+        parent = criteria.get('parent')
+        if parent is not None:
+            parent = self.element(parent)
+            if parent is None:
+                # the parent is not in the snapshot
+                return
+        candidates = self.candidates(criteria) if self.indexed else None
+        found = False
+        for element in criteria.iter_elements(parent, self.root, candidates):
+            found = True
+            yield element.element_info if isinstance(element, SnapshotElement) else element
+
+        if not found and candidates is not None and \
+                (criteria.get('found_index') is not None or criteria.get('best_match') is not None):
+            # the found_index and best_match errors depend on
+            # the elements which are not candidates
+            for element in criteria.iter_elements(parent, self.root):
+                yield element.element_info
+
+    def _hash_index(self, name):
+        """Return the dict of the elements by the values of the property"""
+        index = self._hash_indexes.get(name)
+        if index is None:
+            index = {}
+            for record in self.elements:
+                value = getattr(record, name)
+                try:
+                    index.setdefault(value, []).append(record)
+                except TypeError:
+                    # not hashable, no criterion is checked against it
+                    pass
+            self._hash_indexes[name] = index
+        return index
+
+    def _prefix_index(self, name):
+        """Return the sorted text values of the property and the elements in the same order"""
+        index = self._prefix_indexes.get(name)
+        if index is None:
+            pairs = sorted((getattr(record, name), record.position) for record in self.elements
+                           if isinstance(getattr(record, name), six.string_types))
+            index = ([value for value, _ in pairs],
+                     [self.elements[position] for _, position in pairs])
+            self._prefix_indexes[name] = index
+        return index
+
+    def _prefixed(self, name, prefix):
+        """Return the elements which property value starts with the prefix"""
+        values, records = self._prefix_index(name)
+        start = end = bisect.bisect_left(values, prefix)
+        while end < len(values) and values[end].startswith(prefix):
+            end += 1
+        return records[start:end]
+
+    def candidates(self, criteria):
+        """
+        Return the elements which can match the criteria by the indexes
+
+        The elements are returned in the order of the snapshot.
+        None means that none of the criteria is indexed.
+        """
+        lookups = []
+        for criterion, name in self.hash_indexes:
+            value = criteria.get(criterion)
+            if value is None:
+                continue
+            try:
+                lookups.append(self._hash_index(name).get(value, []))
+            except TypeError:
+                continue
+
+        for criterion, name in self.prefix_indexes:
+            if criterion == 'title_re' and criteria.get('title') is not None:
+                # title_re is ignored if there is the title
+                continue
+            prefix = _literal_prefix(criteria.get(criterion))
+            if prefix:
+                lookups.append(self._prefixed(name, prefix))
+
+        if not lookups:
+            return None
+
+        # intersect starting from the shortest list
+        lookups.sort(key=len)
+        candidates = set(lookups[0])
+        for lookup in lookups[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(lookup)
+        return sorted(candidates, key=lambda record: record.position)
+
+    def find_elements(self, criteria=None, **kwargs):
+        """Return a list of the elements matching the criteria (see :py:meth:`iter_elements`)"""
+        return list(self.iter_elements(criteria, **kwargs))
+
+    def find_element(self, criteria=None, **kwargs):
+        """Return the only element matching the criteria (see :py:meth:`iter_elements`)"""
+        criteria = self._criteria(criteria, kwargs)
+        return _only_element(self.iter_elements(criteria), criteria.copy())
+
+
+def snapshot(root=None, depth=None, backend=None, indexed=True):
+    """
+    Capture the element tree for repeated searches (see :py:class:`Snapshot`)
+
+    A usage example::
+
+        desktop = findwindows.snapshot(depth=3)
+        buttons = desktop.find_elements(class_name="Button", top_level_only=False)
+        if desktop.age > 5:
+            desktop.refresh()
+    """
+    return Snapshot(root, depth, backend, indexed)
+
+
+#=========================================================================
+ElementChange = namedtuple('ElementChange', ['old', 'new', 'properties'])
 
-    return elements
+
+class SnapshotDiff(object):
+
+    """
+    The changes of the element tree between two snapshots
+
+    * **added** the elements of the new snapshot which were not in the old one
+    * **removed** the elements of the old snapshot which are not in the new one
+    * **changed** ElementChange(old, new, properties) for the elements
+      with different captured properties ('parent' if the element has moved)
+
+    The elements are the :py:class:`SnapshotElement` objects
+    in the order of their snapshots.
+    """
+
+    def __init__(self, added, removed, changed):
+        """Create the diff from the lists of the changes"""
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __bool__(self):
+        """Return True if there is any change"""
+        return bool(self.added or self.removed or self.changed)
+
+    __nonzero__ = __bool__  # Python 2
+
+    def __repr__(self):
+        """Representation of the diff"""
+        return "<SnapshotDiff {0} added, {1} removed, {2} changed>".format(
+            len(self.added), len(self.removed), len(self.changed))
+
+
+def _identities(snapshot):
+    """
+    Return the dict of the identities of the snapshot elements
+
+    The identity is the handle or the runtime id of the element.
+    The structural path (the identity of the parent, the class name and
+    the number of the previous siblings of the same class without
+    a handle) is used for the elements which have none.
+    """
+    identities = {snapshot.root: ()}
+    ordinals = {}
+    for record in snapshot.elements:
+        if record.key is not None:
+            identities[record] = record.key
+            continue
+        path = (identities[record.parent], record.class_name)
+        ordinal = ordinals.get(path, 0)
+        ordinals[path] = ordinal + 1
+        identities[record] = path + (ordinal,)
+    return identities
+
+
+def _comparable(value):
+    """Return the value to compare (the rectangles are compared by the coordinates)"""
+    if hasattr(value, 'left') and hasattr(value, 'bottom'):
+        return (value.left, value.top, value.right, value.bottom)
+    return value
+
+
+def diff_snapshots(old, new, properties=None):
+    """
+    Return the :py:class:`SnapshotDiff` between two snapshots of the tree
+
+    * **old** and **new** the snapshots (e.g. of the same window at two polls)
+    * **properties** the names of the compared properties (see snapshot_properties),
+      all of them but the handle if it is None
+
+    The elements are paired by their identities (see _identities) so the diff
+    takes the time linear in the number of the elements. A usage example::
+
+        old = findwindows.snapshot(dlg)
+        ...
+        new = findwindows.snapshot(dlg)
+        for change in findwindows.diff_snapshots(old, new).changed:
+            print(change.new.rich_text, change.properties)
+    """
+    if properties is None:
+        properties = [name for name in snapshot_properties if name != 'handle']
+    for name in properties:
+        if name not in snapshot_properties:
+            raise ValueError("Unknown snapshot property: {0}".format(name))
+    indexes = [(name, snapshot_properties.index(name)) for name in properties]
+
+    old_identities = _identities(old)
+    new_identities = _identities(new)
+    old_elements = {}
+    for record in old.elements:
+        old_elements.setdefault(old_identities[record], record)
+
+    added = []
+    changed = []
+    matched = set()
+    for record in new.elements:
+        identity = new_identities[record]
+        previous = old_elements.get(identity)
+        if previous is None or identity in matched:
+            added.append(record)
+            continue
+        matched.add(identity)
+
+        names = [name for name, i in indexes
+                 if _comparable(previous._values[i]) != _comparable(record._values[i])]
+        if old_identities[previous.parent] != new_identities[record.parent]:
+            names.append('parent')
+        if names:
+            changed.append(ElementChange(previous, record, names))
+
+    removed = [record for record in old.elements
+               if not (old_elements[old_identities[record]] is record and old_identities[record] in matched)]
+    return SnapshotDiff(added, removed, changed)
 
 
 #=========================================================================
@@ -42,6 +42,21 @@ If the exact item is in the dictionary (no fuzzy matching needed - then it
 doesn't do the linear search and speed should be similar to standard Python
 dictionaries.
 
+For big dictionaries create it with indexed=True: an index of the characters
+of the keys gives an upper bound of the match ratio of every key at once so
+only the keys that still can be the best match are compared (the result is
+the same as with the linear search).
+
+With memo_size > 0 the results of the fuzzy lookups are memoized so
+checking "key in fuzzy_dict" and then getting fuzzy_dict[key] or looking for
+the same missing key again doesn't search twice. Any change of the dictionary
+invalidates the memo. It's off by default as it only pays off when the same
+keys are looked up repeatedly and it keeps the looked up keys alive.
+
+ShardedFuzzyDict spreads the string keys of a very large dictionary over
+several worker processes which search the indexes of their keys in parallel
+(search_many() sends a whole batch of lookups at once).
+
 >>> fuzzywuzzy = FuzzyDict({"hello" : "World", "Hiya" : 2, "Here you are" : 3})
 >>> fuzzywuzzy['Me again'] = [1,2,3]
 >>>
@@ -67,13 +82,170 @@ KeyError: "'There'. closest match: 'hello' with ratio 0.400"
 from __future__ import unicode_literals
 
 import difflib
-from collections import OrderedDict
+import multiprocessing
+from collections import Counter, OrderedDict
+
+import six
+
+
+class CharIndex(object):
+
+    """Inverted index of the characters of the string keys
+
+    For each character it keeps the keys with the number of times the
+    character is in each of them. So the number of characters that every
+    key has in common with a text is counted at once, and this gives
+    SequenceMatcher.quick_ratio() of each key: the upper bound of its ratio.
+    (Longer q-grams can't bound the ratio as the matching blocks
+    may be a single character long.)
+
+    It also keeps the order of the keys to break the ties the same way as
+    the linear search. The keys which are not strings are only ordered.
+    """
+
+    def __init__(self):
+        """Create an empty index"""
+        self.clear()
+
+    def clear(self):
+        """Remove all the keys"""
+        self._postings = {}
+        self._lengths = {}
+        self.order = {}
+        self.others = {}
+        self._next_order = 0
+        self._first_order = 0
+
+    def add(self, key):
+        """Add the key to the end (an existing key keeps its place)"""
+        if key in self.order or key in self.others:
+            return
+        self._next_order += 1
+        if isinstance(key, six.string_types):
+            self.order[key] = self._next_order
+            self._lengths[key] = len(key)
+            for char, count in Counter(key).items():
+                self._postings.setdefault(char, {})[key] = count
+        else:
+            self.others[key] = self._next_order
+
+    def remove(self, key):
+        """Remove the key if it's in the index"""
+        if key in self.others:
+            del self.others[key]
+        elif key in self.order:
+            del self.order[key]
+            del self._lengths[key]
+            for char in set(key):
+                postings = self._postings[char]
+                del postings[key]
+                if not postings:
+                    del self._postings[char]
+
+    def move(self, key, last=True):
+        """Move the key to the end (or to the beginning)"""
+        orders = self.others if key in self.others else self.order
+        if last:
+            self._next_order += 1
+            orders[key] = self._next_order
+        else:
+            self._first_order -= 1
+            orders[key] = self._first_order
+
+    def upper_bounds(self, text):
+        """Return a dict of the quick ratio of each key sharing characters with the text"""
+        common = Counter()
+        for char, count in Counter(text).items():
+            postings = self._postings.get(char)
+            if not postings:
+                continue
+            if count == 1:
+                common.update(iter(postings))
+            else:
+                for key, key_count in postings.items():
+                    common[key] += min(count, key_count)
+
+        length = len(text)
+        lengths = self._lengths
+        return dict((key, 2.0 * matches / (length + lengths[key]))
+                    for key, matches in common.items())
+
+
+def _update_best(best, ratio, key, order):
+    """Keep the key in best ([ratio, key, order]) if it's a better match
+
+    An earlier key wins if the ratios are equal as in the linear search.
+    """
+    if ratio > best[0] or \
+            (ratio == best[0] and best[1] is not None and order < best[2]):
+        best[:] = [ratio, key, order]
+
+
+def _best_indexed(index, lookfor, cutoff, stop_on_first=False):
+    """
+    Return [ratio, key, order] of the best match of lookfor in the CharIndex
+
+    The keys are compared in the order of their upper bound and only
+    while the bound can beat the best ratio (and the cutoff if the best
+    key below it is not needed). The result is the same as of the linear
+    search, though with stop_on_first only the matched flag is the same.
+    The key is None if no key matches at all.
+    """
+    ratio_calc = difflib.SequenceMatcher()
+    ratio_calc.set_seq1(lookfor)
+
+    # the best ratio, key and the order of the key
+    best = [0, None, None]
+
+    def compare(key, order):
+        """Compare the key and update the best match"""
+        try:
+            ratio_calc.set_seq2(key)
+        except TypeError:
+            return 0
+        ratio = ratio_calc.ratio()
+        _update_best(best, ratio, key, order)
+        return ratio
+
+    # the keys which are not strings are compared as in the linear search
+    for key, order in index.others.items():
+        if compare(key, order) >= cutoff and stop_on_first:
+            return best
+
+    bounds = index.upper_bounds(lookfor)
+    order = index.order
+
+    # the keys above the cutoff first, the rest only if nothing matches
+    above = [(-bound, order[key], key) for key, bound in bounds.items()
+             if bound >= cutoff]
+    below = None
+    above.sort()
+    for candidates in (above, below):
+        if candidates is None:
+            if best[0] >= cutoff or stop_on_first:
+                break
+            candidates = [(-bound, order[key], key) for key, bound in bounds.items()
+                          if best[0] <= bound < cutoff]
+            candidates.sort()
+
+        for neg_bound, key_order, key in candidates:
+            if -neg_bound < best[0]:
+                # sorted by the bound so no other key can beat the best
+                break
+            if -neg_bound == best[0] and key_order > best[2]:
+                # only an earlier key can win with the same ratio
+                continue
+            if compare(key, key_order) >= cutoff and stop_on_first:
+                return best
+
+    return best
+
 
 class FuzzyDict(OrderedDict):
 
     """Provides a dictionary that performs fuzzy lookup"""
 
-    def __init__(self, items = None, cutoff = .6):
+    def __init__(self, items=None, cutoff=.6, indexed=False, memo_size=0):
         """
         Construct a new FuzzyDict instance
 
@@ -81,7 +253,20 @@ class FuzzyDict(OrderedDict):
         cutoff is the match ratio below which mathes should not be considered
         cutoff needs to be a float between 0 and 1 (where zero is no match
         and 1 is a perfect match).
+        indexed enables the CharIndex of the keys to avoid comparing
+        all the keys on every fuzzy lookup
+        memo_size is the number of the fuzzy lookup results to remember
+        (0, the default, disables the memo)
         """
+        self._index = CharIndex() if indexed else None
+
+        # the memo is valid while the generation doesn't change
+        self._memo = OrderedDict()
+        self._memo_generation = 0
+        self._generation = 0
+        self.memo_size = memo_size
+        self.memo_hits = 0
+        self.memo_misses = 0
         super(FuzzyDict, self).__init__()
 
         # short wrapper around some super (OrderedDict) methods
@@ -106,6 +291,62 @@ class FuzzyDict(OrderedDict):
         if self._dict_contains(lookfor):
             return True, lookfor, self._dict_getitem(lookfor), 1
 
+        if self.memo_size > 0:
+            return self._search_memo(lookfor)
+
+        return self._search_keys(lookfor, stop_on_first)
+
+    def _search_memo(self, lookfor):
+        """
+        _search with the memo of the best key and ratio for lookfor
+
+        The memoized results are always of the full search (no
+        stop_on_first) so they can be used by both __contains__ and
+        __getitem__. The matched flag and the value are got again as
+        the cutoff and the values can change without a new generation.
+        """
+        if self._memo_generation != self._generation:
+            self._memo.clear()
+            self._memo_generation = self._generation
+
+        try:
+            best_key, best_ratio = self._memo.pop(lookfor)
+        except KeyError:
+            self.memo_misses += 1
+            _, best_key, _, best_ratio = self._search_keys(lookfor)
+        else:
+            self.memo_hits += 1
+
+        self._memo[lookfor] = best_key, best_ratio
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+        best_match = None
+        if best_key is not None:
+            best_match = self._dict_getitem(best_key)
+
+        return (
+            best_ratio >= self.cutoff,
+            best_key,
+            best_match,
+            best_ratio)
+
+    def memo_stats(self):
+        """Return a dictionary with the memo size and the hit/miss counters"""
+        lookups = self.memo_hits + self.memo_misses
+        return {'size': len(self._memo),
+                'max_size': self.memo_size,
+                'hits': self.memo_hits,
+                'misses': self.memo_misses,
+                'hit_rate': float(self.memo_hits) / lookups if lookups else 0.,
+                'generation': self._generation,
+                }
+
+    def _search_keys(self, lookfor, stop_on_first=False):
+        """Compare lookfor with the keys (with the index if possible)"""
+        if self._index is not None and isinstance(lookfor, six.string_types):
+            return self._search_indexed(lookfor, stop_on_first)
+
         # set up the fuzzy matching tool
         ratio_calc = difflib.SequenceMatcher()
         ratio_calc.set_seq1(lookfor)
@@ -148,6 +389,64 @@ class FuzzyDict(OrderedDict):
             best_match,
             best_ratio)
 
+    def _search_indexed(self, lookfor, stop_on_first=False):
+        """_search with the index of the keys (see _best_indexed)"""
+        best_ratio, best_key, _ = _best_indexed(self._index, lookfor, self.cutoff, stop_on_first)
+        best_match = None
+        if best_key is not None:
+            best_match = self._dict_getitem(best_key)
+
+        return (
+            best_ratio >= self.cutoff,
+            best_key,
+            best_match,
+            best_ratio)
+
+    def __setitem__(self, key, value):
+        """Overides OrderedDict __setitem__ to index the key and invalidate the memo"""
+        super(FuzzyDict, self).__setitem__(key, value)
+        self._generation += 1
+        if self._index is not None:
+            self._index.add(key)
+
+    def __delitem__(self, key):
+        """Overides OrderedDict __delitem__ to update the index and the memo"""
+        super(FuzzyDict, self).__delitem__(key)
+        self._generation += 1
+        if self._index is not None:
+            self._index.remove(key)
+
+    def pop(self, key, *args):
+        """Overides OrderedDict pop to update the index and the memo"""
+        value = super(FuzzyDict, self).pop(key, *args)
+        self._generation += 1
+        if self._index is not None and not self._dict_contains(key):
+            self._index.remove(key)
+        return value
+
+    def popitem(self, *args, **kwargs):
+        """Overides OrderedDict popitem to update the index and the memo"""
+        key, value = super(FuzzyDict, self).popitem(*args, **kwargs)
+        self._generation += 1
+        if self._index is not None:
+            self._index.remove(key)
+        return key, value
+
+    def clear(self):
+        """Overides OrderedDict clear to clear the index and the memo"""
+        super(FuzzyDict, self).clear()
+        self._generation += 1
+        if self._index is not None:
+            self._index.clear()
+
+    if hasattr(OrderedDict, 'move_to_end'):
+        def move_to_end(self, key, last=True):
+            """Overides OrderedDict move_to_end to update the index and the memo"""
+            super(FuzzyDict, self).move_to_end(key, last)
+            self._generation += 1
+            if self._index is not None:
+                self._index.move(key, last)
+
     def __contains__(self, item):
         """Overides OrderedDict __contains__ to use fuzzy matching"""
         if self._search(item, True)[0]:
@@ -164,3 +463,224 @@ class FuzzyDict(OrderedDict):
                 format(str(lookfor), str(key), ratio))
 
         return item
+
+
+def _shard_worker(conn):
+    """Keep the string keys of a shard in a CharIndex and search them on request"""
+    index = CharIndex()
+    while True:
+        command, args = conn.recv()
+        if command == 'update':
+            for key, order in args:
+                if order is None:
+                    index.remove(key)
+                else:
+                    # the keys keep their order in the whole dictionary
+                    index.add(key)
+                    index.order[key] = order
+        elif command == 'search':
+            lookfors, cutoff = args
+            conn.send([_best_indexed(index, lookfor, cutoff) for lookfor in lookfors])
+        else:
+            break
+    conn.close()
+
+
+class ShardedFuzzyDict(FuzzyDict):
+
+    """
+    Indexed FuzzyDict searching the string keys of a big dictionary in worker processes
+
+    While the dictionary has fewer string keys than shard_threshold it's
+    searched as FuzzyDict(indexed=True). The worker processes are started
+    by the first search of a bigger dictionary: the string keys are given
+    to the shards in turn and each worker keeps a CharIndex of its keys
+    (the values stay in this process). The changes of the keys are sent
+    to the workers before the next search. The best matches of the shards
+    are merged by the ratio and then by the insertion order, so the results
+    are the same as of FuzzyDict. search_many() sends a whole batch of
+    lookups to the shards at once.
+
+    Call close() (or use the dictionary in a with statement) to stop
+    the workers.
+    """
+
+    def __init__(self, items=None, cutoff=.6, shards=None, shard_threshold=10000, memo_size=0):
+        """
+        Construct a new ShardedFuzzyDict instance
+
+        shards is the number of the worker processes (the number of CPUs
+        by default, one shard means no workers), shard_threshold is the number
+        of the string keys from which the workers are used.
+        See FuzzyDict for the other arguments.
+        """
+        if shards is None:
+            shards = multiprocessing.cpu_count()
+        if shards < 1:
+            raise ValueError("shards must be a positive number: {0}".format(shards))
+        self.shards = shards
+        self.shard_threshold = shard_threshold
+
+        self._connections = []
+        self._workers = []
+
+        # the shard of each key and the changes not sent to the shards yet
+        self._shard_of = {}
+        self._pending = []
+        self._next_shard = 0
+
+        super(ShardedFuzzyDict, self).__init__(items, cutoff, indexed=True, memo_size=memo_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def sharded(self):
+        """True if the fuzzy lookups are done by the worker processes"""
+        return self.shards > 1 and len(self._index.order) >= self.shard_threshold
+
+    def _start(self):
+        """Start the worker processes and give them the string keys"""
+        for _ in range(self.shards):
+            conn, worker_conn = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_shard_worker, args=(worker_conn,))
+            worker.daemon = True
+            worker.start()
+            worker_conn.close()
+            self._connections.append(conn)
+            self._workers.append(worker)
+            self._pending.append([])
+
+        for key, order in self._index.order.items():
+            self._shard_of[key] = self._next_shard
+            self._pending[self._next_shard].append((key, order))
+            self._next_shard = (self._next_shard + 1) % self.shards
+
+    def close(self):
+        """Stop the worker processes (they are started again if needed)"""
+        for conn in self._connections:
+            try:
+                conn.send(('close', None))
+            except (IOError, OSError):
+                pass
+            conn.close()
+        for worker in self._workers:
+            worker.join()
+        self._connections = []
+        self._workers = []
+        self._shard_of.clear()
+        self._pending = []
+
+    def _update_shard(self, key):
+        """Queue the current order of the key (None if removed) for its shard"""
+        if not self._workers or not isinstance(key, six.string_types):
+            return
+        order = self._index.order.get(key)
+        shard = self._shard_of.get(key)
+        if shard is None:
+            if order is None:
+                return
+            shard = self._shard_of[key] = self._next_shard
+            self._next_shard = (self._next_shard + 1) % self.shards
+        elif order is None:
+            del self._shard_of[key]
+        self._pending[shard].append((key, order))
+
+    def __setitem__(self, key, value):
+        """Overides FuzzyDict __setitem__ to give the new key to a shard"""
+        new_key = not self._dict_contains(key)
+        super(ShardedFuzzyDict, self).__setitem__(key, value)
+        if new_key:
+            self._update_shard(key)
+
+    def __delitem__(self, key):
+        """Overides FuzzyDict __delitem__ to remove the key from its shard"""
+        super(ShardedFuzzyDict, self).__delitem__(key)
+        self._update_shard(key)
+
+    def pop(self, key, *args):
+        """Overides FuzzyDict pop to remove the key from its shard"""
+        value = super(ShardedFuzzyDict, self).pop(key, *args)
+        self._update_shard(key)
+        return value
+
+    def popitem(self, *args, **kwargs):
+        """Overides FuzzyDict popitem to remove the key from its shard"""
+        key, value = super(ShardedFuzzyDict, self).popitem(*args, **kwargs)
+        self._update_shard(key)
+        return key, value
+
+    def clear(self):
+        """Overides FuzzyDict clear to clear the shards"""
+        super(ShardedFuzzyDict, self).clear()
+        if self._workers:
+            for key, shard in self._shard_of.items():
+                self._pending[shard].append((key, None))
+            self._shard_of.clear()
+
+    if hasattr(OrderedDict, 'move_to_end'):
+        def move_to_end(self, key, last=True):
+            """Overides FuzzyDict move_to_end to change the order of the key"""
+            super(ShardedFuzzyDict, self).move_to_end(key, last)
+            self._update_shard(key)
+
+    def _search_shards(self, lookfors):
+        """Return the _search results of the string lookfors from all the shards"""
+        if not self._workers:
+            self._start()
+        for conn, pending in zip(self._connections, self._pending):
+            if pending:
+                conn.send(('update', pending))
+                del pending[:]
+        for conn in self._connections:
+            conn.send(('search', (lookfors, self.cutoff)))
+        shard_results = [conn.recv() for conn in self._connections]
+
+        # the keys which are not strings are compared in this process
+        others = CharIndex()
+        others.others = self._index.others
+
+        results = []
+        for i, lookfor in enumerate(lookfors):
+            best = _best_indexed(others, lookfor, self.cutoff)
+            for shard_best in shard_results:
+                _update_best(best, *shard_best[i])
+            best_ratio, best_key, _ = best
+            best_match = None
+            if best_key is not None:
+                best_match = self._dict_getitem(best_key)
+            results.append((best_ratio >= self.cutoff, best_key, best_match, best_ratio))
+        return results
+
+    def _search_keys(self, lookfor, stop_on_first=False):
+        """Overides FuzzyDict _search_keys to search the string in the shards"""
+        if not self.sharded or not isinstance(lookfor, six.string_types):
+            return super(ShardedFuzzyDict, self)._search_keys(lookfor, stop_on_first)
+        return self._search_shards([lookfor])[0]
+
+    def search_many(self, lookfors):
+        """
+        Return the _search results for all the lookfors
+
+        The fuzzy lookups of the strings are sent to the shards at once.
+        """
+        if not self.sharded:
+            return [self._search(lookfor) for lookfor in lookfors]
+
+        results = [None] * len(lookfors)
+        batch = []
+        for i, lookfor in enumerate(lookfors):
+            if self._dict_contains(lookfor):
+                results[i] = True, lookfor, self._dict_getitem(lookfor), 1
+            elif isinstance(lookfor, six.string_types):
+                batch.append(i)
+            else:
+                results[i] = self._search(lookfor)
+
+        if batch:
+            for i, result in zip(batch, self._search_shards([lookfors[i] for i in batch])):
+                results[i] = result
+        return results
@@ -0,0 +1,560 @@
+# GUI Application automation and testing library
+# Copyright (C) 2006-2017 Mark Mc Mahon and Contributors
+# https://github.com/pywinauto/pywinauto/graphs/contributors
+# http://pywinauto.readthedocs.io/en/latest/credits.html
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of pywinauto nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""In-memory simulated back-end for tests and benchmarks
+
+The elements are a tree of :py:class:`SimulatedElement` nodes under
+the simulated desktop (see :py:func:`set_desktop`), no real windows
+are needed. The back-end is registered as "simulated" when the module
+is imported::
+
+    from pywinauto import findwindows, simulated
+
+    desktop = simulated.SimulatedElement(class_name='#32769')
+    dlg = desktop.add(class_name='#32770', title='Save As', process_id=42)
+    dlg.add(class_name='Button', title='OK', process_id=42)
+    simulated.set_desktop(desktop)
+
+    ok = findwindows.find_element(title='OK', top_level_only=False,
+                                  backend='simulated')
+
+The tree can be loaded from JSON (see :py:func:`load_tree`) or generated
+(see :py:func:`generate_desktop`), so the whole lookup (including
+``Desktop(backend='simulated')`` window specifications) can be profiled
+without the application under test. The back-end needs no win32, so
+the searches (:py:mod:`pywinauto.findwindows`) work on Linux too.
+
+Each property read and each enumeration of the elements is a "round
+trip" like a cross process call of a real back-end: it's counted
+(see :py:func:`round_trips`) and it sleeps for the simulated latency
+(see :py:func:`set_latency`) releasing the GIL as a real call does.
+The properties are cached like the ones of the other back-ends
+(see :py:func:`pywinauto.element_info.cached`), so the round trips
+saved by the cache are counted too. The attributes of many elements
+are read in one round trip by :py:meth:`SimulatedElementInfo.prefetch`.
+"""
+from __future__ import unicode_literals
+
+import itertools
+import json
+import random
+import threading
+import time
+import weakref
+
+import six
+
+from . import backend
+from .base_wrapper import BaseMeta, BaseWrapper
+from .element_info import ElementInfo
+from .element_info import cached
+
+
+# the kinds of the round trips: a read of an attribute, an enumeration
+# of the children or the descendants, a read of the parent and a read
+# of the attributes of many elements (see SimulatedElementInfo.prefetch)
+calls = ('read', 'enumerate', 'parent', 'prefetch')
+
+# the simulated latency of the calls in seconds: the cost of a call
+# and the cost of each element returned by it
+latencies = dict((call, (0., 0.)) for call in calls)
+
+_round_trips = dict((call, 0) for call in calls)
+_round_trips_lock = threading.Lock()
+
+# the elements by their handles (the handles are unique for the process)
+_handles = itertools.count(1)
+_elements = weakref.WeakValueDictionary()
+
+
+class RECT(object):
+
+    """
+    The rectangle of a simulated element
+
+    It has the attributes and the methods of win32structures.RECT
+    used by the searches and the naming without the win32 structure,
+    so the back-end works on the other platforms too.
+    """
+
+    __slots__ = ('left', 'top', 'right', 'bottom')
+
+    def __init__(self, other_or_left=0, top=0, right=0, bottom=0):
+        """Create the rectangle from another one or from the coordinates"""
+        if isinstance(other_or_left, RECT):
+            other_or_left, top, right, bottom = \
+                other_or_left.left, other_or_left.top, other_or_left.right, other_or_left.bottom
+        self.left = other_or_left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+
+    def __str__(self):
+        """Return a string representation of the RECT"""
+        return "(L%d, T%d, R%d, B%d)" % (self.left, self.top, self.right, self.bottom)
+
+    def __repr__(self):
+        """Return some representation of the RECT"""
+        return "<RECT L%d, T%d, R%d, B%d>" % (self.left, self.top, self.right, self.bottom)
+
+    def __sub__(self, other):
+        """Return a new rectangle which is offset from the one passed in"""
+        return RECT(self.left - other.left, self.top - other.top,
+                    self.right - other.left, self.bottom - other.top)
+
+    def __add__(self, other):
+        """Allow two rects to be added using +"""
+        return RECT(self.left + other.left, self.top + other.top,
+                    self.right + other.left, self.bottom + other.top)
+
+    def width(self):
+        """Return the width of the rect"""
+        return self.right - self.left
+
+    def height(self):
+        """Return the height of the rect"""
+        return self.bottom - self.top
+
+
+def set_latency(seconds, call=None, per_element=0.):
+    """
+    Set the simulated latency of the round trips (0 disables it)
+
+    * **seconds** the latency of a call in seconds
+    * **call** the kind of the calls (see calls), all of them if it is None
+    * **per_element** the additional latency of each element returned
+      by an enumeration or read by a prefetch
+    """
+    if seconds < 0 or per_element < 0:
+        raise ValueError("latency must not be negative: {0}, {1}".format(seconds, per_element))
+    if call is not None and call not in calls:
+        raise ValueError("Unknown call: {0!r}, the calls are {1}".format(call, calls))
+    for name in (calls if call is None else (call,)):
+        latencies[name] = (seconds, per_element)
+
+
+def round_trips(call=None):
+    """Return the number of the round trips since the last reset_round_trips()
+
+    Only the calls of one kind are counted if call is not None (see calls).
+    """
+    if call is None:
+        return sum(_round_trips.values())
+    return _round_trips[call]
+
+
+def reset_round_trips():
+    """Reset the counters of the round trips"""
+    with _round_trips_lock:
+        for call in calls:
+            _round_trips[call] = 0
+
+
+def _round_trip(call, elements=0):
+    """Count a round trip and wait for the simulated latency"""
+    with _round_trips_lock:
+        _round_trips[call] += 1
+    seconds, per_element = latencies[call]
+    seconds += per_element * elements
+    if seconds:
+        time.sleep(seconds)
+
+
+class SimulatedElement(object):
+
+    """A node of the simulated tree of elements"""
+
+    # the properties of the element (the arguments of the constructor)
+    properties = ('class_name', 'title', 'control_type', 'process_id', 'control_id',
+                  'automation_id', 'framework_id', 'visible', 'enabled', 'rectangle')
+
+    def __init__(self,
+                 class_name='',
+                 title='',
+                 control_type=None,
+                 process_id=0,
+                 control_id=0,
+                 automation_id='',
+                 framework_id='Win32',
+                 visible=True,
+                 enabled=True,
+                 rectangle=(0, 0, 0, 0)):
+        """Create a detached element with a new handle"""
+        self.handle = next(_handles)
+        self.class_name = class_name
+        self.title = title
+        self.control_type = control_type
+        self.process_id = process_id
+        self.control_id = control_id
+        self.automation_id = automation_id
+        self.framework_id = framework_id
+        self.visible = visible
+        self.enabled = enabled
+        self.rectangle = rectangle
+        self.parent = None
+        self.children = []
+        _elements[self.handle] = self
+
+    def add(self, **properties):
+        """Create a new child element with the properties and return it"""
+        child = SimulatedElement(**properties)
+        child.parent = self
+        self.children.append(child)
+        return child
+
+    def remove(self):
+        """Detach the element (with its descendants) from the parent"""
+        if self.parent is not None:
+            self.parent.children.remove(self)
+            self.parent = None
+
+    def iter_descendants(self):
+        """Iterate over the descendants of the element (depth first)"""
+        for child in self.children:
+            yield child
+            for descendant in child.iter_descendants():
+                yield descendant
+
+    def to_dict(self):
+        """Return the properties of the element and its descendants (see from_dict)"""
+        data = dict((name, getattr(self, name)) for name in self.properties)
+        data['rectangle'] = list(self.rectangle)
+        if self.children:
+            data['children'] = [child.to_dict() for child in self.children]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create the tree of the elements from the dict of the properties
+
+        The keys are the properties of the root element (see properties,
+        the missing ones have the default values) and "children" with the
+        list of the dicts of the children. New handles are assigned.
+        """
+        properties = dict(data)
+        children = properties.pop('children', ())
+        unknown = set(properties) - set(cls.properties)
+        if unknown:
+            raise ValueError("Unknown properties of the simulated element: {0}".format(
+                ', '.join(sorted(unknown))))
+        if 'rectangle' in properties:
+            properties['rectangle'] = tuple(properties['rectangle'])
+        root = cls(**properties)
+
+        # the children are created without a recursion as the tree can be deep
+        stack = [(root, children)]
+        while stack:
+            parent, children = stack.pop()
+            for child_data in children:
+                child_data = dict(child_data)
+                grandchildren = child_data.pop('children', ())
+                child = cls.from_dict(child_data)
+                child.parent = parent
+                parent.children.append(child)
+                stack.append((child, grandchildren))
+        return root
+
+
+desktop = SimulatedElement(class_name='#32769', title='Desktop')
+
+
+def set_desktop(root):
+    """Use the root element as the simulated desktop"""
+    global desktop
+    desktop = root
+
+
+def load_tree(source):
+    """
+    Return the tree of the elements loaded from JSON
+
+    The source is a path or a file object of a JSON document
+    in the format of :py:meth:`SimulatedElement.from_dict`
+    (e.g. written by :py:func:`dump_tree`).
+    """
+    if isinstance(source, six.string_types):
+        with open(source) as json_file:
+            data = json.load(json_file)
+    else:
+        data = json.load(source)
+    return SimulatedElement.from_dict(data)
+
+
+def dump_tree(root, target):
+    """Write the tree of the elements to a path or a file object as JSON (see load_tree)"""
+    if isinstance(target, six.string_types):
+        with open(target, 'w') as json_file:
+            json.dump(root.to_dict(), json_file, indent=1)
+    else:
+        json.dump(root.to_dict(), target, indent=1)
+
+
+def generate_desktop(windows, controls, seed=0,
+                     class_names=('Button', 'Edit', 'Static')):
+    """
+    Return a generated desktop with the windows of the controls
+
+    Each top level window (a dialog of its own process) has the number
+    of the controls attached to random parents in the window, so the
+    depths of the subtrees differ. The same seed generates the same tree.
+    The controls have unique titles in the window ("Control N"), control
+    ids and automation ids and they are laid out in the rows of the window.
+    """
+    rnd = random.Random(seed)
+    root = SimulatedElement(class_name='#32769', title='Desktop',
+                            rectangle=(0, 0, 1920, 1080))
+    for i in range(windows):
+        left = top = (i % 20) * 20
+        dialog = root.add(class_name='#32770', title='Dialog %d' % i, process_id=i,
+                          rectangle=(left, top, left + 600, top + 25 * controls + 40))
+        parents = [dialog]
+        for j in range(controls):
+            parent = rnd.choice(parents)
+            ctrl_top = top + 30 + 25 * j
+            parents.append(parent.add(class_name=rnd.choice(class_names),
+                                      title='Control %d' % j,
+                                      process_id=i,
+                                      control_id=j + 1,
+                                      automation_id='control%d' % j,
+                                      rectangle=(left + 10, ctrl_top, left + 210, ctrl_top + 20)))
+    return root
+
+
+def _read(element, name):
+    """Return the value of the element info attribute of the simulated element"""
+    if name == 'rich_text':
+        return element.title
+    if name == 'rectangle':
+        return RECT(*element.rectangle)
+    return getattr(element, name)
+
+
+def _matches(element, process=None, class_name=None, title=None,
+             control_type=None, cache_enable=False, content_only=None):
+    """Check the criteria which the back-end evaluates while enumerating"""
+    return (not process or element.process_id == process) and \
+        (not class_name or element.class_name == class_name) and \
+        (not title or element.title == title) and \
+        (not control_type or element.control_type == control_type)
+
+
+class SimulatedElementInfo(ElementInfo):
+
+    """Element info of a simulated element"""
+
+    __slots__ = ('_element',)
+
+    bulk_prefetch = True
+    thread_safe = True
+
+    def __init__(self, handle_or_elem=None, cache_enable=False):
+        """
+        Create an instance for a handle or a SimulatedElement
+
+        If handle_or_elem is None create an instance for the simulated desktop.
+        """
+        if handle_or_elem is None:
+            self._element = desktop
+        elif isinstance(handle_or_elem, SimulatedElement):
+            self._element = handle_or_elem
+        elif isinstance(handle_or_elem, six.integer_types):
+            try:
+                self._element = _elements[handle_or_elem]
+            except KeyError:
+                raise ValueError("No simulated element with handle {0}".format(handle_or_elem))
+        else:
+            raise TypeError("SimulatedElementInfo object can be initialized "
+                            "with integer or SimulatedElement instance only!")
+
+        self.set_cache_strategy(cached=cache_enable)
+
+    @property
+    def element(self):
+        """Return the simulated element"""
+        return self._element
+
+    def _get(self, name):
+        """Read an attribute of the element (a round trip)"""
+        _round_trip('parent' if name == 'parent' else 'read')
+        return _read(self._element, name)
+
+    @classmethod
+    def prefetch(cls, elements, attributes):
+        """Read the attributes of the elements to their caches in one round trip"""
+        props = cls._prefetched_properties(attributes)
+        elements = [elem for elem in elements if elem.cache_enabled]
+        if not props or not elements:
+            return
+        _round_trip('prefetch', len(elements))
+        for elem in elements:
+            for prop in props:
+                elem._store_cached(prop, _read(elem._element, prop.name))
+
+    @property
+    def handle(self):
+        """Return the handle of the element"""
+        return self._element.handle
+
+    @cached()
+    def rich_text(self):
+        """Return the text of the element"""
+        return self._get('rich_text')
+
+    name = rich_text
+
+    @cached()
+    def control_id(self):
+        """Return the ID of the control"""
+        return self._get('control_id')
+
+    @cached()
+    def process_id(self):
+        """Return the ID of process that controls this element"""
+        return self._get('process_id')
+
+    @cached()
+    def framework_id(self):
+        """Return the framework of the element"""
+        return self._get('framework_id')
+
+    @cached()
+    def class_name(self):
+        """Return the class name of the element"""
+        return self._get('class_name')
+
+    @cached()
+    def automation_id(self):
+        """Return the automation id of the element"""
+        return self._get('automation_id')
+
+    @cached()
+    def control_type(self):
+        """Return the control type of the element"""
+        return self._get('control_type')
+
+    @cached()
+    def enabled(self):
+        """Return True if the element is enabled"""
+        return self._get('enabled')
+
+    @cached()
+    def visible(self):
+        """Return True if the element is visible"""
+        return self._get('visible')
+
+    @cached(copy=RECT)
+    def rectangle(self):
+        """Return rectangle of the element"""
+        return self._get('rectangle')
+
+    @property
+    def parent(self):
+        """Return the parent of the element"""
+        parent = self._get('parent')
+        if parent is None:
+            return None
+        return SimulatedElementInfo(parent)
+
+    def children(self, **kwargs):
+        """Return the children matching the criteria (process, class_name, title, control_type)"""
+        cache_enable = kwargs.pop('cache_enable', False)
+        children = [SimulatedElementInfo(child, cache_enable) for child in self._element.children
+                    if _matches(child, **kwargs)]
+        _round_trip('enumerate', len(children))
+        return children
+
+    def enumerated_by(self, **kwargs):
+        """Check the criteria which children() and descendants() evaluate"""
+        return _matches(self._element, **kwargs)
+
+    def descendants(self, **kwargs):
+        """Return the descendants matching the criteria (process, class_name, title, control_type)"""
+        cache_enable = kwargs.pop('cache_enable', False)
+        descendants = [SimulatedElementInfo(elem, cache_enable)
+                       for elem in self._element.iter_descendants()
+                       if _matches(elem, **kwargs)]
+        _round_trip('enumerate', len(descendants))
+        return descendants
+
+    def dump_window(self):
+        """Dump the element to a set of properties"""
+        return dict(handle=self.handle,
+                    class_name=self.class_name,
+                    text=self.rich_text,
+                    control_id=self.control_id,
+                    rectangle=self.rectangle,
+                    process_id=self.process_id)
+
+    def __eq__(self, other):
+        """Check if 2 SimulatedElementInfo objects describe 1 element"""
+        if not isinstance(other, SimulatedElementInfo):
+            return self.handle == other
+        return self._element is other._element
+
+    def __ne__(self, other):
+        """Check if 2 SimulatedElementInfo objects describe different elements"""
+        return not self == other
+
+    def __hash__(self):
+        """Return a hash value based on the handle"""
+        return hash(self.handle)
+
+
+class SimulatedMeta(BaseMeta):
+
+    """Metaclass for SimulatedWrapper objects"""
+
+    @staticmethod
+    def find_wrapper(element):
+        """All the simulated elements have the same wrapper"""
+        return SimulatedWrapper
+
+
+@six.add_metaclass(SimulatedMeta)
+class SimulatedWrapper(BaseWrapper):
+
+    """Wrapper of the simulated elements"""
+
+    def __new__(cls, element_info):
+        """Construct the wrapper"""
+        return super(SimulatedWrapper, cls)._create_wrapper(cls, element_info, SimulatedWrapper)
+
+    def __init__(self, element_info):
+        """Initialize the wrapper of a SimulatedElementInfo"""
+        BaseWrapper.__init__(self, element_info, backend.registry.backends['simulated'])
+
+    def __hash__(self):
+        """Return a hash value based on the handle"""
+        return hash(self.handle)
+
+
+backend.register('simulated', SimulatedElementInfo, SimulatedWrapper)
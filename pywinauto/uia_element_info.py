@@ -39,17 +39,114 @@ from .uia_defines import get_elem_interface
 
 from .handleprops import dumpwindow, controlid
 from .element_info import ElementInfo
+from .element_info import cached
 from .win32structures import RECT
 
 
-def elements_from_uia_array(ptrs, cache_enable = False):
+def _rect_from_uia(bound_rect):
+    """Return RECT of the bounding rectangle of the element"""
+    rect = RECT()
+    rect.left = bound_rect.left
+    rect.top = bound_rect.top
+    rect.right = bound_rect.right
+    rect.bottom = bound_rect.bottom
+    return rect
+
+
+# the attributes read by UIAElementInfo.prefetch(): the UIA property
+# and the conversion of the value cached by the UIA element
+_prefetched_uia_properties = {
+    'automation_id': ('UIA_AutomationIdPropertyId', lambda elem: elem.CachedAutomationId),
+    'process_id': ('UIA_ProcessIdPropertyId', lambda elem: elem.CachedProcessId),
+    'framework_id': ('UIA_FrameworkIdPropertyId', lambda elem: elem.CachedFrameworkId),
+    'name': ('UIA_NamePropertyId', lambda elem: elem.CachedName),
+    'class_name': ('UIA_ClassNamePropertyId', lambda elem: elem.CachedClassName),
+    'control_type': ('UIA_ControlTypePropertyId',
+                     lambda elem: IUIA().known_control_type_ids[elem.CachedControlType]),
+    'handle': ('UIA_NativeWindowHandlePropertyId', lambda elem: elem.CachedNativeWindowHandle),
+    'visible': ('UIA_IsOffscreenPropertyId', lambda elem: bool(not elem.CachedIsOffscreen)),
+    'enabled': ('UIA_IsEnabledPropertyId', lambda elem: bool(elem.CachedIsEnabled)),
+    'rectangle': ('UIA_BoundingRectanglePropertyId',
+                  lambda elem: _rect_from_uia(elem.CachedBoundingRectangle)),
+}
+
+
+class _Enumeration(object):
+
+    """
+    The FindAll call which has found some elements (see UIAElementInfo.prefetch)
+
+    The properties of the found elements are fetched by one FindAllBuildCache
+    call of the same parent, scope and condition. The elements with
+    the cached properties are kept for one pass over the found elements
+    in their order, an element prefetched again starts a new pass.
+    """
+
+    __slots__ = ('parent', 'scope', 'condition', 'names', 'cached', 'position')
+
+    def __init__(self, parent, scope, condition):
+        """Keep the arguments of the FindAll call"""
+        self.parent = parent
+        self.scope = scope
+        self.condition = condition
+        # the names of the cached properties and the elements with them
+        self.names = frozenset()
+        self.cached = None
+        # the index of the last prefetched element
+        self.position = -1
+
+    def cached_element(self, index, element, request, names):
+        """Return the element with the cached properties or None if it's not found"""
+        if self.parent is None:
+            return None
+        if self.cached is None or index <= self.position or not names <= self.names:
+            try:
+                self.cached = self.parent.FindAllBuildCache(self.scope, self.condition, request)
+            except COMError:
+                # probably the parent already doesn't exist
+                self.parent = None
+                self.cached = None
+                return None
+            self.names = names
+        self.position = index
+        length = self.cached.Length
+        if index >= length:
+            return None
+        cached = self.cached.GetElement(index)
+        if index == length - 1:
+            # the pass is over
+            self.cached = None
+        # the tree could be changed since the elements were found
+        if not IUIA().iuia.CompareElements(cached, element):
+            return None
+        return cached
+
+
+def elements_from_uia_array(ptrs, cache_enable=False, enumeration=None):
     """Build a list of UIAElementInfo elements from IUIAutomationElementArray"""
-    return [UIAElementInfo(ptrs.GetElement(n), cache_enable) for n in range(ptrs.Length)]
+    return list(iter_elements_from_uia_array(ptrs, cache_enable, enumeration))
+
+
+def iter_elements_from_uia_array(ptrs, cache_enable=False, enumeration=None):
+    """Build UIAElementInfo elements from IUIAutomationElementArray one by one
+
+    The enumeration is the _Enumeration which has returned the array.
+    """
+    for n in range(ptrs.Length):
+        elem = UIAElementInfo(ptrs.GetElement(n), cache_enable)
+        if enumeration is not None:
+            elem._enumeration = enumeration
+            elem._index = n
+        yield elem
 
 
 class UIAElementInfo(ElementInfo):
     """UI element wrapper for IUIAutomation API"""
 
+    __slots__ = ('_element', '_enumeration', '_index')
+
+    bulk_prefetch = True
+
     def __init__(self, handle_or_elem = None, cache_enable = False):
         """
         Create an instance of UIAElementInfo from a handle (int or long)
@@ -68,123 +165,64 @@ class UIAElementInfo(ElementInfo):
                     "with integer or IUIAutomationElement instance only!")
         else:
             self._element = IUIA().root
- 
-        self.set_cache_strategy(cached = cache_enable)
+        # the FindAll call which has found the element and the index in its results
+        self._enumeration = None
+        self._index = -1
 
-    def _get_current_class_name(self):
-        """Return an actual class name of the element"""
-        try:
-            return self._element.CurrentClassName
-        except COMError:
-            return None # probably element already doesn't exist
-    
-    def _get_cached_class_name(self):
-        """Return a cached class name of the element"""
-        if self._cached_class_name is None:
-            self._cached_class_name = self._get_current_class_name()
-        return self._cached_class_name
-
-    def _get_current_handle(self):
-        """Return an actual handle of the element"""
-        try:
-            return self._element.CurrentNativeWindowHandle
-        except COMError:
-            return None # probably element already doesn't exist
-
-    def _get_cached_handle(self):
-        """Return a cached handle of the element"""
-        if self._cached_handle is None:
-            self._cached_handle = self._get_current_handle()
-        return self._cached_handle
-
-    def _get_current_control_type(self):
-        """Return an actual control type of the element"""
-        try:
-            return IUIA().known_control_type_ids[self._element.CurrentControlType]
-        except COMError:
-            return None # probably element already doesn't exist
-
-    def _get_cached_control_type(self):
-        """Return a cached control type of the element"""
-        if self._cached_control_type is None:
-            self._cached_control_type = self._get_current_control_type()
-        return self._cached_control_type
-
-    def _get_current_name(self):
-        """Return an actual name of the element"""
-        try:
-            return self._element.CurrentName
-        except COMError:
-            return None # probably element already doesn't exist
-
-    def _get_cached_name(self):
-        """Return a cached name of the element"""
-        if self._cached_name is None:
-            self._cached_name = self._get_current_name()
-        return self._cached_name
-
-    def _get_current_visible(self):
-        """Return an actual visible property of the element"""
-        try:
-            return bool(not self._element.CurrentIsOffscreen)
-        except COMError:
-            return False # probably element already doesn't exist
-
-    def _get_cached_visible(self):
-        """Return a cached visible property of the element"""
-        if self._cached_visible is None:
-            self._cached_visible = self._get_current_visible()
-        return self._cached_visible
-
-    def _get_current_rich_text(self):
-        """Return the actual rich_text of the element"""
-        if not self.class_name:
-            return self.name
-        try:
-            pattern = get_elem_interface(self._element, "Text")
-            return pattern.DocumentRange.GetText(-1)
-        except Exception:
-            return self.name # TODO: probably we should raise an exception here
-
-    def _get_cached_rich_text(self):
-        """Return the cached rich_text of the element"""
-        if self._cached_rich_text is None:
-            self._cached_rich_text = self._get_current_rich_text()
-        return self._cached_rich_text
-
-    def set_cache_strategy(self, cached = None):
-        """Setup a cache strategy for frequently used attributes"""
-        if cached is True:
-            # Refresh cached attributes
-            self._cached_class_name = None
-            self._cached_handle = None
-            self._cached_control_type = None
-            self._cached_name = None
-            self._cached_visible = None
-            self._cached_rich_text = None
-
-            # Switch to cached attributes
-            self._get_class_name = self._get_cached_class_name
-            self._get_handle = self._get_cached_handle
-            self._get_control_type = self._get_cached_control_type
-            self._get_name = self._get_cached_name
-            self._get_visible = self._get_cached_visible
-            self._get_rich_text = self._get_cached_rich_text
-        else:
-            # Switch to actual (non-cached) attributes
-            self._get_class_name = self._get_current_class_name
-            self._get_handle = self._get_current_handle
-            self._get_control_type = self._get_current_control_type
-            self._get_name = self._get_current_name
-            self._get_visible = self._get_current_visible
-            self._get_rich_text = self._get_current_rich_text
+        self.set_cache_strategy(cached=cache_enable)
 
     @property
     def element(self):
         """Return AutomationElement's instance"""
         return self._element
 
-    @property
+    @classmethod
+    def prefetch(cls, elements, attributes):
+        """
+        Read the attributes of the elements by a UI Automation cache request
+
+        The attributes of the elements found by one FindAll call (e.g. by
+        children() or descendants()) are fetched by one FindAllBuildCache
+        call of their parent with the same cache request. The attributes
+        of the other elements are fetched by one BuildUpdatedCache call
+        per element instead of a call per attribute.
+        The rich text is known without a call if the element has no class name,
+        the attributes which can't be cached by UIA are read on the first use.
+        """
+        attributes = set(attributes)
+        if 'rich_text' in attributes:
+            attributes.update(('name', 'class_name'))
+        props = [prop for prop in cls._prefetched_properties(attributes)
+                 if prop.name in _prefetched_uia_properties]
+        elements = [elem for elem in elements if elem.cache_enabled]
+        if not props or not elements:
+            return
+
+        iuia = IUIA()
+        request = iuia.iuia.CreateCacheRequest()
+        for prop in props:
+            request.AddProperty(getattr(iuia.UIA_dll, _prefetched_uia_properties[prop.name][0]))
+        rich_text = cls.rich_text if 'rich_text' in attributes else None
+        names = frozenset(prop.name for prop in props)
+
+        for elem in elements:
+            try:
+                updated = None
+                if elem._enumeration is not None:
+                    updated = elem._enumeration.cached_element(elem._index, elem._element, request, names)
+                if updated is None:
+                    # no common parent or the tree has been changed since the enumeration
+                    updated = elem._element.BuildUpdatedCache(request)
+                values = dict((prop.name, _prefetched_uia_properties[prop.name][1](updated))
+                              for prop in props)
+            except COMError:
+                continue  # probably element already doesn't exist
+            for prop in props:
+                elem._store_cached(prop, values[prop.name])
+            if rich_text is not None and not values['class_name']:
+                elem._store_cached(rich_text, values['name'])
+
+    @cached()
     def automation_id(self):
         """Return AutomationId of the element"""
         try:
@@ -200,12 +238,12 @@ class UIAElementInfo(ElementInfo):
         else:
             return None
 
-    @property
+    @cached()
     def process_id(self):
         """Return ProcessId of the element"""
         return self._element.CurrentProcessId
 
-    @property
+    @cached()
     def framework_id(self):
         """Return FrameworkId of the element"""
         return self._element.CurrentFrameworkId
@@ -215,25 +253,37 @@ class UIAElementInfo(ElementInfo):
         """Return Runtime ID (hashable value but may be different from run to run)"""
         return self._element.GetRuntimeId()
 
-    @property
+    @cached()
     def name(self):
         """Return name of the element"""
-        return self._get_name()
+        try:
+            return self._element.CurrentName
+        except COMError:
+            return None  # probably element already doesn't exist
 
-    @property
+    @cached()
     def class_name(self):
         """Return class name of the element"""
-        return self._get_class_name()
+        try:
+            return self._element.CurrentClassName
+        except COMError:
+            return None  # probably element already doesn't exist
 
-    @property
+    @cached()
     def control_type(self):
         """Return control type of element"""
-        return self._get_control_type()
+        try:
+            return IUIA().known_control_type_ids[self._element.CurrentControlType]
+        except COMError:
+            return None  # probably element already doesn't exist
 
-    @property
+    @cached()
     def handle(self):
         """Return handle of the element"""
-        return self._get_handle()
+        try:
+            return self._element.CurrentNativeWindowHandle
+        except COMError:
+            return None  # probably element already doesn't exist
 
     @property
     def parent(self):
@@ -246,8 +296,13 @@ class UIAElementInfo(ElementInfo):
 
     def _get_elements(self, tree_scope, cond = IUIA().true_condition, cache_enable = False):
         """Find all elements according to the given tree scope and conditions"""
+        return list(self._iter_elements(tree_scope, cond, cache_enable))
+
+    def _iter_elements(self, tree_scope, cond, cache_enable):
+        """Find all elements and create the element infos one by one"""
         ptrs_array = self._element.FindAll(tree_scope, cond)
-        return elements_from_uia_array(ptrs_array, cache_enable)
+        enumeration = _Enumeration(self._element, tree_scope, cond) if cache_enable else None
+        return iter_elements_from_uia_array(ptrs_array, cache_enable, enumeration)
 
     def children(self, **kwargs):
         """Return a list of only immediate children of the element
@@ -269,35 +324,58 @@ class UIAElementInfo(ElementInfo):
         cond = IUIA().build_condition(**kwargs)
         return self._get_elements(IUIA().tree_scope["descendants"], cond, cache_enable)
 
-    @property
+    def iter_children(self, **kwargs):
+        """Iterate over the immediate children of the element
+
+        The criteria are the same as of :py:meth:`children`, the elements
+        are created only when they are taken from the iterator.
+        """
+        cache_enable = kwargs.pop('cache_enable', False)
+        cond = IUIA().build_condition(**kwargs)
+        return self._iter_elements(IUIA().tree_scope["children"], cond, cache_enable)
+
+    def iter_descendants(self, **kwargs):
+        """Iterate over all the descendants of the element
+
+        The criteria are the same as of :py:meth:`descendants`, the elements
+        are created only when they are taken from the iterator.
+        """
+        cache_enable = kwargs.pop('cache_enable', False)
+        cond = IUIA().build_condition(**kwargs)
+        return self._iter_elements(IUIA().tree_scope["descendants"], cond, cache_enable)
+
+    @cached()
     def visible(self):
         """Check if the element is visible"""
-        return self._get_visible()
+        try:
+            return bool(not self._element.CurrentIsOffscreen)
+        except COMError:
+            return False  # probably element already doesn't exist
 
-    @property
+    @cached()
     def enabled(self):
         """Check if the element is enabled"""
         return bool(self._element.CurrentIsEnabled)
 
-    @property
+    @cached(copy=RECT)
     def rectangle(self):
         """Return rectangle of the element"""
-        bound_rect = self._element.CurrentBoundingRectangle
-        rect = RECT()
-        rect.left = bound_rect.left
-        rect.top = bound_rect.top
-        rect.right = bound_rect.right
-        rect.bottom = bound_rect.bottom
-        return rect
+        return _rect_from_uia(self._element.CurrentBoundingRectangle)
 
     def dump_window(self):
         """Dump window to a set of properties"""
         return dumpwindow(self.handle)
 
-    @property
+    @cached()
     def rich_text(self):
         """Return rich_text of the element"""
-        return self._get_rich_text()
+        if not self.class_name:
+            return self.name
+        try:
+            pattern = get_elem_interface(self._element, "Text")
+            return pattern.DocumentRange.GetText(-1)
+        except Exception:
+            return self.name  # TODO: probably we should raise an exception here
 
     def __eq__(self, other):
         """Check if 2 UIAElementInfo objects describe 1 actual element"""
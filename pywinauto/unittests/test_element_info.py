@@ -0,0 +1,196 @@
+# GUI Application automation and testing library
+# Copyright (C) 2006-2017 Mark Mc Mahon and Contributors
+# https://github.com/pywinauto/pywinauto/graphs/contributors
+# http://pywinauto.readthedocs.io/en/latest/credits.html
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of pywinauto nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Tests for the cached attributes of element_info.py"""
+
+import time
+import unittest
+import sys
+sys.path.append(".")
+
+from pywinauto import element_info  # noqa: E402
+from pywinauto.element_info import ElementInfo, cached, NEVER, TTL  # noqa: E402
+
+
+class CountingElementInfo(ElementInfo):
+
+    """An element info counting the reads of its attributes"""
+
+    __slots__ = ('reads', 'text')
+
+    def __init__(self, text, cache_enable=False):
+        self.reads = 0
+        self.text = text
+        self.set_cache_strategy(cached=cache_enable)
+
+    @cached()
+    def rich_text(self):
+        """Return the text"""
+        self.reads += 1
+        return self.text
+
+    @cached(NEVER)
+    def visible(self):
+        """Return the text is not empty"""
+        self.reads += 1
+        return bool(self.text)
+
+    @cached(TTL, ttl=0.1)
+    def class_name(self):
+        """Return the class name"""
+        self.reads += 1
+        return self.text.upper()
+
+    @cached(copy=list)
+    def texts(self):
+        """Return the list of the texts"""
+        self.reads += 1
+        return [self.text]
+
+
+class CachedAttributesTests(unittest.TestCase):
+
+    """Unit tests for the cached() attributes of the element infos"""
+
+    def setUp(self):
+        """Reset the counters and count the reads"""
+        element_info.reset_cache_stats()
+        element_info.set_cache_stats(True)
+
+    def tearDown(self):
+        """Switch the caches on and the counters off"""
+        element_info.set_caching(True)
+        element_info.set_cache_stats(False)
+
+    def test_not_cached(self):
+        """Test that the attributes are read every time by default"""
+        elem = CountingElementInfo('a')
+        elem.rich_text
+        elem.rich_text
+        self.assertEqual(elem.reads, 2)
+        self.assertEqual(element_info.cache_stats()['misses'], 0)
+
+    def test_per_query(self):
+        """Test that the cached values are kept until invalidate()"""
+        elem = CountingElementInfo('a', cache_enable=True)
+        self.assertEqual(elem.rich_text, 'a')
+        elem.text = 'b'
+        self.assertEqual(elem.rich_text, 'a')
+        self.assertEqual(elem.reads, 1)
+
+        elem.invalidate('rich_text')
+        self.assertEqual(elem.rich_text, 'b')
+        elem.text = 'c'
+        elem.set_cache_strategy(cached=True)
+        self.assertEqual(elem.rich_text, 'c')
+        self.assertEqual(element_info.cache_stats(),
+                         {'hits': 1, 'misses': 3, 'hit_rate': .25})
+
+    def test_never(self):
+        """Test the NEVER policy"""
+        elem = CountingElementInfo('a', cache_enable=True)
+        elem.visible
+        elem.visible
+        self.assertEqual(elem.reads, 2)
+
+    def test_ttl(self):
+        """Test that the values of the TTL attributes expire"""
+        elem = CountingElementInfo('a', cache_enable=True)
+        self.assertEqual(elem.class_name, 'A')
+        elem.text = 'b'
+        self.assertEqual(elem.class_name, 'A')
+        time.sleep(0.2)
+        self.assertEqual(elem.class_name, 'B')
+
+        # the time to live of the element overrides the policies
+        elem.set_cache_strategy(cached=True, ttl=0)
+        elem.rich_text
+        elem.rich_text
+        self.assertEqual(elem.reads, 4)
+
+    def test_none_cached(self):
+        """Test that None is cached as the other values"""
+        elem = CountingElementInfo(None, cache_enable=True)
+        self.assertEqual(elem.rich_text, None)
+        elem.text = 'a'
+        self.assertEqual(elem.rich_text, None)
+        elem.invalidate('rich_text')
+        self.assertEqual(elem.rich_text, 'a')
+        self.assertEqual(elem.reads, 2)
+
+    def test_stats_off(self):
+        """Test that the reads aren't counted after set_cache_stats(False)"""
+        element_info.set_cache_stats(False)
+        elem = CountingElementInfo('a', cache_enable=True)
+        elem.rich_text
+        elem.rich_text
+        self.assertEqual(element_info.cache_stats(), {'hits': 0, 'misses': 0, 'hit_rate': 0.})
+
+    def test_copy(self):
+        """Test that the cached value is copied"""
+        elem = CountingElementInfo('a', cache_enable=True)
+        elem.texts.append('b')
+        self.assertEqual(elem.texts, ['a'])
+        self.assertEqual(elem.reads, 1)
+
+    def test_set_caching(self):
+        """Test the global switch of the caches"""
+        elem = CountingElementInfo('a', cache_enable=True)
+        element_info.set_caching(False)
+        elem.rich_text
+        elem.rich_text
+        self.assertEqual(elem.reads, 2)
+        element_info.set_caching(True)
+        elem.rich_text
+        elem.rich_text
+        self.assertEqual(elem.reads, 3)
+
+    def test_prefetch(self):
+        """Test that the generic prefetch() fills the caches of the elements"""
+        elements = [CountingElementInfo('a', cache_enable=True), CountingElementInfo('b')]
+        CountingElementInfo.prefetch(elements, ['rich_text', 'visible', 'handle'])
+        # the NEVER attributes and the elements without the cache are not read
+        self.assertEqual([elem.reads for elem in elements], [1, 0])
+        self.assertEqual(elements[0].rich_text, 'a')
+        self.assertEqual(elements[0].reads, 1)
+
+        element_info.set_caching(False)
+        CountingElementInfo.prefetch(elements, ['class_name'])
+        self.assertEqual(elements[0].reads, 1)
+
+    def test_wrong_policy(self):
+        """Test the wrong policies"""
+        self.assertRaises(ValueError, cached('always'), lambda elem: None)
+        self.assertRaises(ValueError, cached(TTL), lambda elem: None)
+
+
+if __name__ == "__main__":
+    unittest.main()
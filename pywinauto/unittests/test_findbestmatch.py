@@ -33,6 +33,9 @@
 
 import unittest
 import os.path
+import shutil
+import tempfile
+import weakref
 
 test_path = os.path.split(__file__)[0]
 
@@ -40,6 +43,7 @@ import sys
 sys.path.append(".")
 from pywinauto import findbestmatch
 from pywinauto import win32structures
+from pywinauto.base_wrapper import PropertySnapshot  # noqa: E402
 
 
 class TestFindBestMatch(unittest.TestCase):
@@ -67,6 +71,182 @@ class TestFindBestMatch(unittest.TestCase):
         result =  findbestmatch._clean_non_chars(s)
         self.assertEqual('', result)
 
+    def testScoreVariantsSinglePass(self):
+        "Test that a single pass gives the same results as separate passes"
+        names = findbestmatch.UniqueDict()
+        for i, text in enumerate(["OK", "OKButton", "Button", "Cancel", "CancelButton",
+                                  "O.K. Button", "&Help", "HelpButton", "Button"]):
+            names[text] = i
+
+        for search_text in ["Button", "button", "OK button", "ok-Button", "Cancel"]:
+            findbestmatch._cache.clear()
+            results = findbestmatch._score_variants(search_text, names.name_variants())
+            for variant, (clean, ignore_case) in enumerate(findbestmatch._match_variants):
+                findbestmatch._cache.clear()
+                self.assertEqual(
+                    results[variant],
+                    names.FindBestMatches(search_text, clean=clean, ignore_case=ignore_case))
+
+
+class UniqueDictTestCase(unittest.TestCase):
+
+    """Unit tests for making the names unique"""
+
+    def testDuplicateNames(self):
+        """Test the suffixes and the text0/text1 aliases of duplicates"""
+        names = findbestmatch.UniqueDict()
+        names["Edit3"] = "other"
+        for i in range(5):
+            names["Edit"] = i
+        self.assertEqual(names, {"Edit": 0, "Edit0": 0, "Edit1": 0, "Edit2": 1,
+                                 "Edit3": "other", "Edit4": 2, "Edit5": 3, "Edit6": 4})
+
+    def testRemovedNameIsReused(self):
+        """Test that the suffix of a removed name is given again"""
+        names = findbestmatch.UniqueDict()
+        for i in range(4):
+            names["Edit"] = i
+        del names["Edit2"]
+        names["Edit"] = 4
+        self.assertEqual(names["Edit2"], 4)
+        self.assertEqual(names.pop("Edit3"), 2)
+        names["Edit"] = 5
+        self.assertEqual(names["Edit3"], 5)
+
+    def testFromLayout(self):
+        """Test rebuilding the names for the other items"""
+        names = findbestmatch.UniqueDict()
+        for i in range(3):
+            names["Edit"] = i
+        rebuilt = findbestmatch.UniqueDict.from_layout(list(names), [names[key] * 10 for key in names])
+        self.assertEqual(rebuilt, dict((key, value * 10) for key, value in names.items()))
+        rebuilt["Edit"] = 30
+        self.assertEqual(rebuilt["Edit4"], 30)
+
+
+class SimilarityCacheTestCase(unittest.TestCase):
+
+    """Unit tests for the bounded cache of the match ratios"""
+
+    def testEvictLeastRecentlyUsed(self):
+        """Test that the least recently used ratio is evicted"""
+        cache = findbestmatch.SimilarityCache(max_size=2)
+        cache["a"] = .1
+        cache["b"] = .2
+        self.assertEqual(cache.get("a"), .1)
+        cache["c"] = .3
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), .1)
+        self.assertEqual(cache.get("c"), .3)
+        self.assertEqual(cache.stats(), {'size': 2, 'max_size': 2,
+                                         'hits': 3, 'misses': 1, 'evictions': 1})
+
+    def testResizeAndClear(self):
+        """Test changing the size of the cache at runtime"""
+        cache = findbestmatch.SimilarityCache(max_size=10)
+        for i in range(10):
+            cache[i] = i
+        cache.resize(3)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.evictions, 7)
+        self.assertTrue(9 in cache)
+
+        cache.resize(0)
+        cache[1] = 1
+        self.assertEqual(len(cache), 0)
+
+        cache.resize(10)
+        cache[1] = 1
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['evictions'], 0)
+
+    def testMatchRatiosAreCached(self):
+        """Test that the match functions use the module cache"""
+        findbestmatch.clear_cache()
+        findbestmatch._get_match_ratios(["Hello", "World"], "hello")
+        self.assertEqual(findbestmatch.cache_stats()['misses'], 2)
+        findbestmatch._get_match_ratios(["Hello", "World"], "hello")
+        self.assertEqual(findbestmatch.cache_stats()['hits'], 2)
+
+        max_size = findbestmatch.cache_stats()['max_size']
+        findbestmatch.set_cache_size(1)
+        self.assertEqual(findbestmatch.cache_stats()['size'], 1)
+        findbestmatch.set_cache_size(max_size)
+
+
+class SimilarityBackendTestCase(unittest.TestCase):
+
+    """Unit tests for the similarity scorers and the trigram prefilter"""
+
+    names = ["OK", "OKButton", "Button", "Cancel", "CancelButton", "O.K. Button",
+             "&Help", "HelpButton", "Button", "Phone Edit", "Phone2Edit", "Fax Edit"]
+
+    def setUp(self):
+        """Build the name variants of the test names"""
+        findbestmatch.clear_cache()
+        self.name_variants = [(name, findbestmatch._name_variants(name))
+                              for name in findbestmatch.UniqueDict.fromkeys(self.names)]
+        self.prefilter = findbestmatch.TrigramIndex(self.name_variants)
+
+    def tearDown(self):
+        """Restore the default similarity backend"""
+        findbestmatch.set_similarity_backend()
+
+    def testLevenshteinRatio(self):
+        """Test the ratio of the banded Levenshtein scorer"""
+        scorer = findbestmatch.LevenshteinScorer()
+        self.assertEqual(scorer.ratio("kitten", "kitten"), 1.0)
+        self.assertEqual(scorer.ratio("kitten", "sitting"), 1 - 3 / 7.)
+        self.assertEqual(scorer.ratio("", ""), 1.0)
+        # texts which are too different are not scored exactly
+        self.assertTrue(scorer.ratio("kitten", "sitting", min_ratio=.9) < .9)
+        self.assertEqual(scorer.upper_bound(3, 6), .5)
+
+    def testTrigramCandidates(self):
+        """Test that the most similar names are the first candidates"""
+        candidates = self.prefilter.candidates("Phone Edit")
+        self.assertEqual(self.name_variants[candidates[0]][0], "Phone Edit")
+        self.assertTrue(len(self.prefilter.candidates("Phone Edit", .5)) < len(candidates))
+
+    def testCompatibleModeSameResult(self):
+        """Test that the compatible mode ignores the prefilter and the scorer"""
+        for search_text in ("OK", "Buton", "cancel", "phone 2 edit", "Help", "xyz"):
+            expected = findbestmatch._score_variants(search_text, self.name_variants)
+            for scorer in (None, findbestmatch.LevenshteinScorer()):
+                result = findbestmatch._score_variants(
+                    search_text, self.name_variants, prefilter=self.prefilter, scorer=scorer)
+                self.assertEqual(result, expected)
+
+    def testFastMode(self):
+        """Test scoring only the trigram candidates with another scorer"""
+        result = findbestmatch._score_variants(
+            "Phone Edit", self.name_variants, prefilter=self.prefilter,
+            scorer=findbestmatch.LevenshteinScorer(), compatible=False)
+        self.assertEqual(result[0], (1.0, ["Phone Edit"]))
+
+    def testSetSimilarityBackend(self):
+        """Test choosing the similarity backend"""
+        findbestmatch.set_similarity_backend("levenshtein", prefilter="trigram", compatible=False)
+        self.assertTrue(isinstance(findbestmatch.similarity_scorer, findbestmatch.LevenshteinScorer))
+        self.assertTrue(findbestmatch.use_trigram_prefilter)
+        self.assertFalse(findbestmatch.compatible_matching)
+
+        # the prefilter is opt-in and turns the compatible mode off
+        findbestmatch.set_similarity_backend(prefilter="trigram")
+        self.assertFalse(findbestmatch.compatible_matching)
+        findbestmatch.set_similarity_backend()
+        self.assertFalse(findbestmatch.use_trigram_prefilter)
+        self.assertTrue(findbestmatch.compatible_matching)
+
+        self.assertRaises(ValueError, findbestmatch.set_similarity_backend, "soundex")
+        self.assertRaises(ValueError, findbestmatch.set_similarity_backend,
+                          prefilter="trigram", compatible=True)
+        self.assertRaises(ValueError, findbestmatch.set_similarity_backend, prefilter="bigram")
+        self.assertRaises(TypeError, findbestmatch.set_similarity_backend, 42)
+
 
 class DummyCtrl():
     def __init__(self, l, t, r, b):
@@ -127,6 +307,434 @@ class TestIsAboveOrToLeft(unittest.TestCase):
         self.assertEqual(result, False)
 
 
+class FakeCtrl(object):
+
+    """A control that provides everything needed to name it"""
+
+    can_be_label = True
+    has_title = True
+
+    def __init__(self, handle, class_name, text, left, top, right, bottom, visible=True):
+        self.handle = handle
+        self.class_name = class_name
+        self.text = text
+        self.visible = visible
+        self.rect = win32structures.RECT(left, top, right, bottom)
+        self.calls = 0
+        self.rectangle_calls = 0
+
+    def friendly_class_name(self):
+        self.calls += 1
+        return self.class_name
+
+    def window_text(self):
+        self.calls += 1
+        return self.text
+
+    def is_visible(self):
+        self.calls += 1
+        return self.visible
+
+    def rectangle(self):
+        self.calls += 1
+        self.rectangle_calls += 1
+        return self.rect
+
+    def texts(self):
+        self.calls += 1
+        return [self.text]
+
+
+class SnapshotCtrl(FakeCtrl):
+
+    """A control named by a snapshot of its properties like the wrappers"""
+
+    def naming_snapshot(self):
+        return PropertySnapshot(self)
+
+
+def _build_fake_dialog(ctrl_class=FakeCtrl):
+    """Return a list of controls: labels with edits to the right of them"""
+    ctrls = []
+    for row in range(5):
+        top = row * 30
+        ctrls.append(ctrl_class(2 * row + 1, "Static", "Label%d" % row, 10, top, 90, top + 20))
+        ctrls.append(ctrl_class(2 * row + 2, "Edit", "", 100, top, 200, top + 20))
+    ctrls.append(ctrl_class(100, "Button", "OK", 10, 200, 90, 220))
+    return ctrls
+
+
+class LabelIndexTestCase(unittest.TestCase):
+
+    """Unit tests for the spatial index of the text controls"""
+
+    def testNearestLabel(self):
+        """Test that the closest text control above or to the left is found"""
+        ctrls = _build_fake_dialog()
+        labels = findbestmatch.LabelIndex(ctrls)
+        self.assertEqual(labels.nearest_label(ctrls[3]), "Label1")
+        self.assertEqual(labels.position(ctrls[3]), 3)
+
+        # too far to be a label
+        far = FakeCtrl(200, "Edit", "", 5000, 5000, 5100, 5020)
+        self.assertEqual(labels.nearest_label(far), "")
+
+    def testSameAsFullScan(self):
+        """Test that the equally close labels are chosen in the list order"""
+        ctrls = [FakeCtrl(1, "Static", "Left", 0, 50, 40, 70),
+                 FakeCtrl(2, "Static", "Above", 50, 0, 200, 40),
+                 FakeCtrl(3, "Edit", "", 50, 50, 200, 70)]
+        self.assertEqual(findbestmatch.LabelIndex(ctrls).nearest_label(ctrls[2]), "Left")
+        self.assertEqual(findbestmatch.get_non_text_control_name(ctrls[2], ctrls, ctrls[:2]),
+                         ["AboveEdit", "LeftEdit"])
+
+    def testRectangleFetchedOnce(self):
+        """Test that build_unique_dict gets each rectangle only once"""
+        ctrls = _build_fake_dialog()
+        findbestmatch.build_unique_dict(ctrls)
+        self.assertEqual([ctrl.rectangle_calls for ctrl in ctrls], [1] * len(ctrls))
+
+
+class NameIndexTestCase(unittest.TestCase):
+
+    """Unit tests for the persistent names of the dialog controls"""
+
+    def setUp(self):
+        """Set some data and ensure the application is in the state we want"""
+        findbestmatch.clear_name_indexes()
+        self.ctrls = _build_fake_dialog()
+
+    def testSameNamesAsBuildUniqueDict(self):
+        """Test that the index contains the same names as build_unique_dict"""
+        name_index = findbestmatch.NameIndex()
+        name_index.refresh(self.ctrls)
+        self.assertEqual(dict(name_index.name_control_map),
+                         dict(findbestmatch.build_unique_dict(self.ctrls)))
+
+    def testRefreshWithoutChanges(self):
+        """Test that nothing is renamed if the controls have not changed"""
+        name_index = findbestmatch.NameIndex()
+        name_index.refresh(self.ctrls)
+        self.assertEqual(name_index.renamed, len(self.ctrls))
+
+        name_index.refresh(self.ctrls)
+        self.assertEqual(name_index.renamed, 0)
+        self.assertEqual(dict(name_index.name_control_map),
+                         dict(findbestmatch.build_unique_dict(self.ctrls)))
+
+    def testRefreshChangedText(self):
+        """Test that a changed label renames the controls named after it"""
+        name_index = findbestmatch.NameIndex()
+        name_index.refresh(self.ctrls)
+        self.ctrls[2].text = "Password"
+
+        name_index.refresh(self.ctrls)
+        self.assertTrue(0 < name_index.renamed < len(self.ctrls))
+        self.assertEqual(dict(name_index.name_control_map),
+                         dict(findbestmatch.build_unique_dict(self.ctrls)))
+        self.assertTrue(name_index.name_control_map["PasswordEdit"] is self.ctrls[3])
+        self.assertFalse("Label1Edit" in name_index.name_control_map)
+
+    def testRefreshChangedControls(self):
+        """Test that a different set of controls rebuilds the index"""
+        name_index = findbestmatch.NameIndex()
+        name_index.refresh(self.ctrls)
+
+        name_index.refresh(self.ctrls[:-1])
+        self.assertEqual(name_index.renamed, len(self.ctrls) - 1)
+        self.assertFalse("OK" in name_index.name_control_map)
+
+    def testRefreshReadsAllControls(self):
+        """Test that every refresh reads all the controls"""
+        name_index = findbestmatch.NameIndex()
+        name_index.refresh(self.ctrls)
+        for ctrl in self.ctrls:
+            ctrl.calls = 0
+
+        name_index.refresh(self.ctrls)
+        self.assertEqual([ctrl.calls > 0 for ctrl in self.ctrls], [True] * len(self.ctrls))
+        self.assertEqual(name_index.renamed, 0)
+
+    def testRenamedControl(self):
+        """Test that a control renamed after another lookup is found by its new name"""
+        ctrls = [FakeCtrl(1, "Button", "Save", 10, 10, 90, 30),
+                 FakeCtrl(2, "Button", "Open", 100, 10, 190, 30)]
+        name_index = findbestmatch.get_name_index(ctrls[0])
+        self.assertEqual(findbestmatch.find_best_control_matches("Open", ctrls, name_index), [ctrls[1]])
+
+        ctrls[1].text = "Save As"
+        self.assertEqual(findbestmatch.find_best_control_matches("Save As", ctrls, name_index), [ctrls[1]])
+        self.assertEqual(findbestmatch.match_many(["Save As"], ctrls, name_index), [[ctrls[1]]])
+        self.assertEqual(findbestmatch.rank_controls("Save As", ctrls, 1, name_index)[0].control, ctrls[1])
+
+    def testNoReferencesToControls(self):
+        """Test that the index doesn't keep the controls alive"""
+        name_index = findbestmatch.NameIndex()
+        name_index.refresh(self.ctrls)
+        ref = weakref.ref(self.ctrls[0])
+        del self.ctrls
+        self.assertTrue(ref() is None)
+        self.assertEqual(dict(name_index.name_control_map), {})
+
+    def testFindBestControlMatches(self):
+        """Test that the index gives the same matches as the plain lookup"""
+        name_index = findbestmatch.get_name_index(self.ctrls[0])
+        for search_text in ["OK", "ok", "label3edit", "Label2", "Edit", "Edit3", "Button"]:
+            self.assertEqual(
+                findbestmatch.find_best_control_matches(search_text, self.ctrls),
+                findbestmatch.find_best_control_matches(search_text, self.ctrls, name_index))
+
+        self.assertRaises(findbestmatch.MatchError,
+                          findbestmatch.find_best_control_matches,
+                          "xyz", self.ctrls, name_index)
+
+    def testGetNameIndex(self):
+        """Test that the same index is returned for the same dialog"""
+        name_index = findbestmatch.get_name_index(self.ctrls[0])
+        self.assertTrue(findbestmatch.get_name_index(self.ctrls[0]) is name_index)
+        self.assertFalse(findbestmatch.get_name_index(self.ctrls[1]) is name_index)
+        self.assertFalse(findbestmatch.get_name_index(self.ctrls[0], scope=1) is name_index)
+        self.assertEqual(findbestmatch.get_name_index(FakeCtrl(0, "", "", 0, 0, 0, 0)), None)
+
+
+class NamesCacheTestCase(unittest.TestCase):
+
+    """Unit tests for the on-disk cache of the control names"""
+
+    def setUp(self):
+        """Set some data and ensure the application is in the state we want"""
+        findbestmatch.clear_name_indexes()
+        self.folder = tempfile.mkdtemp()
+        findbestmatch.set_names_cache(os.path.join(self.folder, "names.db"))
+        self.ctrls = _build_fake_dialog()
+
+    def tearDown(self):
+        """Close the cache"""
+        findbestmatch.set_names_cache(None)
+        shutil.rmtree(self.folder)
+
+    def testBuildUniqueDict(self):
+        """Test that the names of the same dialog are taken from the cache"""
+        expected = findbestmatch.build_unique_dict(self.ctrls)
+        cache = findbestmatch.names_cache
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 0, 'misses': 1})
+
+        self.assertEqual(findbestmatch.build_unique_dict(self.ctrls), expected)
+        self.assertEqual(cache.hits, 1)
+
+        # the names don't depend on the position of the dialog
+        for ctrl in self.ctrls:
+            ctrl.rect = win32structures.RECT(ctrl.rect.left + 100, ctrl.rect.top + 50,
+                                             ctrl.rect.right + 100, ctrl.rect.bottom + 50)
+        self.assertEqual(findbestmatch.build_unique_dict(self.ctrls), expected)
+        self.assertEqual(cache.hits, 2)
+
+    def testChangedTexts(self):
+        """Test that the stored labels name a dialog with other texts"""
+        findbestmatch.build_unique_dict(self.ctrls)
+        self.ctrls[2].text = "Password"
+        names = findbestmatch.build_unique_dict(self.ctrls)
+        self.assertTrue(names["PasswordEdit"] is self.ctrls[3])
+        self.assertEqual(findbestmatch.names_cache.stats(), {'size': 1, 'hits': 1, 'misses': 1})
+
+        findbestmatch.set_names_cache(None)
+        self.assertEqual(names, findbestmatch.build_unique_dict(self.ctrls))
+
+    def testChangedLayout(self):
+        """Test that a dialog with another layout is named again"""
+        findbestmatch.build_unique_dict(self.ctrls)
+        self.ctrls[2].text = ""
+        names = findbestmatch.build_unique_dict(self.ctrls)
+        self.assertFalse("Label1Edit" in names)
+        self.assertEqual(findbestmatch.names_cache.stats(), {'size': 2, 'hits': 0, 'misses': 2})
+
+        findbestmatch.set_names_cache(None)
+        self.assertEqual(names, findbestmatch.build_unique_dict(self.ctrls))
+
+    def testNoTextsStored(self):
+        """Test that the texts of the controls are not written to the database"""
+        findbestmatch.build_unique_dict(self.ctrls)
+        findbestmatch.set_names_cache(None)
+        with open(os.path.join(self.folder, "names.db"), "rb") as db:
+            content = db.read()
+        self.assertFalse(b"Label" in content)
+
+    def testSharedBetweenCaches(self):
+        """Test that another cache of the same file has the names"""
+        expected = findbestmatch.build_unique_dict(self.ctrls)
+        cache = findbestmatch.ControlNamesCache(os.path.join(self.folder, "names.db"))
+        findbestmatch.set_names_cache(None)
+        findbestmatch.names_cache = cache
+
+        name_index = findbestmatch.NameIndex()
+        name_index.refresh(self.ctrls)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(dict(name_index.name_control_map), dict(expected))
+
+        # the names are still updated incrementally
+        self.ctrls[2].text = "Password"
+        name_index.refresh(self.ctrls)
+        self.assertTrue(name_index.name_control_map["PasswordEdit"] is self.ctrls[3])
+
+    def testMaxEntries(self):
+        """Test that the oldest dialogs are removed"""
+        cache = findbestmatch.ControlNamesCache(":memory:", max_entries=2)
+        for i in range(3):
+            cache.set(str(i), [None, (0, -1)])
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("0"), None)
+        self.assertEqual(cache.get("2"), [None, (0, -1)])
+        cache.clear()
+        self.assertEqual(cache.stats(), {'size': 0, 'hits': 0, 'misses': 0})
+
+
+class NamingStatsTestCase(unittest.TestCase):
+
+    """Unit tests for the totals of the property calls made to name the controls"""
+
+    def setUp(self):
+        """Set some data and ensure the application is in the state we want"""
+        findbestmatch.clear_name_indexes()
+        findbestmatch.reset_naming_stats()
+        self.ctrls = _build_fake_dialog(SnapshotCtrl)
+
+    def tearDown(self):
+        """Reset the totals"""
+        findbestmatch.reset_naming_stats()
+
+    def testOneLookup(self):
+        """Test the totals of the snapshots after one lookup"""
+        self.assertTrue(findbestmatch.find_best_control_matches("OK", self.ctrls)[0] is self.ctrls[-1])
+
+        # every call to a control was made by a snapshot
+        fetched = sum(ctrl.calls for ctrl in self.ctrls)
+        stats = findbestmatch.naming_stats()
+        self.assertEqual(stats['namings'], 1)
+        self.assertEqual(stats['fetched'], fetched)
+        self.assertTrue(stats['served'] > stats['fetched'])
+        self.assertEqual(stats['saved'], stats['served'] - stats['fetched'])
+
+    def testAddedUp(self):
+        """Test that the snapshots of the name index refreshes are added up"""
+        name_index = findbestmatch.NameIndex()
+        name_index.refresh(self.ctrls)
+        first = findbestmatch.naming_stats()
+        name_index.refresh(self.ctrls)
+        stats = findbestmatch.naming_stats()
+        self.assertEqual(stats['namings'], 2)
+        self.assertEqual(stats['fetched'], sum(ctrl.calls for ctrl in self.ctrls))
+        self.assertTrue(stats['fetched'] > first['fetched'])
+
+        findbestmatch.reset_naming_stats()
+        self.assertEqual(findbestmatch.naming_stats(),
+                         {'namings': 0, 'fetched': 0, 'served': 0, 'saved': 0})
+
+    def testControlsWithoutSnapshots(self):
+        """Test that the controls named without snapshots are not counted"""
+        findbestmatch.build_unique_dict(_build_fake_dialog())
+        self.assertEqual(findbestmatch.naming_stats(),
+                         {'namings': 1, 'fetched': 0, 'served': 0, 'saved': 0})
+
+
+class RankControlsTestCase(unittest.TestCase):
+
+    """Unit tests for the ranked candidates of a best match lookup"""
+
+    def setUp(self):
+        """Set some data and ensure the application is in the state we want"""
+        findbestmatch.clear_cache()
+        self.ctrls = _build_fake_dialog()
+
+    def testRankControls(self):
+        """Test that the best scored controls are returned with their names"""
+        matches = findbestmatch.rank_controls("label3edit", self.ctrls, k=3)
+        self.assertEqual(len(matches), 3)
+        self.assertTrue(matches[0].control is self.ctrls[7])
+        self.assertEqual(matches[0].name, "Label3Edit")
+        self.assertEqual(matches[0].variant, (False, True))
+        self.assertAlmostEqual(matches[0].score, .9)
+
+        # each control is ranked once, by its best name
+        self.assertEqual(len(set(id(match.control) for match in matches)), 3)
+        scores = [match.score for match in matches]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        # the best ranked control is the best match
+        self.assertEqual(findbestmatch.find_best_control_matches("label3edit", self.ctrls),
+                         [matches[0].control])
+
+    def testRankBelowCutoff(self):
+        """Test that the controls are ranked even if nothing matches"""
+        matches = findbestmatch.rank_controls("Labl", self.ctrls, k=20)
+        self.assertEqual(len(matches), len(self.ctrls))
+        self.assertTrue(matches[0].name.startswith("Label"))
+        self.assertRaises(ValueError, findbestmatch.rank_controls, "OK", self.ctrls, k=0)
+
+    def testMatchErrorNearMisses(self):
+        """Test that MatchError has the best ranked controls"""
+        try:
+            findbestmatch.find_best_control_matches("qqqbel4Edzzzzz", self.ctrls)
+        except findbestmatch.MatchError as exc:
+            near_misses = exc.near_misses
+        else:
+            self.fail("MatchError was not raised")
+        self.assertEqual(
+            near_misses,
+            findbestmatch.rank_controls("qqqbel4Edzzzzz", self.ctrls,
+                                        k=findbestmatch.match_error_near_misses))
+        self.assertTrue(near_misses[0].control is self.ctrls[9])
+
+
+class MatchManyTestCase(unittest.TestCase):
+
+    """Unit tests for resolving many search texts at once"""
+
+    search_texts = ["OK", "ok", "label3edit", "Label2", "Edit", "Edit3", "Button", "xyz"]
+
+    def setUp(self):
+        """Set some data and ensure the application is in the state we want"""
+        findbestmatch.clear_cache()
+        self.ctrls = _build_fake_dialog()
+
+    def tearDown(self):
+        """Restore the default similarity backend"""
+        findbestmatch.set_similarity_backend()
+
+    def _check_matches(self):
+        """Compare match_many with find_best_control_matches for each text"""
+        matches = findbestmatch.match_many(self.search_texts, self.ctrls)
+        self.assertEqual(len(matches), len(self.search_texts))
+        for search_text, match in zip(self.search_texts, matches):
+            try:
+                expected = findbestmatch.find_best_control_matches(search_text, self.ctrls)
+            except findbestmatch.MatchError as exc:
+                self.assertTrue(isinstance(match, findbestmatch.MatchError))
+                self.assertEqual(match.tofind, exc.tofind)
+                self.assertEqual(match.near_misses, exc.near_misses)
+            else:
+                self.assertEqual(match, expected)
+
+    def testMatchMany(self):
+        """Test that each search text gets the same result as alone"""
+        self._check_matches()
+
+    def testMatchManyWithPrefilter(self):
+        """Test the batch of the trigram candidates"""
+        findbestmatch.set_similarity_backend(prefilter="trigram")
+        self._check_matches()
+        findbestmatch.set_similarity_backend("levenshtein", prefilter="trigram")
+        self._check_matches()
+
+    def testCandidatesMany(self):
+        """Test that the batch candidates are the same as for each text"""
+        name_variants = findbestmatch.build_unique_dict(self.ctrls).name_variants()
+        prefilter = findbestmatch.TrigramIndex(name_variants)
+        for min_similarity in (0, .5):
+            self.assertEqual(prefilter.candidates_many(self.search_texts, min_similarity),
+                             [prefilter.candidates(text, min_similarity)
+                              for text in self.search_texts])
+
+
 if __name__ == "__main__":
 
     unittest.main()
@@ -36,9 +36,13 @@ import unittest
 
 import sys, os
 sys.path.append(".")
+from pywinauto import findbestmatch, findwindows, simulated  # noqa: E402
 from pywinauto.application import Application
 from pywinauto.sysinfo import is_x64_Python
 from pywinauto.findwindows import find_window, find_windows
+from pywinauto.findwindows import find_element, find_elements, iter_elements  # noqa: E402
+from pywinauto.findwindows import ElementAmbiguousError  # noqa: E402
+from pywinauto.findwindows import SearchCriteria, ElementNotFoundError  # noqa: E402
 from pywinauto.findwindows import WindowNotFoundError
 from pywinauto.findwindows import WindowAmbiguousError
 from pywinauto.timings import Timings
@@ -91,6 +95,307 @@ class FindWindowsTestCases(unittest.TestCase):
         self.assertRaises(WindowNotFoundError, find_windows,
                           process=self.app.process, class_name='FakeClassName', found_index=1)
 
+    def test_found_index_stops_search(self):
+        """Test that the elements after found_index are not checked"""
+        checked = []
+
+        def predicate(elem):
+            checked.append(elem)
+            return True
+
+        buttons = find_elements(process=self.app.process, class_name='Button',
+                                top_level_only=False, backend='win32')
+        elements = find_elements(process=self.app.process, class_name='Button',
+                                 top_level_only=False, found_index=1,
+                                 predicate_func=predicate, backend='win32')
+
+        self.assertEqual([elem.handle for elem in elements], [buttons[1].handle])
+        self.assertEqual(len(checked), 2)
+
+    def test_iter_elements(self):
+        """Test that iter_elements streams the elements of find_elements"""
+        criteria = dict(process=self.app.process, top_level_only=False, backend='win32')
+        handles = [elem.handle for elem in find_elements(**criteria)]
+
+        iterator = iter_elements(**criteria)
+        self.assertEqual(next(iterator).handle, handles[0])
+        self.assertEqual([elem.handle for elem in iterator], handles[1:])
+
+    def test_find_element_ambiguous(self):
+        """Test that the error of find_element reports all the matching elements"""
+        criteria = dict(process=self.app.process, class_name='Button', top_level_only=False, backend='win32')
+        buttons = find_elements(**criteria)
+        try:
+            find_element(**criteria)
+        except ElementAmbiguousError as exc:
+            self.assertEqual([elem.handle for elem in exc.elements], [elem.handle for elem in buttons])
+            self.assertTrue(str(exc).startswith("There are {0} elements".format(len(buttons))))
+        else:
+            self.fail("ElementAmbiguousError is not raised")
+
+    def test_search_criteria(self):
+        """Test that the compiled criteria find the same elements again"""
+        criteria = SearchCriteria(process=self.app.process, class_name_re='B.*n',
+                                  top_level_only=False, backend='win32')
+        handles = find_windows(process=self.app.process, class_name_re='B.*n', top_level_only=False)
+
+        self.assertEqual([elem.handle for elem in criteria.find_elements()], handles)
+        self.assertEqual([elem.handle for elem in criteria.find_elements()], handles)
+        self.assertRaises(ElementAmbiguousError, criteria.find_element)
+
+        ok_button = criteria.replace(title='OK').find_element()
+        self.assertEqual(ok_button.handle, self.dlg.OK.WrapperObject().handle)
+
+
+class SearchCriteriaTestCase(unittest.TestCase):
+
+    """Unit tests for the SearchCriteria class"""
+
+    def test_mapping(self):
+        """Test that the criteria are a mapping without the default values"""
+        criteria = SearchCriteria(class_name='Edit', visible_only=True, top_level_only=False)
+        self.assertEqual(criteria, {'class_name': 'Edit', 'top_level_only': False})
+        self.assertTrue('class_name' in criteria)
+        self.assertFalse('visible_only' in criteria)
+        self.assertEqual(criteria.get('title'), None)
+        self.assertEqual(criteria.copy(), {'class_name': 'Edit', 'top_level_only': False})
+        self.assertEqual(repr(criteria), "SearchCriteria(class_name='Edit', top_level_only=False)")
+
+    def test_hash(self):
+        """Test that the same criteria are equal and have the same hash"""
+        criteria = SearchCriteria(class_name='Edit', title_re='Name.*')
+        same = SearchCriteria(title_re='Name.*', class_name='Edit', enabled_only=False)
+        self.assertEqual(criteria, same)
+        self.assertEqual(hash(criteria), hash(same))
+        self.assertEqual({criteria: 1}[same], 1)
+        self.assertNotEqual(criteria, criteria.replace(title_re='Address.*'))
+
+        # the unhashable values are compared by identity
+        parent = []
+        self.assertEqual(SearchCriteria(parent=parent), SearchCriteria(parent=parent))
+        self.assertNotEqual(SearchCriteria(parent=parent), SearchCriteria(parent=[]))
+
+    def test_unknown_criterion(self):
+        """Test that an unknown criterion raises TypeError"""
+        self.assertRaises(TypeError, SearchCriteria, class_nmae='Edit')
+
+    def test_checks_order(self):
+        """Test that the checks are ordered by cost"""
+        criteria = SearchCriteria(title_re='OK', class_name='Button', active_only=True,
+                                  predicate_func=lambda elem: True, enabled_only=True)
+        self.assertEqual([name for name, _ in criteria._checks],
+                         ['active_only', 'class_name', 'visible_only', 'enabled_only',
+                          'title_re', 'predicate_func'])
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    """Unit tests for the searches in a snapshot of the simulated back-end"""
+
+    def setUp(self):
+        """Create a simulated desktop with some dialogs and capture it"""
+        self.desktop = simulated.desktop
+        desktop = simulated.SimulatedElement(class_name='#32769')
+        for i in range(3):
+            dlg = desktop.add(class_name='#32770', title='Dialog {0}'.format(i), process_id=i)
+            panel = dlg.add(class_name='Panel', process_id=i)
+            panel.add(class_name='Button', title='OK', process_id=i)
+            dlg.add(class_name='Button', title='Cancel', process_id=i, enabled=i != 1)
+        simulated.set_desktop(desktop)
+        self.snapshot = findwindows.snapshot(backend='simulated')
+
+    def tearDown(self):
+        """Restore the desktop"""
+        simulated.set_desktop(self.desktop)
+
+    def assertSameResults(self, **criteria):
+        """Check that the snapshot finds the same elements as the live search"""
+        live = find_elements(backend='simulated', **criteria)
+        self.assertEqual([elem.handle for elem in self.snapshot.find_elements(**criteria)],
+                         [elem.handle for elem in live])
+
+    def test_same_results(self):
+        """Test that the queries to the snapshot return the live search results"""
+        dlg = find_element(title='Dialog 1', backend='simulated')
+        for criteria in ({}, {'class_name': '#32770'}, {'process': 2}, {'parent': dlg},
+                         {'top_level_only': False}, {'top_level_only': False, 'title': 'OK'},
+                         {'top_level_only': False, 'class_name': 'Button', 'enabled_only': True},
+                         {'top_level_only': False, 'parent': dlg, 'title_re': 'OK|Cancel'},
+                         {'top_level_only': False, 'found_index': 1, 'class_name': 'Panel'}):
+            self.assertSameResults(**criteria)
+
+    def test_no_round_trips(self):
+        """Test that the queries are answered from memory"""
+        simulated.reset_round_trips()
+        buttons = self.snapshot.find_elements(class_name='Button', top_level_only=False)
+        self.assertEqual(len(buttons), 6)
+        self.assertEqual(simulated.round_trips(), 0)
+        self.assertEqual(self.snapshot.find_element(title='Dialog 2').handle,
+                         find_element(title='Dialog 2', backend='simulated').handle)
+        self.assertRaises(ElementAmbiguousError, self.snapshot.find_element, title='OK',
+                          top_level_only=False)
+        self.assertRaises(ElementNotFoundError, self.snapshot.find_element, title='Help')
+
+    def test_depth(self):
+        """Test capturing some levels of the tree only"""
+        self.assertEqual(len(self.snapshot), 12)
+        self.assertEqual(len(findwindows.snapshot(depth=1, backend='simulated')), 3)
+        snapshot = findwindows.snapshot(depth=2, backend='simulated')
+        self.assertEqual([elem.depth for elem in snapshot.elements], [1, 2, 2] * 3)
+        self.assertEqual(snapshot.find_elements(title='OK', top_level_only=False), [])
+        self.assertRaises(ValueError, findwindows.snapshot, depth=0, backend='simulated')
+
+    def test_depth_of_window(self):
+        """Test that the levels of a window deeper than the depth aren't enumerated"""
+        dlg = find_element(title='Dialog 1', backend='simulated')
+        simulated.reset_round_trips()
+        snapshot = findwindows.snapshot(dlg, depth=1, backend='simulated')
+        self.assertEqual([elem.class_name for elem in snapshot.elements], ['Panel', 'Button'])
+        self.assertEqual(simulated.round_trips('enumerate'), 1)
+        # the parents are the enumerated elements
+        self.assertEqual(simulated.round_trips('parent'), 0)
+
+        snapshot = findwindows.snapshot(dlg, backend='simulated')
+        self.assertEqual([(elem.class_name, elem.depth, elem.parent.class_name) for elem in snapshot.elements],
+                         [('Panel', 1, '#32770'), ('Button', 2, 'Panel'), ('Button', 1, '#32770')])
+
+    def test_indexes(self):
+        """Test that the indexes find the same elements as the scan"""
+        scanned = findwindows.snapshot(backend='simulated', indexed=False)
+        dlg = find_element(title='Dialog 1', backend='simulated')
+        for criteria in ({'class_name': 'Button'}, {'title': 'OK', 'process': 1},
+                         {'title_re': 'Dia', 'top_level_only': True}, {'title_re': 'C.*'},
+                         {'class_name_re': 'B', 'title': 'Cancel', 'parent': dlg},
+                         {'class_name': 'Button', 'title': 'Help'},
+                         {'class_name': 'Panel', 'found_index': 1}):
+            criteria = dict(criteria, top_level_only=criteria.get('top_level_only', False))
+            self.assertEqual(self.snapshot.find_elements(**criteria),
+                             scanned.find_elements(**criteria))
+        self.assertRaises(ElementNotFoundError, self.snapshot.find_elements,
+                          title_re='OK', found_index=0)
+
+    def test_candidates(self):
+        """Test the intersection of the indexes"""
+        self.assertEqual(self.snapshot.candidates({'visible_only': True}), None)
+        candidates = self.snapshot.candidates({'class_name': 'Button', 'title_re': r'O\w'})
+        self.assertEqual([elem.rich_text for elem in candidates], ['OK'] * 3)
+        self.assertEqual(self.snapshot.candidates({'class_name': 'Edit', 'title': 'OK'}), [])
+
+    def test_literal_prefix(self):
+        """Test the literal prefixes of the regular expressions"""
+        for pattern, prefix in (('Dialog.*', 'Dialog'), ('ab?c', 'a'), ('a+b', 'a'),
+                                (r'Save\.txt', 'Save.txt'), (r'\d', ''), ('OK|Cancel', ''),
+                                ('(?i)ok', ''), ('[ab]c', '')):
+            self.assertEqual(findwindows._literal_prefix(pattern), prefix)
+
+    def test_diff(self):
+        """Test the changes between two snapshots"""
+        dialogs = list(simulated.desktop.children)
+        dialogs[0].remove()
+        added = dialogs[1].add(class_name='Edit', title='Name', process_id=1)
+        dialogs[1].children[1].title = 'Close'
+        dialogs[2].rectangle = (10, 10, 200, 100)
+        button = dialogs[2].children[0].children[0]
+        button.remove()
+        dialogs[2].children.append(button)
+        button.parent = dialogs[2]
+
+        diff = findwindows.diff_snapshots(self.snapshot, findwindows.snapshot(backend='simulated'))
+        self.assertTrue(diff)
+        self.assertEqual([elem.handle for elem in diff.added], [added.handle])
+        self.assertEqual([elem.rich_text for elem in diff.removed], ['Dialog 0', '', 'OK', 'Cancel'])
+        self.assertEqual([(change.old.rich_text, change.new.rich_text, change.properties)
+                          for change in diff.changed],
+                         [('Cancel', 'Close', ['rich_text', 'name']),
+                          ('Dialog 2', 'Dialog 2', ['rectangle']),
+                          ('OK', 'OK', ['parent'])])
+        self.assertFalse(findwindows.diff_snapshots(self.snapshot, self.snapshot))
+        self.assertRaises(ValueError, findwindows.diff_snapshots,
+                          self.snapshot, self.snapshot, ['size'])
+
+    def test_diff_by_path(self):
+        """Test pairing the elements without handles by their structural paths"""
+        simulated.desktop.children[1].children[1].title = 'Close'
+        new = findwindows.snapshot(backend='simulated')
+        for snapshot in (self.snapshot, new):
+            for elem in snapshot.elements:
+                elem.key = None
+
+        diff = findwindows.diff_snapshots(self.snapshot, new)
+        self.assertEqual((diff.added, diff.removed), ([], []))
+        self.assertEqual([change.new.rich_text for change in diff.changed], ['Close'])
+        self.assertFalse(findwindows.diff_snapshots(self.snapshot, new, ['visible']))
+
+    def test_refresh(self):
+        """Test that the snapshot is updated by refresh() only"""
+        simulated.desktop.children[0].remove()
+        self.assertEqual(len(self.snapshot.find_elements(class_name='#32770')), 3)
+        timestamp = self.snapshot.timestamp
+        self.snapshot.refresh()
+        self.assertEqual(len(self.snapshot.find_elements(class_name='#32770')), 2)
+        self.assertTrue(self.snapshot.timestamp >= timestamp)
+        self.assertTrue(self.snapshot.age >= 0)
+
+
+class PrefetchTestCase(unittest.TestCase):
+
+    """Unit tests for the attributes prefetched by the searches of the simulated back-end"""
+
+    def setUp(self):
+        """Create a simulated desktop with a big dialog"""
+        self.desktop = simulated.desktop
+        desktop = simulated.SimulatedElement(class_name='#32769')
+        dlg = desktop.add(class_name='#32770', title='Dialog')
+        for i in range(50):
+            dlg.add(class_name='Button', title='Button {0}'.format(i), visible=i % 10 != 0,
+                    rectangle=(0, i * 20, 80, i * 20 + 18))
+        simulated.set_desktop(desktop)
+
+    def tearDown(self):
+        """Restore the desktop"""
+        simulated.set_desktop(self.desktop)
+        simulated.SimulatedElementInfo.bulk_prefetch = True
+
+    def search_round_trips(self, **criteria):
+        """Return the handles of the found elements and the number of the round trips"""
+        # the names of the controls are not kept from the previous search
+        findbestmatch.clear_name_indexes()
+        simulated.reset_round_trips()
+        handles = [elem.handle for elem in find_elements(backend='simulated', **criteria)]
+        return handles, simulated.round_trips()
+
+    def test_search(self):
+        """Test that the attributes checked by a search are read in bulk"""
+        criteria = dict(top_level_only=False, class_name_re='Button', title_re='Button 1')
+        handles, round_trips = self.search_round_trips(**criteria)
+        simulated.SimulatedElementInfo.bulk_prefetch = False
+        expected, expected_round_trips = self.search_round_trips(**criteria)
+
+        self.assertEqual(len(handles), 10)
+        self.assertEqual(handles, expected)
+        self.assertEqual(round_trips, 2)
+        self.assertTrue(expected_round_trips > 100)
+
+    def test_best_match(self):
+        """Test that the names of the controls are built from the prefetched attributes"""
+        criteria = dict(top_level_only=False, best_match='Button 42')
+        handles, round_trips = self.search_round_trips(**criteria)
+        simulated.SimulatedElementInfo.bulk_prefetch = False
+        expected, expected_round_trips = self.search_round_trips(**criteria)
+
+        self.assertEqual(handles, expected)
+        self.assertEqual(len(handles), 1)
+        self.assertTrue(round_trips < 10)
+        self.assertTrue(expected_round_trips > 100)
+
+    def test_snapshot(self):
+        """Test that the properties of the snapshot are read in bulk"""
+        simulated.reset_round_trips()
+        snapshot = findwindows.snapshot(backend='simulated')
+        self.assertEqual(len(snapshot), 51)
+        # the enumerations, the parents, the root and the prefetch
+        self.assertTrue(simulated.round_trips() < 70)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,128 @@
+# GUI Application automation and testing library
+# Copyright (C) 2006-2017 Mark Mc Mahon and Contributors
+# https://github.com/pywinauto/pywinauto/graphs/contributors
+# http://pywinauto.readthedocs.io/en/latest/credits.html
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of pywinauto nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Tests for the searches of findwindows.py in the simulated back-end
+
+The simulated back-end needs no win32, so these tests run on Linux too.
+"""
+
+import unittest
+import sys
+sys.path.append(".")
+
+from pywinauto import findwindows, simulated  # noqa: E402
+from pywinauto.findwindows import find_element, find_elements  # noqa: E402
+from pywinauto.findwindows import ElementAmbiguousError, ElementNotFoundError  # noqa: E402
+
+
+class ParallelSearchTestCase(unittest.TestCase):
+
+    """Unit tests for the parallel search on the simulated back-end"""
+
+    def setUp(self):
+        """Create a simulated desktop with some dialogs"""
+        self.desktop = simulated.desktop
+        desktop = simulated.SimulatedElement(class_name='#32769')
+        for i in range(6):
+            dlg = desktop.add(class_name='#32770', title='Dialog {0}'.format(i), process_id=i % 2)
+            panel = dlg.add(class_name='Panel', process_id=i % 2)
+            panel.add(class_name='Button', title='OK', process_id=i % 2)
+            panel.add(class_name='Edit', title='Name', process_id=i % 2, visible=i != 3)
+            dlg.add(class_name='Button', title='Cancel', process_id=i % 2)
+        simulated.set_desktop(desktop)
+
+    def tearDown(self):
+        """Restore the serial search and the desktop"""
+        findwindows.set_search_threads(1)
+        simulated.set_desktop(self.desktop)
+
+    def search(self, threads, **criteria):
+        """Return the handles of the elements found by the threads"""
+        findwindows.set_search_threads(threads)
+        return [elem.handle for elem in find_elements(top_level_only=False,
+                                                      backend='simulated', **criteria)]
+
+    def test_same_order(self):
+        """Test that the parallel search returns the elements in the serial order"""
+        for criteria in ({}, {'class_name': 'Button'}, {'class_name_re': 'Edit|#32770'},
+                         {'title_re': 'OK|Dialog.*', 'process': 1}, {'visible_only': False}):
+            serial = self.search(1, **criteria)
+            self.assertTrue(serial)
+            for threads in (2, 4, 16):
+                self.assertEqual(self.search(threads, **criteria), serial)
+
+    def test_found_index(self):
+        """Test found_index and find_element with the parallel search"""
+        edits = self.search(1, class_name='Edit', visible_only=False)
+        self.assertEqual(self.search(4, class_name='Edit', visible_only=False, found_index=4), edits[4:5])
+        self.assertRaises(ElementNotFoundError, self.search, 4, class_name='Edit', found_index=5)
+        self.assertRaises(ElementAmbiguousError, find_element, title='OK',
+                          top_level_only=False, backend='simulated')
+
+    def test_ctrl_index(self):
+        """Test that ctrl_index indexes the descendants before the other criteria"""
+        buttons = simulated.SimulatedElementInfo().descendants(class_name='Button')
+        element = find_element(class_name='Button', process=1, ctrl_index=0,
+                               top_level_only=False, backend='simulated')
+        self.assertEqual(element.handle, buttons[0].handle)
+
+        try:
+            find_element(class_name='Edit', process=3, top_level_only=False, backend='simulated')
+        except ElementNotFoundError as exc:
+            self.assertEqual(exc.args[0], dict(class_name='Edit', process=3,
+                                               top_level_only=False, backend='simulated'))
+        else:
+            self.fail("ElementNotFoundError is not raised")
+
+    def test_enumerations(self):
+        """Test that the desktop is enumerated once and only the thread safe elements in parallel"""
+        serial = self.search(1, class_name='#32770', process=1)
+        simulated.reset_round_trips()
+        self.assertEqual(self.search(4, class_name='#32770', process=1), serial)
+        # the children of the desktop and the descendants of each dialog
+        self.assertEqual(simulated.round_trips('enumerate'), 7)
+
+        simulated.SimulatedElementInfo.thread_safe = False
+        try:
+            simulated.reset_round_trips()
+            self.assertEqual(self.search(4, class_name='#32770', process=1), serial)
+            self.assertEqual(simulated.round_trips('enumerate'), 1)
+        finally:
+            simulated.SimulatedElementInfo.thread_safe = True
+
+    def test_set_search_threads(self):
+        """Test the wrong numbers of threads"""
+        self.assertRaises(ValueError, findwindows.set_search_threads, 0)
+        self.assertRaises(TypeError, findwindows.set_search_threads, 2.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -31,11 +31,12 @@
 
 """Tests for class FuzzyDict"""
 import unittest
+import random
 import sys
 from collections import OrderedDict
 
 sys.path.append(".")
-from pywinauto.fuzzydict import FuzzyDict
+from pywinauto.fuzzydict import FuzzyDict, ShardedFuzzyDict  # noqa: E402
 
 
 class FuzzyTestCase(unittest.TestCase):
@@ -95,5 +96,232 @@ class FuzzyTestCase(unittest.TestCase):
         self.assertRaises(KeyError, fd2.__getitem__, 23)
 
 
+def random_keys(rnd, count):
+    """Return count random short keys"""
+    return [u''.join(rnd.choice(u'abcdAB \xe4') for _ in range(rnd.randint(0, 8)))
+            for _ in range(count)]
+
+
+class IndexedFuzzyTestCase(unittest.TestCase):
+
+    """Compare the indexed FuzzyDict with the linear search"""
+
+    def assertSameSearch(self, linear, indexed, lookfor):
+        """Check that both dicts find the same key, value and ratio"""
+        self.assertEqual(linear._search(lookfor), indexed._search(lookfor))
+        self.assertEqual(lookfor in linear, lookfor in indexed)
+
+    def test_test_dict(self):
+        """Test the indexed FuzzyDict with the test dict"""
+        for cutoff in (.14, .6, .8):
+            linear = FuzzyDict(FuzzyTestCase.test_dict, cutoff)
+            indexed = FuzzyDict(FuzzyTestCase.test_dict, cutoff, indexed=True)
+            for lookfor in (u'hiya', u'Hiy', u'test', u'FuzzyWuzzy', u'', 1, 23):
+                self.assertSameSearch(linear, indexed, lookfor)
+
+    def test_random_keys(self):
+        """Test the same results for random keys and search texts"""
+        rnd = random.Random(0)
+        for cutoff in (0, .3, .6, .9):
+            keys = random_keys(rnd, 50)
+            linear = FuzzyDict(cutoff=cutoff)
+            indexed = FuzzyDict(cutoff=cutoff, indexed=True)
+            for i, key in enumerate(keys):
+                linear[key] = i
+                indexed[key] = i
+            for lookfor in random_keys(rnd, 50):
+                self.assertSameSearch(linear, indexed, lookfor)
+
+    def test_ties(self):
+        """Test that the first inserted key wins with the same ratio"""
+        fd = FuzzyDict(cutoff=.5, indexed=True)
+        fd[u'abx'] = 1
+        fd[u'aby'] = 2
+        self.assertEqual(1, fd[u'abz'])
+
+        del fd[u'abx']
+        fd[u'abx'] = 3
+        self.assertEqual(2, fd[u'abz'])
+
+    def test_index_updates(self):
+        """Test that the index follows the removed keys"""
+        rnd = random.Random(1)
+        keys = random_keys(rnd, 40)
+        linear = FuzzyDict(dict.fromkeys(keys, 0))
+        indexed = FuzzyDict(dict.fromkeys(keys, 0), indexed=True)
+        for key in list(linear.keys())[::3]:
+            del linear[key]
+            indexed.pop(key)
+        linear.popitem()
+        indexed.popitem()
+        for lookfor in random_keys(rnd, 30):
+            self.assertSameSearch(linear, indexed, lookfor)
+
+        indexed.clear()
+        self.assertRaises(KeyError, indexed.__getitem__, keys[0])
+        indexed[u'abc'] = 1
+        self.assertEqual(1, indexed[u'abd'])
+
+
+class MemoFuzzyTestCase(unittest.TestCase):
+
+    """Test the memo of the fuzzy lookups"""
+
+    def setUp(self):
+        """Create a FuzzyDict with the test dict"""
+        self.fd = FuzzyDict(FuzzyTestCase.test_dict, memo_size=128)
+
+    def test_contains_and_get_item(self):
+        """Test that __getitem__ after __contains__ uses the memo"""
+        self.assertTrue(u'hiya' in self.fd)
+        self.assertEqual(1, self.fd[u'hiya'])
+        stats = self.fd.memo_stats()
+        self.assertEqual((1, 1), (stats['hits'], stats['misses']))
+        self.assertEqual(.5, stats['hit_rate'])
+
+    def test_repeated_miss(self):
+        """Test that looking for a missing key again uses the memo"""
+        for _ in range(3):
+            self.assertRaises(KeyError, self.fd.__getitem__, u'FuzzyWuzzy')
+        self.assertEqual(2, self.fd.memo_stats()['hits'])
+
+        # the exact keys are not memoized
+        self.assertEqual(3, self.fd[u'test3'])
+        self.assertEqual(1, self.fd.memo_stats()['size'])
+
+    def test_invalidation(self):
+        """Test that the memo is invalidated by any change"""
+        self.assertRaises(KeyError, self.fd.__getitem__, u'FuzzyWuzzy')
+        self.fd[u'FuzzyWuzy'] = 5
+        self.assertEqual(5, self.fd[u'FuzzyWuzzy'])
+
+        del self.fd[u'FuzzyWuzy']
+        self.assertRaises(KeyError, self.fd.__getitem__, u'FuzzyWuzzy')
+
+        self.fd.update({u'FuzzyWuzz': 6})
+        self.assertEqual(6, self.fd[u'FuzzyWuzzy'])
+
+        self.fd.pop(u'FuzzyWuzz')
+        self.assertFalse(u'FuzzyWuzzy' in self.fd)
+        self.assertEqual(0, self.fd.memo_stats()['hits'])
+
+    def test_new_value_and_cutoff(self):
+        """Test that the memoized key gives the current value and cutoff"""
+        self.assertEqual(1, self.fd[u'hiya'])
+        self.fd[u'Hiya'] = 10
+        self.assertEqual(10, self.fd[u'hiya'])
+
+        self.fd.cutoff = .9
+        self.assertFalse(u'hiya' in self.fd)
+        self.assertEqual(1, self.fd.memo_stats()['hits'])
+
+    def test_size(self):
+        """Test the bounded memo and disabling it"""
+        fd = FuzzyDict(FuzzyTestCase.test_dict, memo_size=2)
+        for lookfor in (u'a', u'b', u'c', u'a'):
+            fd._search(lookfor)
+        stats = fd.memo_stats()
+        self.assertEqual((2, 0, 4), (stats['size'], stats['hits'], stats['misses']))
+
+        fd = FuzzyDict(FuzzyTestCase.test_dict, memo_size=0)
+        self.assertTrue(u'hiya' in fd)
+        self.assertEqual(1, fd[u'hiya'])
+        self.assertEqual(0, fd.memo_stats()['size'])
+
+
+class ShardedFuzzyTestCase(unittest.TestCase):
+
+    """Compare ShardedFuzzyDict with FuzzyDict"""
+
+    def setUp(self):
+        """Create a ShardedFuzzyDict with 3 shards used for any number of keys"""
+        self.linear = FuzzyDict(FuzzyTestCase.test_dict)
+        self.sharded = ShardedFuzzyDict(FuzzyTestCase.test_dict, shards=3, shard_threshold=0)
+
+    def tearDown(self):
+        """Stop the workers"""
+        self.sharded.close()
+
+    def assertSameSearch(self, lookfors):
+        """Check that the sharded dict finds the same keys, values and ratios"""
+        expected = [self.linear._search(lookfor) for lookfor in lookfors]
+        self.assertEqual(expected, self.sharded.search_many(lookfors))
+        self.assertEqual(expected, [self.sharded._search(lookfor) for lookfor in lookfors])
+        self.assertEqual([lookfor in self.linear for lookfor in lookfors],
+                         [lookfor in self.sharded for lookfor in lookfors])
+
+    def test_test_dict(self):
+        """Test the same lookups as of FuzzyDict"""
+        self.assertEqual(self.linear, self.sharded)
+        self.assertEqual(1, self.sharded[u'hiya'])
+        self.assertEqual(324, self.sharded[1])
+        self.assertTrue(u'test' in self.sharded)
+        self.assertRaises(KeyError, self.sharded.__getitem__, u'FuzzyWuzzy')
+        self.assertRaises(KeyError, self.sharded.__getitem__, 23)
+        self.assertEqual(3, len(self.sharded._workers))
+
+    def test_random_keys(self):
+        """Test the same results for random keys, changes and ties"""
+        rnd = random.Random(2)
+        for cutoff in (0, .3, .6, .9):
+            self.linear.cutoff = self.sharded.cutoff = cutoff
+            keys = random_keys(rnd, 60)
+            for i, key in enumerate(keys):
+                self.linear[key] = i
+                self.sharded[key] = i
+            self.assertSameSearch(random_keys(rnd, 30))
+
+            for key in list(self.linear.keys())[::4]:
+                del self.linear[key]
+                self.sharded.pop(key)
+            self.linear.popitem(last=False)
+            self.sharded.popitem(last=False)
+            if hasattr(self.linear, 'move_to_end'):
+                for key in list(self.linear.keys())[::5]:
+                    self.linear.move_to_end(key, last=False)
+                    self.sharded.move_to_end(key, last=False)
+            self.assertSameSearch(random_keys(rnd, 30) + [u'hiya', 1, 23, (u'a', u'b')])
+
+    def test_not_string_keys(self):
+        """Test that the keys which are not strings are compared in this process"""
+        for fd in (self.linear, self.sharded):
+            fd[(u'x', u'y', u'z')] = 5
+            fd[u'xyw'] = 6
+        self.assertSameSearch([u'xyz', u'xy'])
+        self.assertEqual(5, self.sharded[u'xyz'])
+
+    def test_clear(self):
+        """Test that the workers forget the keys"""
+        self.sharded[u'hello'] = 2
+        self.sharded.clear()
+        self.assertFalse(u'hiya' in self.sharded)
+        self.sharded[u'abc'] = 1
+        self.assertEqual(1, self.sharded[u'abd'])
+
+    def test_restart(self):
+        """Test that the workers are started again after close"""
+        self.assertEqual(1, self.sharded[u'hiya'])
+        self.sharded.close()
+        self.sharded[u'hello'] = 2
+        self.assertEqual(2, self.sharded[u'helo'])
+        self.assertEqual(3, len(self.sharded._workers))
+
+    def test_threshold(self):
+        """Test that a dictionary smaller than the threshold starts no workers"""
+        with ShardedFuzzyDict(FuzzyTestCase.test_dict, shards=3, shard_threshold=4) as fd:
+            self.assertFalse(fd.sharded)
+            self.assertEqual(1, fd[u'hiya'])
+            self.assertEqual([], fd._workers)
+
+            fd[u'hello'] = 4
+            self.assertTrue(fd.sharded)
+            self.assertEqual(4, fd[u'helo'])
+            self.assertEqual(3, len(fd._workers))
+        self.assertEqual([], fd._workers)
+
+        self.assertFalse(ShardedFuzzyDict(FuzzyTestCase.test_dict, shards=1, shard_threshold=0).sharded)
+        self.assertRaises(ValueError, ShardedFuzzyDict, shards=0)
+
+
 if __name__ == '__main__':
     unittest.main()
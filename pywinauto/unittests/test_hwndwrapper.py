@@ -101,6 +101,15 @@ class HwndWrapperTests(unittest.TestCase):
         "Test that an exception is raised with an invalid window handle"
         self.assertRaises(InvalidWindowHandle, HwndWrapper, -1)
 
+    def testLazyLogger(self):
+        "Test that the logger and the cache of the wrapper are created on the first use"
+        ctrl = HwndWrapper(self.dlg.Command_button_here.handle)
+        self.assertFalse('actions' in ctrl.__dict__)
+        self.assertFalse('_cache' in ctrl.__dict__)
+        self.assertTrue(ctrl.actions is ctrl.actions)
+        self.assertEqual(ctrl.is_dialog(), False)
+        self.assertTrue('_cache' in ctrl.__dict__)
+
     def testFriendlyClassName(self):
         "Test getting the friendly classname of the control"
         self.assertEquals(self.ctrl.friendly_class_name(), "Button")
@@ -222,6 +231,20 @@ class HwndWrapperTests(unittest.TestCase):
         self.assertEqual(self.ctrl.top_level_parent(), self.dlg.handle)
         self.assertEqual(self.dlg.top_level_parent(), self.dlg.handle)
 
+    def testNamingSnapshot(self):
+        "Test that the naming properties are fetched once"
+        snapshot = self.ctrl.naming_snapshot()
+        self.assertEqual(snapshot.stats()['fetched'], 4)
+
+        self.assertEqual(snapshot.friendly_class_name(), self.ctrl.friendly_class_name())
+        self.assertEqual(snapshot.window_text(), self.ctrl.window_text())
+        self.assertEqual(snapshot.is_visible(), True)
+        self.assertEqual(snapshot.rectangle(), self.ctrl.rectangle())
+        self.assertEqual(snapshot.texts(), self.ctrl.texts())
+        self.assertEqual(snapshot.texts(), self.ctrl.texts())
+        self.assertEqual(snapshot.stats(),
+                         {'fetched': 5, 'served': 6, 'saved': 1})
+
     def testTexts(self):
         self.assertEqual(self.dlg.texts(), ['Common Controls Sample'])
         self.assertEqual(HwndWrapper(self.dlg.Show.handle).texts(), [u'Show'])
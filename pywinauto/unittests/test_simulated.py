@@ -0,0 +1,154 @@
+# GUI Application automation and testing library
+# Copyright (C) 2006-2017 Mark Mc Mahon and Contributors
+# https://github.com/pywinauto/pywinauto/graphs/contributors
+# http://pywinauto.readthedocs.io/en/latest/credits.html
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of pywinauto nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Tests for the simulated back-end (simulated.py)"""
+
+import json
+import unittest
+import sys
+
+import six
+sys.path.append(".")
+
+from pywinauto import findwindows, simulated  # noqa: E402
+if sys.platform == 'win32':
+    from pywinauto import Desktop
+
+
+class SimulatedBackendTests(unittest.TestCase):
+
+    """Unit tests for the trees and the round trips of the simulated back-end"""
+
+    def setUp(self):
+        """Generate a simulated desktop"""
+        self.desktop = simulated.desktop
+        simulated.set_desktop(simulated.generate_desktop(3, 10))
+        simulated.reset_round_trips()
+
+    def tearDown(self):
+        """Restore the desktop and the latency"""
+        simulated.set_desktop(self.desktop)
+        simulated.set_latency(0)
+
+    def test_generate_desktop(self):
+        """Test the generated trees"""
+        root = simulated.generate_desktop(3, 10, seed=1)
+        self.assertEqual(len(root.children), 3)
+        self.assertEqual(len(list(root.iter_descendants())), 33)
+        self.assertEqual([child.title for child in root.children[0].iter_descendants()],
+                         [child.title for child in simulated.generate_desktop(1, 10, seed=1)
+                          .children[0].iter_descendants()])
+
+    def test_json(self):
+        """Test dumping and loading a tree as JSON"""
+        buf = six.StringIO()
+        simulated.dump_tree(simulated.desktop, buf)
+        buf.seek(0)
+        root = simulated.load_tree(buf)
+        self.assertEqual(root.to_dict(), simulated.desktop.to_dict())
+        self.assertNotEqual(root.handle, simulated.desktop.handle)
+
+        root = simulated.SimulatedElement.from_dict(json.loads(
+            '{"class_name": "#32769", "children": [{"title": "Dialog", '
+            '"rectangle": [0, 0, 100, 50], "children": [{"title": "OK"}]}]}'))
+        dialog = root.children[0]
+        self.assertEqual(dialog.rectangle, (0, 0, 100, 50))
+        self.assertEqual(dialog.children[0].parent, dialog)
+        self.assertRaises(ValueError, simulated.SimulatedElement.from_dict, {'text': 'OK'})
+
+    def test_round_trips(self):
+        """Test counting the round trips by the kinds of the calls"""
+        windows = findwindows.find_elements(backend='simulated')
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(simulated.round_trips('enumerate'), 1)
+        windows[0].parent
+        self.assertEqual(simulated.round_trips('parent'), 1)
+        self.assertEqual(simulated.round_trips(),
+                         sum(simulated.round_trips(call) for call in simulated.calls))
+
+        simulated.reset_round_trips()
+        self.assertEqual(simulated.round_trips(), 0)
+
+    def test_latency(self):
+        """Test setting the latency of the calls"""
+        simulated.set_latency(.01)
+        simulated.set_latency(.001, 'enumerate', per_element=.0001)
+        self.assertEqual(simulated.latencies['read'], (.01, 0))
+        self.assertEqual(simulated.latencies['enumerate'], (.001, .0001))
+        self.assertRaises(ValueError, simulated.set_latency, -1)
+        self.assertRaises(ValueError, simulated.set_latency, 1, 'click')
+
+    def test_rectangle(self):
+        """Test the rectangles of the elements and the wrappers"""
+        window = findwindows.find_element(title='Dialog 1', backend='simulated')
+        rect = window.rectangle
+        self.assertEqual((rect.left, rect.top, rect.width(), rect.height()), (20, 20, 600, 290))
+        rect.left = 10
+        self.assertEqual(window.rectangle.left, 20)
+        wrapper = simulated.SimulatedWrapper(window)
+        self.assertEqual(str(wrapper.rectangle()), "(L20, T20, R620, B310)")
+        self.assertEqual(wrapper.naming_snapshot().rectangle().right, 620)
+
+    def test_best_match(self):
+        """Test finding the controls by the best match"""
+        window = findwindows.find_element(title='Dialog 2', backend='simulated')
+        ctrl = findwindows.find_element(best_match='Control 7', parent=window,
+                                        top_level_only=False, backend='simulated')
+        self.assertEqual(ctrl.rich_text, 'Control 7')
+        self.assertEqual(simulated.SimulatedWrapper(ctrl).window_text(), 'Control 7')
+
+
+if sys.platform == 'win32':
+    class SimulatedSpecificationTests(unittest.TestCase):
+
+        """Unit tests for the window specifications of the simulated back-end"""
+
+        def setUp(self):
+            """Generate a simulated desktop"""
+            self.desktop = simulated.desktop
+            simulated.set_desktop(simulated.generate_desktop(3, 10))
+
+        def tearDown(self):
+            """Restore the desktop"""
+            simulated.set_desktop(self.desktop)
+
+        def test_window_specification(self):
+            """Test resolving the window specifications in the simulated desktop"""
+            dlg = Desktop(backend='simulated').window(title='Dialog 1')
+            ctrl = dlg.child_window(title='Control 3').wrapper_object()
+            self.assertEqual(ctrl.window_text(), 'Control 3')
+            self.assertEqual(ctrl.process_id(), 1)
+            self.assertEqual(Desktop(backend='simulated')['Dialog 2']['Control 7'].window_text(),
+                             'Control 7')
+
+
+if __name__ == "__main__":
+    unittest.main()
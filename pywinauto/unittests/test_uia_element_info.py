@@ -62,6 +62,18 @@ if UIA_support:
             """Test whether a list of only immediate children of the element is equal"""
             self.assertEqual(len(self.ctrl.children()), 5)
 
+        def testPrefetch(self):
+            """Test that the prefetched attributes are the attributes read one by one"""
+            attributes = ['class_name', 'name', 'control_type', 'automation_id', 'visible']
+            elements = self.ctrl.descendants(cache_enable=True)
+            # the element without the parent enumeration is fetched alone
+            elements.append(UIAElementInfo(self.handle, cache_enable=True))
+            UIAElementInfo.prefetch(elements, attributes)
+            for elem in elements:
+                live = UIAElementInfo(elem.element)
+                for name in attributes:
+                    self.assertEqual(getattr(elem, name), getattr(live, name))
+
 if __name__ == "__main__":
     if UIA_support:
         unittest.main()
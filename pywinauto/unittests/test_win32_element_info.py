@@ -0,0 +1,117 @@
+# GUI Application automation and testing library
+# Copyright (C) 2006-2017 Mark Mc Mahon and Contributors
+# https://github.com/pywinauto/pywinauto/graphs/contributors
+# http://pywinauto.readthedocs.io/en/latest/credits.html
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of pywinauto nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Tests for win32_element_info.py"""
+
+import time
+import unittest
+import sys
+sys.path.append(".")
+
+from pywinauto.application import Application  # noqa: E402
+from pywinauto.handleprops import text  # noqa: E402
+from pywinauto.timings import Timings  # noqa: E402
+from pywinauto import win32_element_info  # noqa: E402
+from pywinauto.win32_element_info import HwndElementInfo  # noqa: E402
+
+
+class HwndElementInfoCacheTests(unittest.TestCase):
+
+    """Unit tests for the cache strategy of the HwndElementInfo class"""
+
+    def setUp(self):
+        """Set some data and ensure the application is in the state we want"""
+        Timings.Defaults()
+        self.app = Application().start("notepad")
+        self.edit = self.app.UntitledNotepad.Edit.wrapper_object()
+        self.edit.set_edit_text("first")
+        win32_element_info.reset_cache_stats()
+        win32_element_info.set_cache_stats(True)
+
+    def tearDown(self):
+        """Close the application after tests"""
+        win32_element_info.set_cache_stats(False)
+        self.app.kill_()
+
+    def test_not_cached(self):
+        """Test that the attributes are read from the window by default"""
+        elem = HwndElementInfo(self.edit.handle)
+        self.assertEqual(elem.rich_text, "first")
+        self.edit.set_edit_text("second")
+        self.assertEqual(elem.rich_text, "second")
+        self.assertEqual(win32_element_info.cache_stats()['misses'], 0)
+
+    def test_cached(self):
+        """Test that the cached attributes are kept until invalidate()"""
+        elem = HwndElementInfo(self.edit.handle, cache_enable=True)
+        self.assertEqual(elem.rich_text, "first")
+        self.assertEqual(elem.class_name, "Edit")
+        self.edit.set_edit_text("second")
+        self.assertEqual(elem.rich_text, "first")
+        self.assertEqual(elem.class_name, "Edit")
+
+        elem.invalidate("rich_text")
+        self.assertEqual(elem.rich_text, "second")
+        stats = win32_element_info.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 3))
+
+        elem.set_cache_strategy(cached=False)
+        self.edit.set_edit_text("third")
+        self.assertEqual(elem.rich_text, text(self.edit.handle))
+
+    def test_ttl(self):
+        """Test that the cached attributes expire after the time to live"""
+        elem = HwndElementInfo(self.edit.handle)
+        elem.set_cache_strategy(cached=True, ttl=0.1)
+        self.assertEqual(elem.rich_text, "first")
+        self.edit.set_edit_text("second")
+        self.assertEqual(elem.rich_text, "first")
+        time.sleep(0.2)
+        self.assertEqual(elem.rich_text, "second")
+
+    def test_rectangle_copy(self):
+        """Test that the cached rectangle can't be changed by the caller"""
+        elem = HwndElementInfo(self.edit.handle, cache_enable=True)
+        rect = elem.rectangle
+        rect.left += 10
+        self.assertEqual(elem.rectangle.left, rect.left - 10)
+
+    def test_children_cache_enable(self):
+        """Test that the children are created with the cache enabled"""
+        dlg = HwndElementInfo(self.app.UntitledNotepad.handle)
+        for child in dlg.children(cache_enable=True):
+            child.class_name
+            child.class_name
+        self.assertTrue(win32_element_info.cache_stats()['hits'] > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -34,63 +34,69 @@
 import ctypes
 
 from . import win32functions
+from . import win32structures
 from . import handleprops
 from .element_info import ElementInfo
+from .element_info import cached
+# the counters of the cached reads are shared by all the back-ends
+from .element_info import cache_stats, reset_cache_stats, set_cache_stats  # noqa: F401
+
 
 class HwndElementInfo(ElementInfo):
 
     """Wrapper for window handler"""
 
-    def __init__(self, handle = None):
+    __slots__ = ('_handle', '_as_parameter_')
+
+    thread_safe = True
+    immediate_children = False
+
+    def __init__(self, handle=None, cache_enable=False):
         """Create element by handle (default is root element)"""
-        self._cache = {}
         if handle is None: # root element
             self._handle = win32functions.GetDesktopWindow()
         else:
             self._handle = handle
 
         self._as_parameter_ = self._handle
-
-    def set_cache_strategy(self, cached):
-        """Set a cache strategy for frequently used attributes of the element"""
-        pass  # TODO: implement a cache strategy for native elements
+        self.set_cache_strategy(cached=cache_enable)
 
     @property
     def handle(self):
         """Return the handle of the window"""
         return self._handle
 
-    @property
+    @cached()
     def rich_text(self):
         """Return the text of the window"""
-        return handleprops.text(self)
+        return handleprops.text(self._handle)
 
     name = rich_text
 
-    @property
+    @cached()
     def control_id(self):
         """Return the ID of the window"""
-        return handleprops.controlid(self)
+        return handleprops.controlid(self._handle)
 
-    @property
+    @cached()
     def process_id(self):
         """Return the ID of process that controls this window"""
-        return handleprops.processid(self.handle)
+        return handleprops.processid(self._handle)
 
-    @property
+    @cached()
     def class_name(self):
         """Return the class name of the window"""
-        return handleprops.classname(self)
+        return handleprops.classname(self._handle)
 
-    @property
+    @cached()
     def enabled(self):
         """Return True if the window is enabled"""
-        return handleprops.isenabled(self)
+        return handleprops.isenabled(self._handle)
 
-    @property
+    @cached()
     def visible(self):
         """Return True if the window is visible"""
-        return handleprops.isvisible(self)
+        return handleprops.isvisible(self._handle)
 
     @property
     def parent(self):
@@ -125,17 +131,19 @@ class HwndElementInfo(ElementInfo):
         else:
             # TODO: this code returns the whole sub-tree, we need to re-write it
             child_handles = handleprops.children(self._handle)
-        return [HwndElementInfo(ch) for ch in child_handles]
+        cache_enable = kwargs.get('cache_enable', False)
+        return [HwndElementInfo(ch, cache_enable) for ch in child_handles]
 
     def descendants(self, **kwargs):
         """Return descendants of the window (all children from sub-tree)"""
         child_handles = handleprops.children(self)
-        return [HwndElementInfo(ch) for ch in child_handles]
+        cache_enable = kwargs.get('cache_enable', False)
+        return [HwndElementInfo(ch, cache_enable) for ch in child_handles]
 
-    @property
+    @cached(copy=win32structures.RECT)
     def rectangle(self):
         """Return rectangle of the element"""
-        return handleprops.rectangle(self)
+        return handleprops.rectangle(self._handle)
 
     def dump_window(self):
         """Dump a window as a set of properties"""
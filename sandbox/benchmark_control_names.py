@@ -0,0 +1,137 @@
+"""Benchmark of naming the controls of big dialogs
+
+Compares the former nearest label search (all the text controls are
+checked for each control without text and both rectangles are fetched
+for each pair) with the LabelIndex used by build_unique_dict now.
+The synthetic dialogs are grids of "label + edit" rows with some
+buttons, the controls count the rectangle() calls to show
+the number of the cross process queries on a real dialog.
+
+Run it from the root of the repository::
+
+    python sandbox/benchmark_control_names.py
+"""
+from __future__ import print_function
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import findbestmatch  # noqa: E402
+
+
+class Rect(object):
+
+    """The rectangle of a synthetic control"""
+
+    def __init__(self, left, top, right, bottom):
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+
+
+class Control(object):
+
+    """A synthetic control counting the rectangle queries"""
+
+    can_be_label = True
+    has_title = True
+    rectangle_calls = 0
+
+    def __init__(self, class_name, text, left, top, width, height):
+        self.class_name = class_name
+        self.text = text
+        self.rect = Rect(left, top, left + width, top + height)
+
+    def friendly_class_name(self):
+        return self.class_name
+
+    def window_text(self):
+        return self.text
+
+    def is_visible(self):
+        return True
+
+    def rectangle(self):
+        Control.rectangle_calls += 1
+        return self.rect
+
+    def texts(self):
+        return [self.text]
+
+
+def build_dialog(count, seed=0):
+    """Return count synthetic controls: labeled edits in columns and buttons"""
+    rnd = random.Random(seed)
+    controls = []
+    rows = 40
+    while len(controls) < count:
+        i = len(controls) // 2
+        left = (i // rows) * 300
+        top = (i % rows) * 25
+        if rnd.random() < .1:
+            controls.append(Control("Button", "Button %d" % i, left, top, 80, 20))
+        else:
+            controls.append(Control("Static", "Field %d" % i, left, top, 90, 20))
+        controls.append(Control("Edit", "", left + 100, top + rnd.randint(0, 3), 150, 20))
+    return controls[:count]
+
+
+def _legacy_nearest_label(ctrl, text_ctrls):
+    """The former nearest text control search of get_non_text_control_name"""
+    best_name = ''
+    closest = findbestmatch.distance_cuttoff
+    for text_ctrl in text_ctrls:
+        text_r = text_ctrl.rectangle()
+        ctrl_r = ctrl.rectangle()
+        if text_r.left >= ctrl_r.right or text_r.top >= ctrl_r.bottom:
+            continue
+        distance = min(abs(text_r.left - ctrl_r.left) + abs(text_r.bottom - ctrl_r.top),
+                       abs(text_r.right - ctrl_r.left) + abs(text_r.top - ctrl_r.top))
+        if distance < closest:
+            closest = distance
+            best_name = text_ctrl.window_text() + ctrl.friendly_class_name()
+    return best_name
+
+
+def legacy_labels(controls):
+    """Find the labels of the controls without text by the full scan"""
+    text_ctrls = [ctrl for ctrl in controls
+                  if ctrl.can_be_label and ctrl.is_visible() and ctrl.window_text()]
+    return [_legacy_nearest_label(ctrl, text_ctrls)
+            for ctrl in controls if not ctrl.window_text()]
+
+
+def indexed_labels(controls):
+    """Find the labels of the controls without text with LabelIndex"""
+    labels = findbestmatch.LabelIndex(controls)
+    result = []
+    for ctrl in controls:
+        if not ctrl.window_text():
+            text = labels.nearest_label(ctrl)
+            result.append(text + ctrl.friendly_class_name() if text else '')
+    return result
+
+
+def main():
+    """Print the timings and rectangle queries for 100 - 5000 controls"""
+    for count in (100, 1000, 5000):
+        controls = build_dialog(count)
+        assert legacy_labels(controls) == indexed_labels(controls)
+
+        for func in (legacy_labels, indexed_labels, findbestmatch.build_unique_dict):
+            Control.rectangle_calls = 0
+            func(controls)
+            calls = Control.rectangle_calls
+            repeat = max(1, 1000 // count)
+            seconds = min(timeit.repeat(lambda: func(controls), number=repeat, repeat=3)) / repeat
+            print("{0:>5} controls  {1:<18} {2:10.2f} ms {3:>10} rectangle() calls".format(
+                count, func.__name__, seconds * 1000, calls))
+
+
+if __name__ == "__main__":
+    main()
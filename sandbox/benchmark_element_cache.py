@@ -0,0 +1,52 @@
+"""Benchmark of the attribute caches of the element infos
+
+Searches the descendants of a simulated desktop (see pywinauto.simulated)
+with the caches of the element attributes switched on and off
+(element_info.set_caching). Each property read of a simulated element
+is a round trip sleeping for the latency of a cross process call.
+
+Run it from the root of the repository::
+
+    python sandbox/benchmark_element_cache.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import element_info, findwindows, simulated  # noqa: E402
+from benchmark_parallel_search import build_desktop  # noqa: E402
+
+
+def main():
+    """Print the time and the round trips of the searches with and without the caches"""
+    simulated.set_desktop(build_desktop(20, 30))
+    simulated.set_latency(.00005)
+    searches = (
+        ("class_name_re + title_re", dict(class_name_re='Button|Edit', title_re='Control 1.*')),
+        ("best_match", dict(best_match='Control 7Button')),
+    )
+    element_info.set_cache_stats(True)
+    try:
+        for name, criteria in searches:
+            criteria = findwindows.SearchCriteria(top_level_only=False, backend='simulated',
+                                                  **criteria)
+            for caching in (False, True):
+                element_info.set_caching(caching)
+                element_info.reset_cache_stats()
+                simulated.reset_round_trips()
+                seconds = min(timeit.repeat(criteria.find_elements, number=1, repeat=3))
+                print("{0:<26} caching {1:<5} {2:10.1f} ms {3:>8} round trips {4:>8} cache hits".format(
+                    name, str(caching), seconds * 1000, simulated.round_trips() // 3,
+                    element_info.cache_stats()['hits'] // 3))
+    finally:
+        element_info.set_caching(True)
+        element_info.set_cache_stats(False)
+        simulated.set_latency(0)
+
+
+if __name__ == "__main__":
+    main()
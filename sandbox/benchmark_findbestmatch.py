@@ -0,0 +1,134 @@
+"""Benchmark of the best match scoring for big dialogs
+
+Compares the former way of scoring the names (a separate pass of
+difflib.SequenceMatcher over all the names for each of the as is,
+ignore case, clean and clean + ignore case variants) with the single
+pass scoring used by find_best_control_matches now and with the
+opt-in trigram prefilter which scores only the similar names
+(see findbestmatch.set_similarity_backend).
+
+Run it from the root of the repository::
+
+    python sandbox/benchmark_findbestmatch.py
+"""
+from __future__ import print_function
+
+import difflib
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import findbestmatch  # noqa: E402
+
+CLASS_NAMES = ["Edit", "Static", "Button", "CheckBox", "ComboBox", "ListBox"]
+WORDS = ["Name", "Address", "City", "Phone", "E-mail", "Zip code", "Country",
+         "Notes", "OK", "Cancel", "Apply", "Help", "Next >", "< Back"]
+
+
+def build_names(count, seed=0):
+    """Return a UniqueDict with count synthetic control names"""
+    rnd = random.Random(seed)
+    names = findbestmatch.UniqueDict()
+    while len(names) < count:
+        text = "{0} {1}".format(rnd.choice(WORDS), rnd.randint(0, count))
+        names[text + rnd.choice(CLASS_NAMES)] = len(names)
+    return names
+
+
+def _legacy_pass(names, search_text, clean, ignore_case, cache):
+    """One pass of the former UniqueDict.FindBestMatches"""
+    cutoff = findbestmatch.find_best_control_match_cutoff
+    ratio_calc = difflib.SequenceMatcher()
+    if ignore_case:
+        search_text = search_text.lower()
+    ratio_calc.set_seq1(search_text)
+
+    ratio_offset = 1
+    if clean:
+        ratio_offset *= .9
+    if ignore_case:
+        ratio_offset *= .9
+
+    best_ratio = 0
+    best_texts = []
+    for text_ in names:
+        text = text_
+        if clean:
+            text = findbestmatch._clean_non_chars(text)
+        if ignore_case:
+            text = text.lower()
+
+        cache_key = (text, search_text, ratio_offset)
+        if cache_key in cache:
+            ratio = cache[cache_key]
+        else:
+            ratio_calc.set_seq2(text)
+            ratio = ratio_calc.real_quick_ratio() * ratio_offset
+            if ratio >= cutoff:
+                ratio = ratio_calc.quick_ratio() * ratio_offset
+                if ratio >= cutoff:
+                    ratio = ratio_calc.ratio() * ratio_offset
+            cache[cache_key] = ratio
+
+        if ratio > best_ratio and ratio >= cutoff:
+            best_ratio = ratio
+            best_texts = [text_]
+        elif ratio == best_ratio:
+            best_texts.append(text_)
+    return best_ratio, best_texts
+
+
+def legacy_four_passes(names, search_text):
+    """Score the names with a separate pass for each variant"""
+    cache = {}
+    return [_legacy_pass(names, search_text, clean, ignore_case, cache)
+            for clean, ignore_case in findbestmatch._match_variants]
+
+
+def single_pass(names, search_text):
+    """Score the names with the single pass engine"""
+    findbestmatch._cache.clear()
+    return findbestmatch._score_variants(search_text, names.name_variants())
+
+
+def trigram_difflib(names, search_text, prefilter):
+    """Score only the names similar by trigrams with difflib"""
+    findbestmatch._cache.clear()
+    return findbestmatch._score_variants(
+        search_text, names.name_variants(), prefilter=prefilter,
+        scorer=findbestmatch.DifflibScorer(), compatible=False)
+
+
+def trigram_levenshtein(names, search_text, prefilter):
+    """Score only the names similar by trigrams with the banded Levenshtein"""
+    findbestmatch._cache.clear()
+    return findbestmatch._score_variants(
+        search_text, names.name_variants(), prefilter=prefilter,
+        scorer=findbestmatch.LevenshteinScorer(), compatible=False)
+
+
+def main():
+    """Print the timings for 1k and 10k names dialogs"""
+    for count in (1000, 10000):
+        names = build_names(count)
+        search_text = "phone 42 edit"
+        assert legacy_four_passes(names, search_text) == single_pass(names, search_text)
+
+        # the trigram index is kept by NameIndex between the lookups
+        prefilter = findbestmatch.TrigramIndex(names.name_variants())
+
+        repeat = max(1, 10000 // count)
+        for func, args in ((legacy_four_passes, ()),
+                           (single_pass, ()),
+                           (trigram_difflib, (prefilter, )),
+                           (trigram_levenshtein, (prefilter, ))):
+            seconds = min(timeit.repeat(
+                lambda: func(names, search_text, *args), number=repeat, repeat=3)) / repeat
+            print("{0:>6} names  {1:<20} {2:8.2f} ms".format(count, func.__name__, seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
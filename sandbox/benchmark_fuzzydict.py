@@ -0,0 +1,75 @@
+"""Benchmark of the fuzzy lookups in big FuzzyDict instances
+
+Compares the linear search of FuzzyDict (every key is compared with
+difflib) with the indexed mode where the upper bounds of the ratios
+come from the CharIndex and most of the keys are never compared,
+and ShardedFuzzyDict searching the indexes of the keys in one worker
+process per CPU (at least two) with a whole batch of lookups at once.
+
+Run it from the root of the repository::
+
+    python sandbox/benchmark_fuzzydict.py
+"""
+from __future__ import print_function
+
+import multiprocessing
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto.fuzzydict import FuzzyDict, ShardedFuzzyDict  # noqa: E402
+
+WORDS = ("OK", "Cancel", "Apply", "Help", "File", "Edit", "View", "Name",
+         "Address", "Options", "Settings", "Button", "Static", "ComboBox")
+
+
+def build_keys(count, seed=0):
+    """Return count unique control-like names"""
+    rnd = random.Random(seed)
+    keys = set()
+    while len(keys) < count:
+        keys.add(rnd.choice(WORDS) + rnd.choice(WORDS) + str(rnd.randint(0, count)))
+    return sorted(keys)
+
+
+def build_lookups(keys, count, seed=1):
+    """Return count keys with a typo"""
+    rnd = random.Random(seed)
+    lookups = []
+    for _ in range(count):
+        key = rnd.choice(keys)
+        i = rnd.randint(0, len(key) - 1)
+        lookups.append(key[:i] + key[i + 1:].lower())
+    return lookups
+
+
+def main():
+    """Print the timings of 20 fuzzy lookups in 1000 - 50000 keys"""
+    for count in (1000, 10000, 50000):
+        keys = build_keys(count)
+        lookups = build_lookups(keys, 20)
+        items = dict((key, i) for i, key in enumerate(keys))
+        dicts = [(name, FuzzyDict(items, indexed=indexed, memo_size=0))
+                 for name, indexed in (("linear", False), ("indexed", True))]
+        expected = [dicts[0][1]._search(lookfor) for lookfor in lookups]
+
+        for name, fuzzy in dicts:
+            assert [fuzzy._search(lookfor) for lookfor in lookups] == expected
+            seconds = min(timeit.repeat(lambda: [fuzzy._search(lookfor) for lookfor in lookups],
+                                        number=1, repeat=3))
+            print("{0:>6} keys  {1:<8} {2:10.2f} ms per lookup".format(
+                count, name, seconds * 1000 / len(lookups)))
+
+        shards = max(2, multiprocessing.cpu_count())
+        with ShardedFuzzyDict(items, shards=shards, shard_threshold=0) as sharded:
+            assert sharded.search_many(lookups) == expected
+            seconds = min(timeit.repeat(lambda: sharded.search_many(lookups), number=1, repeat=3))
+            print("{0:>6} keys  {1:<8} {2:10.2f} ms per lookup ({3} shards)".format(
+                count, "sharded", seconds * 1000 / len(lookups), shards))
+
+
+if __name__ == "__main__":
+    main()
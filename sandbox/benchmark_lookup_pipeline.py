@@ -0,0 +1,66 @@
+"""Benchmark of the whole lookup of the window specifications
+
+Resolves a dialog by the title and its controls by the best match
+the same way as the window specifications of Desktop(backend='simulated')
+do (by findwindows.SearchCriteria, without pywinauto.application,
+so it runs on the other platforms too) in a generated simulated desktop
+or in the tree loaded from a JSON file (see pywinauto.simulated.load_tree).
+The calls have the latencies of the cross process calls, the round trips
+are printed by their kinds. With --profile the lookups are profiled by cProfile.
+
+Run it from the root of the repository::
+
+    python sandbox/benchmark_lookup_pipeline.py [--profile] [tree.json]
+"""
+from __future__ import print_function
+
+import cProfile
+import os
+import pstats
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import findwindows, simulated  # noqa: E402
+
+
+def lookup():
+    """Resolve a dialog and some of its controls"""
+    dialog = simulated.SimulatedWrapper(findwindows.SearchCriteria(
+        title='Dialog 7', top_level_only=True, backend='simulated').find_element())
+    for name in ('Control 3', 'Control 17', 'Control 25'):
+        simulated.SimulatedWrapper(findwindows.SearchCriteria(
+            best_match=name, top_level_only=False, backend='simulated').find_element(dialog.element_info))
+
+
+def main():
+    """Print the time and the round trips of the lookup"""
+    args = sys.argv[1:]
+    profile = '--profile' in args
+    paths = [arg for arg in args if arg != '--profile']
+    if paths:
+        simulated.set_desktop(simulated.load_tree(paths[0]))
+    else:
+        simulated.set_desktop(simulated.generate_desktop(20, 30))
+
+    simulated.set_latency(.00005)
+    simulated.set_latency(.0002, 'enumerate', per_element=.000002)
+    simulated.set_latency(.0002, 'prefetch', per_element=.000005)
+    try:
+        simulated.reset_round_trips()
+        seconds = min(timeit.repeat(lookup, number=1, repeat=3))
+        print("lookup {0:10.1f} ms".format(seconds * 1000))
+        for call in simulated.calls:
+            print("{0:<10} {1:>8} round trips".format(call, simulated.round_trips(call) // 3))
+
+        if profile:
+            profiler = cProfile.Profile()
+            profiler.runcall(lookup)
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+    finally:
+        simulated.set_latency(0)
+
+
+if __name__ == "__main__":
+    main()
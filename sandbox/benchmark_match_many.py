@@ -0,0 +1,112 @@
+"""Benchmark of resolving many best match names against one dialog
+
+Compares a loop of find_best_control_matches calls (the controls are
+named again for each of the search texts) with findbestmatch.match_many
+which names them once. The trigram prefilter is measured too: match_many
+finds the candidates of all the search texts in one batch, vectorized
+with NumPy if it's installed.
+
+Run it from the root of the repository::
+
+    python sandbox/benchmark_match_many.py
+"""
+from __future__ import print_function
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import findbestmatch  # noqa: E402
+from benchmark_control_names import build_dialog  # noqa: E402
+
+
+def build_search_texts(controls, count, seed=0):
+    """Return count search texts: names of the controls with typos"""
+    rnd = random.Random(seed)
+    search_texts = []
+    for _ in range(count):
+        ctrl = rnd.choice(controls)
+        text = ctrl.window_text() + ctrl.friendly_class_name()
+        if rnd.random() < .5:
+            i = rnd.randint(0, len(text) - 1)
+            text = text[:i] + text[i + 1:]
+        search_texts.append(text.lower())
+    return search_texts
+
+
+def per_query_loop(search_texts, controls):
+    """Resolve the search texts one by one"""
+    matches = []
+    for search_text in search_texts:
+        try:
+            matches.append(findbestmatch.find_best_control_matches(search_text, controls))
+        except findbestmatch.MatchError as exc:
+            matches.append(exc)
+    return matches
+
+
+def batch(search_texts, controls):
+    """Resolve the search texts with match_many"""
+    return findbestmatch.match_many(search_texts, controls)
+
+
+def _same(matches1, matches2):
+    """Compare two lists of matches (errors are equal if the search texts are)"""
+    for match1, match2 in zip(matches1, matches2):
+        if isinstance(match1, findbestmatch.MatchError):
+            if not isinstance(match2, findbestmatch.MatchError) or \
+                    match1.tofind != match2.tofind:
+                return False
+        elif match1 != match2:
+            return False
+    return len(matches1) == len(matches2)
+
+
+def main():
+    """Print the timings for 50 search texts against 200 and 1000 controls"""
+    runs = ((per_query_loop, "full scan", None, False),
+            (batch, "full scan", None, False),
+            (per_query_loop, "trigram", "trigram", False),
+            (batch, "trigram", "trigram", False),
+            (batch, "trigram + NumPy", "trigram", True))
+    for count in (200, 1000):
+        controls = build_dialog(count)
+        search_texts = build_search_texts(controls, 50)
+        findbestmatch.set_similarity_backend()
+        expected = per_query_loop(search_texts, controls)
+
+        for func, mode, prefilter, vectorized in runs:
+            # with the prefilter only the trigram candidates are scored
+            findbestmatch.set_similarity_backend(prefilter=prefilter)
+            findbestmatch.vectorized_prefilter = vectorized
+            if prefilter is None:
+                assert _same(expected, func(search_texts, controls))
+
+            def run():
+                findbestmatch.clear_cache()
+                func(search_texts, controls)
+            seconds = min(timeit.repeat(run, number=1, repeat=2))
+            print("{0:>5} controls  {1:<16} {2:<16} {3:10.2f} ms".format(
+                count, func.__name__, mode, seconds * 1000))
+
+        # the batch prefilter alone
+        names = findbestmatch.build_unique_dict(controls)
+        prefilter = findbestmatch.TrigramIndex(names.name_variants())
+        for vectorized in (False, True):
+            findbestmatch.vectorized_prefilter = vectorized
+            seconds = min(timeit.repeat(
+                lambda: prefilter.candidates_many(search_texts, .5), number=10, repeat=3)) / 10
+            print("{0:>5} controls  {1:<16} {2:<16} {3:10.2f} ms".format(
+                count, "candidates_many", "NumPy" if vectorized else "loop", seconds * 1000))
+
+    findbestmatch.set_similarity_backend()
+    findbestmatch.vectorized_prefilter = True
+    if findbestmatch.numpy is None:
+        print("NumPy is not installed, the batch prefilter is not vectorized")
+
+
+if __name__ == "__main__":
+    main()
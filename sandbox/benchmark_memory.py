@@ -0,0 +1,116 @@
+"""Benchmark of the memory taken by the elements of a large tree
+
+Builds a simulated tree (see pywinauto.simulated) of about 50000 elements
+and measures with tracemalloc the memory per element of:
+
+* the element infos with the cached attributes filled and the same
+  attributes kept as the element infos did before (the cached values
+  and the bound getter methods in the instance dict)
+* the wrappers which create the ActionLogger and the cache dict
+  on the first use and the wrappers with them created at once
+* the records of findwindows.snapshot
+
+Run it from the root of the repository (Python 3)::
+
+    python sandbox/benchmark_memory.py
+"""
+from __future__ import print_function
+
+import gc
+import os
+import random
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import findwindows, simulated  # noqa: E402
+
+
+# the attributes cached by UIAElementInfo before
+LEGACY_ATTRIBUTES = ('class_name', 'handle', 'control_type', 'name', 'visible', 'rich_text')
+
+
+class LegacyElementInfo(object):
+
+    """The layout of the former element infos with the attributes cached"""
+
+    def __init__(self, element):
+        self._element = element
+        for name in LEGACY_ATTRIBUTES:
+            setattr(self, '_cached_' + name, getattr(element, name, None))
+            setattr(self, '_get_' + name, self.__init__)
+
+
+def build_tree(count, seed=0):
+    """Return a simulated desktop with count elements"""
+    rnd = random.Random(seed)
+    desktop = simulated.SimulatedElement(class_name='#32769')
+    parents = [desktop.add(class_name='#32770', title='Dialog')]
+    for i in range(count - 1):
+        parents.append(rnd.choice(parents).add(class_name=rnd.choice(('Button', 'Edit', 'Static')),
+                                               title='Control %d' % i, control_id=i))
+    return desktop
+
+
+def read_attributes(infos):
+    """Fill the caches of the element infos"""
+    for info in infos:
+        for name in LEGACY_ATTRIBUTES:
+            getattr(info, name)
+    return infos
+
+
+def eager_wrappers(infos):
+    """Return the wrappers with the logger and the cache dict created at once"""
+    wrappers = [simulated.SimulatedWrapper(info) for info in infos]
+    for wrapper in wrappers:
+        wrapper.actions
+        wrapper._cache
+    return wrappers
+
+
+def measure(build):
+    """Return the number of the bytes allocated by build() and kept"""
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    """Print the memory per element"""
+    if tracemalloc is None:
+        print("tracemalloc is not available, run the benchmark with Python 3")
+        return
+
+    desktop = build_tree(50000)
+    simulated.set_desktop(desktop)
+    elements = list(desktop.iter_descendants())
+    infos = read_attributes([simulated.SimulatedElementInfo(elem, True) for elem in elements])
+
+    runs = (
+        ("element infos (former layout)",
+         lambda: [LegacyElementInfo(elem) for elem in elements]),
+        ("element infos (slots)",
+         lambda: read_attributes([simulated.SimulatedElementInfo(elem, True) for elem in elements])),
+        ("wrappers (eager logger)", lambda: eager_wrappers(infos)),
+        ("wrappers (lazy logger)", lambda: [simulated.SimulatedWrapper(info) for info in infos]),
+        ("snapshot", lambda: findwindows.snapshot(backend='simulated')),
+    )
+    for name, build in runs:
+        size = measure(build)
+        print("{0:<32} {1:10.1f} MB {2:8.0f} bytes per element".format(
+            name, size / 1024. / 1024, float(size) / len(elements)))
+
+
+if __name__ == "__main__":
+    main()
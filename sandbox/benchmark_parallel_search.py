@@ -0,0 +1,47 @@
+"""Benchmark of the parallel search in the subtrees of the top level windows
+
+Searches all the descendants of a simulated desktop (see
+pywinauto.simulated) with 1 - 16 threads. Each property read of
+a simulated element sleeps for the latency of a cross process call,
+so the threads overlap the waiting like with a real back-end.
+
+Run it from the root of the repository::
+
+    python sandbox/benchmark_parallel_search.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import findwindows, simulated  # noqa: E402
+
+
+def build_desktop(windows, controls, seed=0):
+    """Return a simulated desktop with the windows of the controls"""
+    return simulated.generate_desktop(windows, controls, seed)
+
+
+def main():
+    """Print the time of a search for a missing control with 1 - 16 threads"""
+    simulated.set_desktop(build_desktop(100, 30))
+    simulated.set_latency(.0001)
+    criteria = findwindows.SearchCriteria(class_name_re='Button', title_re='Missing',
+                                          top_level_only=False, backend='simulated')
+    try:
+        for threads in (1, 2, 4, 8, 16):
+            findwindows.set_search_threads(threads)
+            simulated.reset_round_trips()
+            seconds = min(timeit.repeat(criteria.find_elements, number=1, repeat=3))
+            print("{0:>3} threads {1:10.1f} ms {2:>8} round trips".format(
+                threads, seconds * 1000, simulated.round_trips() // 3))
+    finally:
+        findwindows.set_search_threads(1)
+        simulated.set_latency(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark of the attributes prefetched in bulk
+
+Searches the descendants of a simulated desktop (see pywinauto.simulated)
+and captures a snapshot of it with the attributes of the elements read
+one by one and prefetched in bulk (SimulatedElementInfo.prefetch reads
+the attributes of a batch of elements in one round trip).
+
+Run it from the root of the repository::
+
+    python sandbox/benchmark_prefetch.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import findwindows, simulated  # noqa: E402
+from benchmark_parallel_search import build_desktop  # noqa: E402
+
+
+def main():
+    """Print the time and the round trips of the searches with and without the prefetch"""
+    simulated.set_desktop(build_desktop(20, 30))
+    simulated.set_latency(.00005)
+    searches = (
+        ("class_name_re + title_re", findwindows.SearchCriteria(
+            top_level_only=False, backend='simulated',
+            class_name_re='Button|Edit', title_re='Control 1.*').find_elements),
+        ("best_match", findwindows.SearchCriteria(
+            top_level_only=False, backend='simulated',
+            best_match='Control 7Button').find_elements),
+        ("snapshot", lambda: findwindows.snapshot(backend='simulated')),
+    )
+    try:
+        for name, search in searches:
+            for bulk in (False, True):
+                simulated.SimulatedElementInfo.bulk_prefetch = bulk
+                simulated.reset_round_trips()
+                seconds = min(timeit.repeat(search, number=1, repeat=3))
+                print("{0:<26} prefetch {1:<5} {2:10.1f} ms {3:>8} round trips".format(
+                    name, str(bulk), seconds * 1000, simulated.round_trips() // 3))
+    finally:
+        simulated.SimulatedElementInfo.bulk_prefetch = True
+        simulated.set_latency(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark of repeated searches with the same criteria
+
+Compares a cold search (findwindows.find_elements with keyword arguments:
+the criteria are checked and compiled on every call) with a warm one
+(the same SearchCriteria object is used again as WindowSpecification
+does while waiting for a window). The compilation alone is timed too.
+The searches look for the top level windows of the desktop, so run it
+on Windows from the root of the repository::
+
+    python sandbox/benchmark_search_criteria.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import findwindows  # noqa: E402
+
+SEARCHES = (
+    ("class_name", dict(class_name="Shell_TrayWnd", backend="win32")),
+    ("regular expressions", dict(class_name_re="#32770|Notepad|Shell.*",
+                                 title_re=".*[Ss]ave.*", visible_only=False,
+                                 backend="win32")),
+    ("no such window", dict(class_name_re="NoSuchClass.*", title_re="NoSuchTitle",
+                            enabled_only=True, backend="win32")),
+)
+
+
+def main():
+    """Print the time per search for the cold and the warm criteria"""
+    for name, kwargs in SEARCHES:
+        criteria = findwindows.SearchCriteria(**kwargs)
+        assert [e.handle for e in criteria.find_elements()] == \
+            [e.handle for e in findwindows.find_elements(**kwargs)]
+
+        timings = (
+            ("compile only", lambda: findwindows.SearchCriteria(**kwargs)),
+            ("cold search", lambda: findwindows.find_elements(**kwargs)),
+            ("warm search", criteria.find_elements),
+        )
+        for mode, func in timings:
+            seconds = min(timeit.repeat(func, number=100, repeat=3)) / 100
+            print("{0:<20} {1:<14} {2:10.1f} us".format(name, mode, seconds * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark of the searches in a snapshot of a big element tree
+
+Captures a simulated desktop of about 20000 elements with
+findwindows.snapshot and compares the searches which check all the
+captured elements with the searches answered by the indexes of the
+snapshot (the hash indexes of class_name, auto_id, control_id and title
+and the sorted indexes for the prefixes of title_re and class_name_re).
+The cost of building each index (paid by the first search which needs
+it) is printed too.
+
+Run it from the root of the repository::
+
+    python sandbox/benchmark_snapshot_index.py
+"""
+from __future__ import print_function
+
+import gc
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pywinauto import findwindows  # noqa: E402
+from pywinauto import simulated  # noqa: E402
+
+
+def build_desktop(windows, controls, seed=0):
+    """Return a simulated desktop with the windows of the random controls"""
+    rnd = random.Random(seed)
+    desktop = simulated.SimulatedElement(class_name='#32769')
+    for i in range(windows):
+        dlg = desktop.add(class_name='#32770', title='Dialog {0}'.format(i), process_id=i)
+        parents = [dlg]
+        for j in range(controls):
+            class_name = rnd.choice(['Button', 'Edit', 'Static', 'ComboBox', 'Panel'])
+            ctrl = rnd.choice(parents).add(class_name=class_name,
+                                           title='{0} {1}'.format(class_name, j % 50),
+                                           control_id=j, automation_id='ctrl{0}'.format(j),
+                                           process_id=i)
+            if class_name == 'Panel':
+                parents.append(ctrl)
+    return desktop
+
+
+QUERIES = (
+    dict(class_name='ComboBox'),
+    dict(auto_id='ctrl77'),
+    dict(control_id=123),
+    dict(title='Edit 7'),
+    dict(title_re='Static 1.*'),
+    dict(class_name_re='Combo', title='ComboBox 3'),
+    dict(class_name='Button', auto_id='ctrl10'),
+)
+
+
+def main():
+    """Print the capture, index building and search timings"""
+    simulated.set_desktop(build_desktop(40, 500))
+
+    start = timeit.default_timer()
+    indexed = findwindows.snapshot(backend='simulated')
+    print("{0} elements captured in {1:.2f} ms".format(
+        len(indexed), (timeit.default_timer() - start) * 1000))
+    scanned = findwindows.snapshot(backend='simulated', indexed=False)
+
+    # the first search by each criterion builds its index
+    for criterion, value in (('class_name', 'Edit'), ('auto_id', 'ctrl1'), ('control_id', 1),
+                             ('title', 'Edit 1'), ('class_name_re', 'Edit'), ('title_re', 'Edit')):
+        indexed.refresh()
+        gc.collect()
+        start = timeit.default_timer()
+        indexed.candidates({criterion: value})
+        print("{0:<14} index built in {1:8.2f} ms".format(
+            criterion, (timeit.default_timer() - start) * 1000))
+
+    for query in QUERIES:
+        query = dict(query, top_level_only=False)
+        expected = [elem.handle for elem in scanned.find_elements(**query)]
+        assert [elem.handle for elem in indexed.find_elements(**query)] == expected
+
+        times = []
+        for snapshot in (scanned, indexed):
+            seconds = min(timeit.repeat(lambda: snapshot.find_elements(**query),
+                                        number=5, repeat=3)) / 5
+            times.append(seconds * 1000)
+        print("{0:<50} {1:>5} found  scan {2:8.2f} ms  indexed {3:8.3f} ms".format(
+            ", ".join("{0}={1!r}".format(*item) for item in sorted(query.items())
+                      if item[0] != 'top_level_only'),
+            len(expected), times[0], times[1]))
+
+
+if __name__ == "__main__":
+    main()